@@ -1,7 +1,9 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import math
+
+import kernels
+from price_store import default_price_store
 # === Insert Indicator and Strategy Code Here ===
 # (Paste the entire integrated code provided earlier)
 # === Indicator Calculation Functions ===
@@ -27,35 +29,15 @@ def calculate_ema(prices_df: pd.DataFrame, window: int) -> pd.Series:
     return prices_df["close"].ewm(span=window, adjust=False).mean()
 
 def calculate_adx(prices_df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-    prices_df["high_low"] = prices_df["high"] - prices_df["low"]
-    prices_df["high_close"] = abs(prices_df["high"] - prices_df["close"].shift())
-    prices_df["low_close"] = abs(prices_df["low"] - prices_df["close"].shift())
-    prices_df["tr"] = prices_df[["high_low", "high_close", "low_close"]].max(axis=1)
-
-    prices_df["up_move"] = prices_df["high"] - prices_df["high"].shift()
-    prices_df["down_move"] = prices_df["low"].shift() - prices_df["low"]
-
-    prices_df["plus_dm"] = np.where((prices_df["up_move"] > prices_df["down_move"]) & (prices_df["up_move"] > 0), prices_df["up_move"], 0)
-    prices_df["minus_dm"] = np.where((prices_df["down_move"] > prices_df["up_move"]) & (prices_df["down_move"] > 0), prices_df["down_move"], 0)
-
-    prices_df["+di"] = 100 * (prices_df["plus_dm"].ewm(span=period).mean() / prices_df["tr"].ewm(span=period).mean())
-    prices_df["-di"] = 100 * (prices_df["minus_dm"].ewm(span=period).mean() / prices_df["tr"].ewm(span=period).mean())
-    prices_df["dx"] = 100 * abs(prices_df["+di"] - prices_df["-di"]) / (prices_df["+di"] + prices_df["-di"])
-    prices_df["adx"] = prices_df["dx"].ewm(span=period).mean()
-
-    return prices_df[["adx", "+di", "-di"]]
+    adx, plus_di, minus_di = kernels.adx(prices_df["high"], prices_df["low"], prices_df["close"], period)
+    return pd.DataFrame({"adx": adx, "+di": plus_di, "-di": minus_di}, index=prices_df.index)
 
 def calculate_atr(prices_df, window=14):
     """
     Calculate the Average True Range (ATR).
     """
-    high_low = prices_df["high"] - prices_df["low"]
-    high_close = abs(prices_df["high"] - prices_df["close"].shift(1))
-    low_close = abs(prices_df["low"] - prices_df["close"].shift(1))
-
-    true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    atr = true_range.rolling(window).mean()
-    return atr
+    atr = kernels.atr(prices_df["high"], prices_df["low"], prices_df["close"], window)
+    return pd.Series(atr, index=prices_df.index)
 
 # === Strategy Functions ===
 def calculate_trend_signals(prices_df):
@@ -265,8 +247,15 @@ def calculate_volatility_signal(prices_df):
 
 
 # === Fetch Data for RELIANCE.NS ===
-def fetch_stock_data(ticker: str, start_date: str, end_date: str, interval: str = "1d") -> pd.DataFrame:
-    prices_df = yf.download(ticker, start=start_date, end=end_date, interval=interval)
+def fetch_stock_data(ticker: str, start_date: str, end_date: str, interval: str = "1d", store=None) -> pd.DataFrame:
+    """
+    Load bars through the local price store; only date ranges that are not cached yet are downloaded.
+    """
+    if store is None:
+        store = default_price_store()
+    prices_df = store.fetch(ticker, start_date, end_date, interval)
+    # Same (Price, Ticker) column layout as a single-ticker yf.download
+    prices_df.columns = pd.MultiIndex.from_product([prices_df.columns, [ticker]], names=["Price", "Ticker"])
     prices_df = prices_df.rename(columns={"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"})
     return prices_df
 
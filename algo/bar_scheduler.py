@@ -0,0 +1,238 @@
+"""
+Bar-close event scheduling for live trading loops.
+
+Instead of sleeping on a fixed grid and re-evaluating every symbol,
+`BarCloseScheduler` wakes shortly after each bar close of every
+(symbol, timeframe) subscription, asks the bar feed for the latest closed
+bar and hands only the symbols with a new bar to the handler. Bars that
+arrive late or are skipped entirely are recorded and reported.
+
+Time comes from injectable `clock`/`sleep` callables and bars from any
+`feed(symbol, timeframe)` callable, so the scheduler runs against
+`SimulatedClock` and `SimulatedBarFeed` without a trading terminal.
+
+Classes:
+- SimulatedClock: manual clock whose sleep advances time instantly.
+- AcceleratedClock: wall clock running `speed` times faster, safe to share between threads.
+- SimulatedBarFeed: publishes bars on the clock's schedule, with optional delays and dropped bars.
+- BarCloseScheduler: wakes at bar closes and dispatches newly closed bars.
+"""
+
+import time
+
+
+class SimulatedClock:
+    """Clock for tests and replays: `sleep` advances `now` instead of waiting."""
+    def __init__(self, start=0.0):
+        self.t = float(start)
+
+    def now(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.t += max(0.0, seconds)
+
+
+class AcceleratedClock:
+    """
+    Clock starting at `start` (epoch seconds) that runs `speed` times faster than
+    real time; `sleep(s)` waits s / speed real seconds. Work done between sleeps
+    still takes real time, so replays keep real computation and I/O costs.
+    """
+    def __init__(self, start, speed=60.0):
+        self.start = float(start)
+        self.speed = float(speed)
+        self.real_start = time.perf_counter()
+
+    def now(self):
+        return self.start + (time.perf_counter() - self.real_start) * self.speed
+
+    def sleep(self, seconds):
+        time.sleep(max(0.0, seconds) / self.speed)
+
+
+class SimulatedBarFeed:
+    """
+    Bar feed driven by a clock: the bar opening at t (a multiple of the timeframe)
+    becomes visible `publish_delay` seconds after it closes at t + timeframe.
+
+    Args:
+        clock (callable): returns the current time in epoch seconds.
+        publish_delay (float): default delay between bar close and availability.
+        delays (dict): {(symbol, bar_time): delay} overrides, to simulate late bars.
+        dropped (set): {(symbol, bar_time)} bars that are never published.
+
+    Calling the feed returns the open time of the latest published bar, like
+    the "time" field of MetaTrader's last closed rate.
+    """
+    def __init__(self, clock, publish_delay=0.5, delays=None, dropped=None):
+        self.clock = clock
+        self.publish_delay = publish_delay
+        self.delays = delays or {}
+        self.dropped = dropped or set()
+        self.calls = 0
+
+    def __call__(self, symbol, timeframe):
+        self.calls += 1
+        now = self.clock()
+        bar_time = int(now // timeframe) * timeframe - timeframe
+        # Look back a few bars for the newest one that is already published
+        for _ in range(100):
+            key = (symbol, bar_time)
+            delay = self.delays.get(key, self.publish_delay)
+            if key not in self.dropped and bar_time + timeframe + delay <= now:
+                return bar_time
+            bar_time -= timeframe
+        return None
+
+
+class _Subscription:
+    def __init__(self, symbol, timeframe):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.last_bar = None
+        self.expected_close = None
+        self.next_check = float("-inf")
+        self.late_reported = False
+
+
+class BarCloseScheduler:
+    """
+    Wake at every bar close and dispatch the symbols that have a new closed bar.
+
+    Args:
+        feed (callable): feed(symbol, timeframe) -> open time (epoch seconds) of the
+            latest closed bar, or None if there is none yet.
+        subscriptions (list): (symbol, timeframe_seconds) pairs to follow.
+        clock, sleep (callable): time source and sleep function (default: wall clock).
+        grace (float): seconds after a bar close before the feed is first asked.
+        poll_interval (float): seconds between retries while a bar has not arrived.
+        late_after (float): a bar arriving this many seconds after its close is reported late.
+
+    Usage:
+        scheduler = BarCloseScheduler(feed, [("EURUSD", 300), ("GBPUSD", 300)])
+        scheduler.run(lambda bars: main([symbol for symbol, timeframe, bar_time in bars]), duration=3600)
+
+    Every detected bar, late arrival or gap is appended to `events` as a dict;
+    `summary()` counts them by status. Gaps also appear when the market is closed.
+    """
+    def __init__(self, feed, subscriptions, clock=time.time, sleep=time.sleep,
+                 grace=1.0, poll_interval=1.0, late_after=10.0):
+        self.feed = feed
+        self.subscriptions = [_Subscription(symbol, timeframe) for symbol, timeframe in subscriptions]
+        self.clock = clock
+        self.sleep = sleep
+        self.grace = grace
+        self.poll_interval = poll_interval
+        self.late_after = late_after
+        self.events = []
+
+    def _record(self, sub, status, bar_time, now, **extra):
+        delay = None if sub.expected_close is None else now - sub.expected_close
+        event = {"symbol": sub.symbol, "timeframe": sub.timeframe, "bar_time": bar_time,
+                 "status": status, "delay": delay, **extra}
+        self.events.append(event)
+        if status != "on_time":
+            details = ", ".join(f"{k}={v}" for k, v in extra.items())
+            delay_text = "" if delay is None else f" {delay:.1f}s after close"
+            print(f"[{sub.symbol} {sub.timeframe}s] {status} bar {bar_time}{delay_text}"
+                  + (f" ({details})" if details else ""))
+        return event
+
+    def _check(self, sub, now):
+        """Poll the feed for one subscription; returns the new bar time or None."""
+        bar_time = self.feed(sub.symbol, sub.timeframe)
+        if bar_time is not None and (sub.last_bar is None or bar_time > sub.last_bar):
+            if sub.last_bar is not None:
+                missed = int(round((bar_time - sub.last_bar) / sub.timeframe)) - 1
+                if missed > 0:
+                    self._record(sub, "missed", bar_time, now, bars=missed)
+            late = sub.expected_close is not None and now - sub.expected_close >= self.late_after
+            self._record(sub, "late" if late else "on_time", bar_time, now)
+            sub.last_bar = bar_time
+            sub.expected_close = (now // sub.timeframe + 1) * sub.timeframe
+            sub.next_check = sub.expected_close + self.grace
+            sub.late_reported = False
+            return bar_time
+
+        if sub.expected_close is None:
+            # Nothing published yet; start from the next close
+            sub.expected_close = (now // sub.timeframe + 1) * sub.timeframe
+            sub.next_check = sub.expected_close + self.grace
+        elif now >= sub.expected_close + sub.timeframe:
+            # The next bar is due as well; stop polling for this one and count it as
+            # missed if the next bar skips over it
+            sub.expected_close += sub.timeframe
+            sub.next_check = sub.expected_close + self.grace
+            sub.late_reported = False
+        else:
+            if not sub.late_reported and now - sub.expected_close >= self.late_after:
+                self._record(sub, "waiting", sub.last_bar, now)
+                sub.late_reported = True
+            sub.next_check = now + self.poll_interval
+        return None
+
+    def run_once(self):
+        """
+        Check every subscription that is due now.
+
+        Returns a list of (symbol, timeframe, bar_time) for the newly closed bars.
+        """
+        now = self.clock()
+        changed = []
+        for sub in self.subscriptions:
+            if sub.next_check <= now:
+                bar_time = self._check(sub, now)
+                if bar_time is not None:
+                    changed.append((sub.symbol, sub.timeframe, bar_time))
+        return changed
+
+    def next_wake(self):
+        return min(sub.next_check for sub in self.subscriptions)
+
+    def run(self, handler, duration=None, max_cycles=None):
+        """
+        Call `handler(changed)` whenever bars close, until `duration` seconds have
+        passed or `max_cycles` handler calls were made.
+
+        The first pass picks up the latest closed bar of every subscription, so the
+        handler runs once for all symbols at start-up.
+        """
+        deadline = None if duration is None else self.clock() + duration
+        cycles = 0
+        while deadline is None or self.clock() < deadline:
+            changed = self.run_once()
+            if changed:
+                handler(changed)
+                cycles += 1
+                if max_cycles is not None and cycles >= max_cycles:
+                    break
+            wake = self.next_wake()
+            if deadline is not None:
+                wake = min(wake, deadline)
+            self.sleep(max(0.0, wake - self.clock()))
+        return cycles
+
+    def summary(self):
+        counts = {}
+        for event in self.events:
+            counts[event["status"]] = counts.get(event["status"], 0) + event.get("bars", 1)
+        return counts
+
+
+if __name__ == "__main__":
+    # One simulated hour of M5 bars for five pairs, with one late and one dropped bar
+    clock = SimulatedClock(start=1_700_000_000 // 300 * 300 + 10)
+    pairs = ["EURUSD", "GBPUSD", "USDCHF", "AUDUSD", "USDCAD"]
+    first_bar = int(clock.now() // 300) * 300
+    feed = SimulatedBarFeed(
+        clock.now,
+        delays={("GBPUSD", first_bar + 600): 25.0},
+        dropped={("USDCHF", first_bar + 1200)},
+    )
+    scheduler = BarCloseScheduler(feed, [(pair, 300) for pair in pairs], clock=clock.now, sleep=clock.sleep)
+    evaluated = []
+    scheduler.run(lambda bars: evaluated.append([symbol for symbol, _, _ in bars]), duration=3600)
+    print(f"{len(evaluated)} handler calls, {sum(map(len, evaluated))} symbol evaluations, "
+          f"{feed.calls} feed calls")
+    print(scheduler.summary())
@@ -0,0 +1,337 @@
+"""
+Micro-benchmark suite for the indicator, strategy, Renko and rebalancing code.
+
+Every case runs on deterministic synthetic data (`synthetic_data.py`, fixed
+seeds) at several sizes: 1k, 100k and 1M bars for single-series functions and
+10 to 2000 tickers for cross-sectional ones. Each case is timed (best of a few
+runs for fast cases) and its peak traced memory is measured in a separate
+run under tracemalloc. Results are written as a JSON baseline; a later run is
+compared against it and cases that got slower or use more memory beyond a
+tolerance are reported as regressions. The baseline records the Python,
+numpy and pandas versions, the platform and the core count; comparing on a
+different one warns, since timings then say little about the code.
+
+`portfolio_rebalance.pflio` is timed without its result cache (through
+`__wrapped__`), so every run computes the backtest instead of reading it from disk.
+
+Usage:
+    python benchmark_suite.py --save --sizes 1k 100k 1m    # write benchmark_baseline.json (as committed)
+    python benchmark_suite.py                   # compare against it
+    python benchmark_suite.py --sizes 1k 100k 1m --tickers 10 100 2000 --match renko
+
+Functions:
+- bar_frame(n_bars, seed): one ticker of daily-style OHLCV bars, as `fetch_stock_data` returns it.
+- fx_frame(n_bars, seed): M5 bars in the `get_5m_candles` layout.
+- returns_matrix(n_months, n_tickers, seed): monthly returns for the rebalancing cases.
+- benchmark_cases(sizes, tickers): (name, size, setup) for every case.
+- run_suite(sizes, tickers, match): time and memory of every case.
+- save_baseline(results, path) / load_baseline(path): JSON baselines.
+- compare(results, baseline, tolerance): regressions against a baseline.
+"""
+
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+BAR_SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+TICKER_SIZES = (10, 100, 2000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+##### Synthetic Data #####
+def bar_frame(n_bars, seed=0):
+    """One ticker of OHLCV bars shaped like a `fetch_stock_data` result (minute spacing, so 1M bars fit in pandas' date range)."""
+    from synthetic_data import panel_to_yf_frame, synthetic_ohlcv_panel
+
+    return panel_to_yf_frame(synthetic_ohlcv_panel(n_bars, 1, seed=seed, freq="min"), 0)
+
+
+def fx_frame(n_bars, seed=0):
+    """M5 bars for one pair in the layout `get_5m_candles` returns."""
+    from renko_backtest import mt5_rates_to_ohlc
+    from synthetic_data import synthetic_fx_bars
+
+    return mt5_rates_to_ohlc(synthetic_fx_bars(["EURUSD"], n_bars, seed=seed)["EURUSD"])
+
+
+def returns_matrix(n_months, n_tickers, seed=0):
+    """(months x tickers) monthly returns with ticker column names."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(0.01, 0.08, (n_months, n_tickers)),
+                        columns=[f"SYN{j:04d}.NS" for j in range(n_tickers)])
+
+
+##### Cases #####
+def _case(make_data, fn):
+    """Setup that builds the data with `make_data()` and returns the call `fn(data)`."""
+    def setup():
+        data = make_data()
+        return lambda: fn(data)
+    return setup
+
+
+def _technical_cases(size, n_bars):
+    import technical_agent as ta
+    from indicator_graph import IndicatorGraph
+
+    def setup():
+        return bar_frame(n_bars)
+
+    def signals(prices_df):
+        indicators = IndicatorGraph(prices_df)
+        return (ta.calculate_trend_signals(prices_df, indicators),
+                ta.calculate_mean_reversion_signals(prices_df, indicators),
+                ta.calculate_momentum_signals(prices_df, indicators),
+                ta.calculate_volatility_signal(prices_df, indicators))
+
+    def with_signals(fn):
+        def prepare():
+            prices_df = setup()
+            try:
+                parts = signals(prices_df)
+            except Exception:
+                # calculate_mean_reversion_signals raises once |z| > 2; use neutral stand-ins
+                parts = tuple({"signal": "neutral", "confidence": 0.5, "metrics": {}} for _ in range(4))
+            return lambda: fn(parts)
+        return prepare
+
+    weights = {"trend": 0.30, "mean_reversion": 0.25, "momentum": 0.30, "volatility": 0.15}
+    cases = {
+        "calculate_rsi": lambda df: ta.calculate_rsi(df, 14),
+        "calculate_bollinger_bands": lambda df: ta.calculate_bollinger_bands(df, 20),
+        "calculate_ema": lambda df: ta.calculate_ema(df, 21),
+        "calculate_adx": lambda df: ta.calculate_adx(df, 14),
+        "calculate_atr": lambda df: ta.calculate_atr(df, 14),
+        "calculate_trend_signals": ta.calculate_trend_signals,
+        "calculate_mean_reversion_signals": ta.calculate_mean_reversion_signals,
+        "calculate_momentum_signals": ta.calculate_momentum_signals,
+        "calculate_volatility_signal": ta.calculate_volatility_signal,
+        "analyze_prices": lambda df: ta.analyze_prices(df, "SYN0000.NS"),
+        "normalize_pandas": lambda df: ta.normalize_pandas({"close": df.iloc[:, 0], "frame": df.iloc[-50:]}),
+    }
+    for name, fn in cases.items():
+        yield f"technical_agent.{name}", size, _case(setup, fn)
+    yield ("technical_agent.weighted_signal_combination", size, with_signals(
+        lambda parts: ta.weighted_signal_combination(dict(zip(weights, parts)), weights)))
+    yield "technical_agent.build_ticker_report", size, with_signals(lambda parts: ta.build_ticker_report(*parts))
+
+
+def _fetch_case(size, n_bars):
+    """fetch_stock_data served from a warm local PriceStore."""
+    import tempfile
+
+    from price_store import LocalFileProvider, PriceStore
+    from technical_agent import fetch_stock_data
+
+    def setup():
+        prices_df = bar_frame(n_bars)
+        flat = pd.DataFrame({field.capitalize(): prices_df[field].iloc[:, 0]
+                             for field in ["open", "high", "low", "close", "volume"]})
+        # Removed when the measured call is garbage collected
+        tmp = tempfile.TemporaryDirectory()
+        tmp_dir = tmp.name
+        LocalFileProvider.write(os.path.join(tmp_dir, "csv"), "SYN0000.NS", flat, interval="1m")
+        store = PriceStore(os.path.join(tmp_dir, "store"), LocalFileProvider(os.path.join(tmp_dir, "csv")))
+        start, end = flat.index[0], flat.index[-1] + pd.Timedelta(minutes=1)
+        fetch_stock_data("SYN0000.NS", start, end, interval="1m", store=store)
+        return lambda: (tmp, fetch_stock_data("SYN0000.NS", start, end, interval="1m", store=store))[1]
+
+    yield "technical_agent.fetch_stock_data", size, setup
+
+
+def _mt5_cases(size, n_bars):
+    import mt5_renko_macd2 as mt
+
+    def setup():
+        return fx_frame(n_bars)
+
+    yield "mt5_renko_macd2.MACD", size, _case(setup, lambda df: mt.MACD(df, 12, 26, 9))
+    yield "mt5_renko_macd2.ATR", size, _case(setup, lambda df: mt.ATR(df, 120))
+    yield "mt5_renko_macd2.renko_DF", size, _case(setup, mt.renko_DF)
+    yield "mt5_renko_macd2.renko_merge", size, _case(setup, mt.renko_merge)
+
+
+def _portfolio_cases(n_tickers):
+    import portfolio_rebalance as pr
+    from performance_metrics import performance_metrics
+    from technical_panel import calculate_panel_signals
+
+    size = f"{n_tickers}t"
+    pflio = pr.pflio.__wrapped__
+
+    def pflio_case():
+        returns = returns_matrix(120, n_tickers)
+        return lambda: pflio(returns, 6, 3)
+
+    def kpi_case():
+        portfolio = pflio(returns_matrix(120, n_tickers), 6, 3)
+        return lambda: (pr.CAGR(portfolio), pr.volatility(portfolio), pr.sharpe(portfolio, 0.025),
+                        pr.max_dd(portfolio))
+
+    def metrics_matrix_case():
+        returns = returns_matrix(120, n_tickers)
+        return lambda: performance_metrics(returns)
+
+    def panel_case():
+        from synthetic_data import synthetic_ohlcv_panel
+
+        panel = synthetic_ohlcv_panel(300, n_tickers)
+
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return calculate_panel_signals(panel)
+        return run
+
+    yield "portfolio_rebalance.pflio", size, pflio_case
+    yield "portfolio_rebalance.kpis", size, kpi_case
+    yield "performance_metrics.matrix", size, metrics_matrix_case
+    yield "technical_panel.calculate_panel_signals", size, panel_case
+
+
+def benchmark_cases(sizes=("1k", "100k"), tickers=TICKER_SIZES):
+    """
+    All cases as (name, size label, setup); setup() prepares the data outside the
+    timing and returns the zero-argument callable that is measured.
+    """
+    for size in sizes:
+        n_bars = BAR_SIZES[size]
+        yield from _technical_cases(size, n_bars)
+        yield from _fetch_case(size, n_bars)
+        yield from _mt5_cases(size, n_bars)
+    for n_tickers in tickers:
+        yield from _portfolio_cases(n_tickers)
+
+
+##### Running and Baselines #####
+def _measure(fn, min_time=0.2, max_repeats=5):
+    """Best wall time over up to `max_repeats` runs (stopping once `min_time` is spent) and peak traced memory."""
+    times = []
+    while len(times) < max_repeats and sum(times) < min_time:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak, len(times)
+
+
+def run_suite(sizes=("1k", "100k"), tickers=TICKER_SIZES, match=None, verbose=True):
+    """
+    Run every case whose name contains `match` (all if None).
+
+    Returns a list of dicts: name, size, seconds, peak_bytes, repeats and error
+    (a case that raises is recorded with its error instead of stopping the suite).
+    """
+    results = []
+    for name, size, setup in benchmark_cases(sizes, tickers):
+        if match and match not in name:
+            continue
+        row = {"name": name, "size": size, "seconds": None, "peak_bytes": None, "repeats": 0, "error": None}
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn = setup()
+                row["seconds"], row["peak_bytes"], row["repeats"] = _measure(fn)
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+        results.append(row)
+        if verbose:
+            if row["error"]:
+                print(f"{name:<50} {size:>5}  error: {row['error'][:60]}")
+            else:
+                print(f"{name:<50} {size:>5}  {row['seconds'] * 1e3:10.2f} ms  {row['peak_bytes'] / 2**20:9.2f} MiB")
+    return results
+
+
+def _environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    baseline = {"created": dt.datetime.now().isoformat(timespec="seconds"), **_environment(), "results": results}
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=1)
+    return path
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=1e-3):
+    """
+    Cases slower or using more peak memory than the baseline by more than `tolerance`
+    (a fraction), and cases that newly fail. Timings under `min_seconds` in both runs
+    are too noisy to compare and are skipped. Warns (RuntimeWarning) if the baseline
+    was recorded on another machine or with other library versions.
+
+    Returns a list of dicts: name, size, metric, baseline, current, ratio.
+    """
+    changed = [f"{key} {baseline[key]} -> {value}" for key, value in _environment().items()
+               if key in baseline and baseline[key] != value]
+    if changed:
+        warnings.warn("baseline was recorded in a different environment (" + ", ".join(changed) + "); "
+                      "differences may not come from the code", RuntimeWarning, stacklevel=2)
+    previous = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = previous.get((row["name"], row["size"]))
+        if old is None:
+            continue
+        if row["error"] and not old["error"]:
+            regressions.append({"name": row["name"], "size": row["size"], "metric": "error",
+                                "baseline": None, "current": row["error"], "ratio": None})
+            continue
+        if row["error"] or old["error"]:
+            continue
+        checks = [("peak_bytes", old["peak_bytes"], row["peak_bytes"])]
+        if max(old["seconds"], row["seconds"]) >= min_seconds:
+            checks.append(("seconds", old["seconds"], row["seconds"]))
+        for metric, before, now in checks:
+            if before and now > before * (1 + tolerance):
+                regressions.append({"name": row["name"], "size": row["size"], "metric": metric,
+                                    "baseline": before, "current": now, "ratio": now / before})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the algo/ modules on synthetic data.")
+    parser.add_argument("--sizes", nargs="+", default=["1k", "100k"], choices=list(BAR_SIZES))
+    parser.add_argument("--tickers", nargs="+", type=int, default=list(TICKER_SIZES))
+    parser.add_argument("--match", help="only run cases whose name contains this text")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.tickers, args.match)
+    if args.save:
+        print("baseline written to", save_baseline(results, args.baseline))
+    elif os.path.exists(args.baseline):
+        regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+        for r in regressions:
+            ratio = "" if r["ratio"] is None else f" ({r['ratio']:.2f}x)"
+            print(f"REGRESSION {r['name']} [{r['size']}] {r['metric']}: {r['baseline']} -> {r['current']}{ratio}")
+        print(f"{len(regressions)} regression(s) against {args.baseline}")
+    else:
+        print(f"no baseline at {args.baseline}; run with --save to create one")
@@ -0,0 +1,319 @@
+"""
+Broker interface for the Renko/MACD live strategy.
+
+`mt5_renko_macd2.py` talks to a `Broker` instead of the MetaTrader5 module,
+so the same strategy loop runs against a live MetaTrader 5 terminal
+(`MT5Broker`) or against `SimulatedBroker`, which replays recorded or
+synthetic bars in-process on any OS, at accelerated time if its clock is.
+
+Classes:
+- Broker: the calls the strategy needs (rates, last closed bar, positions, market orders).
+- MT5Broker: MetaTrader 5 terminal via the MetaTrader5 package (Windows only).
+- SimulatedBroker: replays bars, fills orders with latency and slippage, tracks netted positions.
+"""
+
+import datetime as dt
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+POSITION_COLUMNS = ["ticket", "time", "type", "volume", "price_open", "sl", "tp", "price_current", "profit", "symbol"]
+
+
+class Broker(ABC):
+    """
+    Trading account as seen by the strategy. Timeframes are bar lengths in seconds.
+
+    - now(): current broker time as a naive datetime.
+    - rates_from(symbol, timeframe, date_from, count): up to `count` bars opening at
+      or before `date_from`, as MetaTrader rates (time, open, high, low, close,
+      tick_volume, spread, real_volume).
+    - last_closed_bar(symbol, timeframe): open time (epoch seconds) of the latest closed bar.
+    - positions(): open positions as a DataFrame, type 1 for long and -1 for short.
+    - market_order(symbol, volume, buy_sell, sl_pip, tp_pip): send a market order.
+    """
+    @abstractmethod
+    def now(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def rates_from(self, symbol, timeframe, date_from, count):
+        raise NotImplementedError
+
+    @abstractmethod
+    def last_closed_bar(self, symbol, timeframe):
+        raise NotImplementedError
+
+    @abstractmethod
+    def positions(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def market_order(self, symbol, volume, buy_sell, sl_pip, tp_pip):
+        raise NotImplementedError
+
+
+class MT5Broker(Broker):
+    """
+    MetaTrader 5 terminal account. Connects on construction.
+
+    The MetaTrader5 package talks to the terminal over one global connection
+    and is not documented as thread-safe, so every call into it is serialized
+    behind `lock`; callers may still use the broker from several threads, but
+    their terminal round trips run one at a time. There is no multi-symbol
+    request, so a cycle costs one round trip per symbol read and two per order
+    (the symbol's point size is asked once and kept in `points`).
+
+    Usage:
+        broker = MT5Broker.from_key_file("C:\\\\Users\\\\HP\\\\Downloads\\\\key.txt")
+    """
+    def __init__(self, login, password, server, path=None):
+        import MetaTrader5 as mt5
+
+        self.mt5 = mt5
+        self.path = path
+        self.timeframes = {300: mt5.TIMEFRAME_M5}
+        self.lock = threading.Lock()
+        self.points = {}
+        # establish MetaTrader 5 connection to a specified trading account
+        if not mt5.initialize(login=int(login), server=server, password=password):
+            print("initialize() failed, error code =", mt5.last_error())
+
+    @classmethod
+    def from_key_file(cls, key_path, path=None):
+        """Account from a text file holding login, password and server separated by whitespace."""
+        with open(key_path, "r") as f:
+            key = f.read().split()
+        return cls(key[0], key[1], key[2], path)
+
+    def now(self):
+        return dt.datetime.now()
+
+    def rates_from(self, symbol, timeframe, date_from, count):
+        with self.lock:
+            return self.mt5.copy_rates_from(symbol, self.timeframes[timeframe], date_from, count)
+
+    def last_closed_bar(self, symbol, timeframe):
+        # position 1 is the latest closed bar; position 0 is the bar still forming
+        with self.lock:
+            rates = self.mt5.copy_rates_from_pos(symbol, self.timeframes[timeframe], 1, 1)
+        if rates is None or len(rates) == 0:
+            return None
+        return int(rates[0]["time"])
+
+    def positions(self):
+        with self.lock:
+            positions = self.mt5.positions_get()
+        if len(positions) > 0:
+            pos_df = pd.DataFrame(list(positions), columns=positions[0]._asdict().keys())
+            pos_df.time = pd.to_datetime(pos_df.time, unit="s")
+            pos_df.drop(['time_update', 'time_msc', 'time_update_msc', 'external_id'], axis=1, inplace=True)
+            pos_df.type = np.where(pos_df.type == 0, 1, -1)  # to distinguish between long and short positions
+        else:
+            pos_df = pd.DataFrame()
+        return pos_df
+
+    def market_order(self, symbol, volume, buy_sell, sl_pip, tp_pip):
+        mt5 = self.mt5
+        with self.lock:
+            if symbol not in self.points:
+                self.points[symbol] = mt5.symbol_info(symbol).point
+            pip_unit = 10 * self.points[symbol]
+            if buy_sell.capitalize()[0] == "B":
+                direction = mt5.ORDER_TYPE_BUY
+                price = mt5.symbol_info_tick(symbol).ask
+                sl = price - sl_pip * pip_unit
+                tp = price + tp_pip * pip_unit
+            else:
+                direction = mt5.ORDER_TYPE_SELL
+                price = mt5.symbol_info_tick(symbol).bid
+                sl = price + sl_pip * pip_unit
+                tp = price - tp_pip * pip_unit
+            request = {
+                "action": mt5.TRADE_ACTION_DEAL,
+                "symbol": symbol,
+                "volume": volume,
+                "type": direction,
+                "price": price,
+                "sl": sl,
+                "tp": tp,
+                "type_time": mt5.ORDER_TIME_GTC,
+                "type_filling": mt5.ORDER_FILLING_RETURN,
+            }
+            return mt5.order_send(request)
+
+
+class SimulatedBroker(Broker):
+    """
+    In-process broker replaying M5 bars for a netting account.
+
+    Args:
+        bars (dict): {symbol: DataFrame of MetaTrader rates}, e.g. from
+            `synthetic_data.synthetic_fx_bars` or recorded `copy_rates_range` output.
+        clock (callable): simulated time in epoch seconds (SimulatedClock.now, AcceleratedClock.now).
+        fetch_latency, order_latency (float): real seconds each read (rates, last bar,
+            positions) / order takes. Like MT5Broker's terminal connection, the
+            simulated terminal handles one call at a time: each call holds
+            `terminal` for its latency, so calls from several threads queue up.
+        slippage_pips (float): adverse slippage applied to every fill.
+        spread_pips (float): ask minus bid.
+        contract_size (float): units per lot, for profit in quote currency.
+
+    Only bars that have closed by `clock()` are visible. The current price is the
+    open of the bar in progress; stop loss and take profit are checked against
+    the high and low of every bar that closes while a position is open.
+    Fills are appended to `fills` with the simulated and real (perf_counter) time.
+    """
+    TIMEFRAME = 300
+
+    def __init__(self, bars, clock, fetch_latency=0.0, order_latency=0.0, slippage_pips=0.0,
+                 spread_pips=1.0, contract_size=100_000, sleep=time.sleep):
+        self.bars = {symbol: df.reset_index(drop=True) for symbol, df in bars.items()}
+        self.times = {symbol: df["time"].to_numpy(dtype=np.int64) for symbol, df in self.bars.items()}
+        self.clock = clock
+        self.sleep = sleep
+        self.fetch_latency = fetch_latency
+        self.order_latency = order_latency
+        self.slippage_pips = slippage_pips
+        self.spread_pips = spread_pips
+        self.contract_size = contract_size
+        self.lock = threading.Lock()
+        self.terminal = threading.Lock()
+        self.open_positions = {}
+        self.settled = {}
+        self.realized = 0.0
+        self.fills = []
+        self.next_ticket = 1
+
+    def point(self, symbol):
+        return 0.001 if symbol.endswith("JPY") else 0.00001
+
+    def _round_trip(self, latency):
+        """Occupy the simulated terminal for `latency` real seconds."""
+        with self.terminal:
+            if latency:
+                self.sleep(latency)
+
+    def now(self):
+        # naive UTC, like the bar times; fromtimestamp keeps the clock's microseconds
+        return dt.datetime.fromtimestamp(self.clock(), tz=dt.timezone.utc).replace(tzinfo=None)
+
+    def _closed_count(self, symbol, now=None):
+        """Number of bars of `symbol` that have closed by `now`."""
+        now = self.clock() if now is None else now
+        return int(np.searchsorted(self.times[symbol], now - self.TIMEFRAME, side="right"))
+
+    def rates_from(self, symbol, timeframe, date_from, count):
+        if timeframe != self.TIMEFRAME:
+            raise ValueError(f"SimulatedBroker only replays {self.TIMEFRAME}s bars")
+        self._round_trip(self.fetch_latency)
+        date_from = pd.Timestamp(date_from).value // 10**9
+        end = min(self._closed_count(symbol), int(np.searchsorted(self.times[symbol], date_from, side="right")))
+        return self.bars[symbol].iloc[max(0, end - count):end].copy()
+
+    def last_closed_bar(self, symbol, timeframe):
+        self._round_trip(self.fetch_latency)
+        closed = self._closed_count(symbol)
+        return int(self.times[symbol][closed - 1]) if closed else None
+
+    def _price(self, symbol, now):
+        """Bid at `now`: the open of the bar in progress, else the last close."""
+        i = int(np.searchsorted(self.times[symbol], now, side="right")) - 1
+        bars = self.bars[symbol]
+        if i < 0:
+            return float(bars["open"].iloc[0])
+        if self.times[symbol][i] + self.TIMEFRAME > now:
+            return float(bars["open"].iloc[i])
+        return float(bars["close"].iloc[i])
+
+    def _settle(self, symbol, now):
+        """Close the position of `symbol` at its SL or TP if a bar closed since the last check reached it."""
+        closed = self._closed_count(symbol, now)
+        start = self.settled.get(symbol, closed)
+        self.settled[symbol] = closed
+        position = self.open_positions.get(symbol)
+        if position is None or start >= closed:
+            return
+        bars = self.bars[symbol].iloc[start:closed]
+        high, low = bars["high"].to_numpy(), bars["low"].to_numpy()
+        if position["volume"] > 0:
+            hit_sl, hit_tp = low <= position["sl"], high >= position["tp"]
+        else:
+            hit_sl, hit_tp = high >= position["sl"], low <= position["tp"]
+        hits = np.flatnonzero(hit_sl | hit_tp)
+        if len(hits):
+            # A bar touching both levels is assumed to hit the stop loss first
+            exit_price = position["sl"] if hit_sl[hits[0]] else position["tp"]
+            self.realized += (exit_price - position["price_open"]) * position["volume"] * self.contract_size
+            del self.open_positions[symbol]
+
+    def positions(self):
+        self._round_trip(self.fetch_latency)
+        now = self.clock()
+        with self.lock:
+            rows = []
+            for symbol in list(self.open_positions):
+                self._settle(symbol, now)
+                position = self.open_positions.get(symbol)
+                if position is None:
+                    continue
+                price = self._price(symbol, now)
+                rows.append({
+                    "ticket": position["ticket"],
+                    "time": pd.Timestamp(position["time"], unit="s"),
+                    "type": 1 if position["volume"] > 0 else -1,
+                    "volume": abs(position["volume"]),
+                    "price_open": position["price_open"],
+                    "sl": position["sl"],
+                    "tp": position["tp"],
+                    "price_current": price,
+                    "profit": (price - position["price_open"]) * position["volume"] * self.contract_size,
+                    "symbol": symbol,
+                })
+        return pd.DataFrame(rows, columns=POSITION_COLUMNS) if rows else pd.DataFrame()
+
+    def market_order(self, symbol, volume, buy_sell, sl_pip, tp_pip):
+        self._round_trip(self.order_latency)
+        now = self.clock()
+        pip_unit = 10 * self.point(symbol)
+        bid = self._price(symbol, now)
+        buy = buy_sell.capitalize()[0] == "B"
+        if buy:
+            price = bid + self.spread_pips * pip_unit + self.slippage_pips * pip_unit
+            sl, tp = price - sl_pip * pip_unit, price + tp_pip * pip_unit
+            signed = volume
+        else:
+            price = bid - self.slippage_pips * pip_unit
+            sl, tp = price + sl_pip * pip_unit, price - tp_pip * pip_unit
+            signed = -volume
+
+        with self.lock:
+            self._settle(symbol, now)
+            position = self.open_positions.get(symbol)
+            old = 0.0 if position is None else position["volume"]
+            new = round(old + signed, 8)
+            if position is not None and old * signed < 0:
+                closed = min(abs(old), abs(signed)) * np.sign(old)
+                self.realized += (price - position["price_open"]) * closed * self.contract_size
+            if new == 0:
+                self.open_positions.pop(symbol, None)
+            else:
+                if position is None or old * new <= 0:
+                    price_open = price
+                elif abs(new) > abs(old):
+                    price_open = (position["price_open"] * old + price * signed) / new
+                else:
+                    price_open = position["price_open"]
+                self.open_positions[symbol] = {
+                    "ticket": self.next_ticket, "time": now, "volume": new,
+                    "price_open": price_open, "sl": sl, "tp": tp,
+                }
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            fill = {"ticket": ticket, "symbol": symbol, "volume": volume, "type": "Buy" if buy else "Sell",
+                    "price": price, "time": now, "real_time": time.perf_counter()}
+            self.fills.append(fill)
+        return fill
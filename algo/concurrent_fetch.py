@@ -0,0 +1,189 @@
+"""
+Concurrent, rate-limited data fetching for universe downloads.
+
+Tickers are fetched on a thread pool with a bounded number of requests in
+flight, a token-bucket rate limit shared by all workers, retries with
+exponential backoff and a per-ticker timeout. Failures are collected per
+ticker instead of aborting the batch, so wall-clock time for a universe
+grows with len(tickers) / max_workers rather than with len(tickers).
+
+Classes:
+- TokenBucket: thread-safe token-bucket rate limiter.
+
+Functions:
+- iter_fetch(fetch, tickers, ...): yield (ticker, result, error) as each ticker finishes.
+- fetch_many(fetch, tickers, ...): fetch every ticker, returning (data, failures).
+- benchmark_fetch(n_tickers, latency): wall-clock time against a latency-injecting local provider.
+"""
+
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class TokenBucket:
+    """
+    Allow `rate` acquisitions per second on average, with bursts of up to `capacity`.
+
+    `clock` and `sleep` can be replaced to test without real waiting.
+    """
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1.0):
+        """Block until `tokens` are available, then take them."""
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_s = (tokens - self.tokens) / self.rate
+            self.sleep(wait_s)
+
+
+def iter_fetch(fetch, tickers, max_workers=8, rate_limit=None, burst=None, retries=2, backoff=0.5, timeout=None):
+    """
+    Call `fetch(ticker)` for every ticker concurrently and yield each outcome as soon as it is final.
+
+    Takes the same arguments as `fetch_many`. Yields (ticker, result, error) in completion
+    order: error is None on success, otherwise the last error message after all retries
+    (result is then None). Closing the generator early cancels the fetches not yet started.
+    """
+    limiter = TokenBucket(rate_limit, burst) if rate_limit else None
+    tickers = list(dict.fromkeys(tickers))
+    attempts = dict.fromkeys(tickers, 0)
+    started = {}
+
+    def attempt(ticker):
+        if limiter is not None:
+            limiter.acquire()
+        started[ticker] = time.monotonic()
+        return fetch(ticker)
+
+    def failed(ticker, error, ready):
+        if attempts[ticker] <= retries:
+            delay = backoff * 2 ** (attempts[ticker] - 1) * random.uniform(0.5, 1.5)
+            heapq.heappush(ready, (time.monotonic() + delay, ticker))
+            return None
+        return ticker, None, error
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    running = {}
+    ready = [(0.0, ticker) for ticker in tickers]
+    try:
+        while ready or running:
+            now = time.monotonic()
+            # Keep at most max_workers attempts in flight, so timed-out work does not pile up
+            while ready and ready[0][0] <= now and len(running) < max_workers:
+                _, ticker = heapq.heappop(ready)
+                attempts[ticker] += 1
+                started.pop(ticker, None)
+                running[executor.submit(attempt, ticker)] = ticker
+
+            wake = [ready[0][0] - now] if ready else []
+            if timeout is not None:
+                wake += [started[t] + timeout - now for t in running.values() if t in started]
+                wake.append(timeout)
+            done, _ = wait(running, timeout=max(0.0, min(wake)) if wake else None, return_when=FIRST_COMPLETED)
+
+            outcomes = []
+            for future in done:
+                ticker = running.pop(future)
+                try:
+                    outcomes.append((ticker, future.result(), None))
+                except Exception as e:
+                    outcomes.append(failed(ticker, f"{type(e).__name__}: {e}", ready))
+
+            if timeout is not None:
+                now = time.monotonic()
+                for future, ticker in list(running.items()):
+                    if ticker in started and now - started[ticker] > timeout:
+                        future.cancel()
+                        del running[future]
+                        outcomes.append(failed(ticker, f"TimeoutError: no response after {timeout}s", ready))
+
+            for outcome in outcomes:
+                if outcome is not None:
+                    yield outcome
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_many(fetch, tickers, max_workers=8, rate_limit=None, burst=None, retries=2, backoff=0.5, timeout=None):
+    """
+    Call `fetch(ticker)` for every ticker concurrently.
+
+    Args:
+        fetch (callable): downloads one ticker; raising an exception marks the attempt failed.
+        tickers (list): tickers to fetch.
+        max_workers (int): maximum number of fetches in flight.
+        rate_limit (float): maximum fetch starts per second across all workers (None = unlimited).
+        burst (int): token-bucket capacity (default: one second's worth of `rate_limit`).
+        retries (int): extra attempts after a failure or timeout.
+        backoff (float): base delay in seconds before retry n, growing as backoff * 2 ** (n - 1), with jitter.
+        timeout (float): seconds one attempt may run before it counts as failed (None = no limit).
+            A timed-out attempt cannot be interrupted; its worker stays busy until it returns.
+
+    Returns:
+        tuple: (data, failures) — data maps ticker to fetch result in input order,
+               failures maps ticker to the last error message.
+    """
+    results = {}
+    failures = {}
+    for ticker, result, error in iter_fetch(fetch, tickers, max_workers, rate_limit, burst, retries, backoff, timeout):
+        if error is None:
+            results[ticker] = result
+        else:
+            failures[ticker] = error
+
+    data = {ticker: results[ticker] for ticker in dict.fromkeys(tickers) if ticker in results}
+    return data, failures
+
+
+def benchmark_fetch(n_tickers=50, latency=0.2, worker_counts=(1, 4, 8, 16)):
+    """
+    Universe download time against a LocalFileProvider that sleeps `latency` per call.
+    """
+    import os
+    import tempfile
+
+    import pandas as pd
+
+    from price_store import LocalFileProvider
+    from synthetic_data import synthetic_ohlcv_panel
+
+    panel = synthetic_ohlcv_panel(250, n_tickers)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for j, ticker in enumerate(panel["tickers"]):
+            prices_df = pd.DataFrame(
+                {field.capitalize(): panel[field][:, j] for field in ["open", "high", "low", "close", "volume"]},
+                index=pd.DatetimeIndex(panel["dates"], name="Date"),
+            )
+            LocalFileProvider.write(os.path.join(tmp_dir, "csv"), ticker, prices_df)
+        provider = LocalFileProvider(os.path.join(tmp_dir, "csv"), latency=latency)
+        start, end = panel["dates"][0], panel["dates"][-1] + pd.Timedelta(days=1)
+
+        results = []
+        for workers in worker_counts:
+            t0 = time.perf_counter()
+            data, failures = fetch_many(lambda t: provider.fetch(t, start, end, "1d"), panel["tickers"], max_workers=workers)
+            elapsed = time.perf_counter() - t0
+            results.append({"workers": workers, "seconds": elapsed, "fetched": len(data), "failed": len(failures)})
+            print(f"{workers:>3} workers: {elapsed:6.2f}s for {len(data)} tickers "
+                  f"(serial estimate {n_tickers * latency:.1f}s)")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_fetch()
@@ -0,0 +1,290 @@
+"""
+Shared indicator dependency graph with per-run memoization.
+
+Every intermediate the strategies need (returns, true range, EMA(n), rolling
+mean/std(n), the ADX exponential averages, ...) is a named node. A node is
+computed once per price series and every later request for it is a cache hit,
+so strategies that share inputs no longer redo each other's work.
+
+Classes:
+- IndicatorGraph: memoizes node values for one price DataFrame.
+- IndicatorStats: cache hit and per-node timing counters, shareable across graphs.
+
+Nodes compute on NumPy arrays through `kernels.py` and return pandas objects
+shaped like their input (a one-column DataFrame stays a DataFrame); the price
+DataFrame itself is never modified.
+
+Functions:
+- indicator(name): decorator registering a node function in INDICATORS.
+"""
+
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+import kernels
+
+INDICATORS = {}
+
+
+def indicator(name):
+    """Register `func(graph, *params)` as the node called `name`."""
+    def register(func):
+        INDICATORS[name] = func
+        return func
+    return register
+
+
+def node_label(key):
+    """Readable label for a node key, e.g. ("rolling_mean", "close", 50) -> "rolling_mean(close, 50)"."""
+    name, params = key[0], key[1:]
+    if not params:
+        return name
+    return f"{name}({', '.join(node_label(p) if isinstance(p, tuple) else str(p) for p in params)})"
+
+
+class IndicatorStats:
+    """
+    Counts node computations, cache hits and exclusive compute time per node.
+
+    Pass one instance to several IndicatorGraph objects to aggregate a whole run.
+    """
+    def __init__(self):
+        self.nodes = {}
+
+    def record(self, key, seconds=0.0, hit=False):
+        entry = self.nodes.setdefault(node_label(key), {"computed": 0, "hits": 0, "seconds": 0.0})
+        if hit:
+            entry["hits"] += 1
+        else:
+            entry["computed"] += 1
+            entry["seconds"] += seconds
+
+    def merge(self, other):
+        """Add the counts and times of `other`, e.g. one collected in a worker process."""
+        for label, entry in other.nodes.items():
+            total = self.nodes.setdefault(label, {"computed": 0, "hits": 0, "seconds": 0.0})
+            for field, value in entry.items():
+                total[field] += value
+        return self
+
+    def report(self):
+        """
+        Per-node statistics sorted by compute time.
+
+        `saved_seconds` estimates the duplicated work the cache avoided
+        (hits times the node's mean compute time).
+        """
+        rows = []
+        for label, entry in self.nodes.items():
+            mean = entry["seconds"] / entry["computed"] if entry["computed"] else 0.0
+            rows.append({
+                "node": label,
+                "computed": entry["computed"],
+                "hits": entry["hits"],
+                "seconds": entry["seconds"],
+                "saved_seconds": entry["hits"] * mean,
+            })
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+    def summary(self):
+        rows = self.report()
+        computed = sum(row["computed"] for row in rows)
+        hits = sum(row["hits"] for row in rows)
+        seconds = sum(row["seconds"] for row in rows)
+        saved = sum(row["saved_seconds"] for row in rows)
+        lines = [f"{'node':<32}{'computed':>10}{'hits':>8}{'seconds':>10}{'saved':>10}"]
+        for row in rows:
+            lines.append(f"{row['node']:<32}{row['computed']:>10}{row['hits']:>8}"
+                         f"{row['seconds']:>10.4f}{row['saved_seconds']:>10.4f}")
+        lines.append(f"{'total':<32}{computed:>10}{hits:>8}{seconds:>10.4f}{saved:>10.4f}")
+        if seconds + saved > 0:
+            lines.append(f"duplicated work avoided: {100 * saved / (seconds + saved):.1f}% of indicator time")
+        return "\n".join(lines)
+
+
+class IndicatorGraph:
+    """
+    Lazily evaluated indicator nodes for one price DataFrame.
+
+    Usage:
+        indicators = IndicatorGraph(prices_df)
+        ema_21 = indicators.get("ema", 21)
+        ma_50 = indicators.get("rolling_mean", "close", 50)
+    """
+    def __init__(self, prices_df, stats=None):
+        self.prices_df = prices_df
+        self.stats = stats
+        self._values = {}
+        self._child_seconds = []
+
+    def get(self, name, *params):
+        """Value of node `name` with `params`, computed on first use and cached after."""
+        key = (name,) + params
+        if key in self._values:
+            if self.stats is not None:
+                self.stats.record(key, hit=True)
+            return self._values[key]
+
+        # Track time spent in dependencies so each node is charged only its own work
+        self._child_seconds.append(0.0)
+        start = time.perf_counter()
+        try:
+            value = INDICATORS[name](self, *params)
+        finally:
+            elapsed = time.perf_counter() - start
+            child_seconds = self._child_seconds.pop()
+            if self._child_seconds:
+                self._child_seconds[-1] += elapsed
+        self._values[key] = value
+        if self.stats is not None:
+            self.stats.record(key, seconds=elapsed - child_seconds)
+        return value
+
+    def source(self, source):
+        """Resolve a node input given either as a node name or a full (name, *params) key."""
+        if isinstance(source, tuple):
+            return self.get(*source)
+        return self.get(source)
+
+
+def _as_series(values):
+    # Single-ticker yfinance frames hold each price field as a one-column DataFrame
+    if isinstance(values, pd.DataFrame):
+        return values.iloc[:, 0]
+    return values
+
+
+##### Price Columns #####
+@indicator("close")
+def _close(graph):
+    return graph.prices_df["close"]
+
+
+@indicator("high")
+def _high(graph):
+    return graph.prices_df["high"]
+
+
+@indicator("low")
+def _low(graph):
+    return graph.prices_df["low"]
+
+
+@indicator("volume")
+def _volume(graph):
+    return graph.prices_df["volume"]
+
+
+def _like(source, kernel, *args, **kwargs):
+    """Run `kernel` on every column of `source` and wrap the result like `source`."""
+    if isinstance(source, pd.DataFrame):
+        dtype = np.float32 if (source.dtypes == np.float32).all() else np.float64
+        values = np.empty(source.shape, dtype=dtype, order="F")
+        for j in range(source.shape[1]):
+            kernel(source.iloc[:, j], *args, out=values[:, j], **kwargs)
+        return pd.DataFrame(values, index=source.index, columns=source.columns)
+    return pd.Series(kernel(source, *args, **kwargs), index=source.index, name=source.name)
+
+
+##### Generic Nodes #####
+@indicator("returns")
+def _returns(graph):
+    return graph.get("close").pct_change()
+
+
+@indicator("rolling_mean")
+def _rolling_mean(graph, source, window):
+    return _like(graph.source(source), kernels.rolling_mean, window)
+
+
+@indicator("rolling_std")
+def _rolling_std(graph, source, window):
+    return _like(graph.source(source), kernels.rolling_std, window)
+
+
+@indicator("rolling_sum")
+def _rolling_sum(graph, source, window):
+    return _like(graph.source(source), kernels.rolling_sum, window)
+
+
+@indicator("ema")
+def _ema(graph, window):
+    return _like(graph.get("close"), kernels.ewm_mean, window, adjust=False)
+
+
+@indicator("ewm_mean")
+def _ewm_mean(graph, source, span):
+    # The smoothing calculate_adx applies to the true range and directional movement
+    return _like(graph.source(source), kernels.ewm_mean, span)
+
+
+##### Range and Directional Movement #####
+@indicator("true_range")
+def _true_range(graph):
+    high = _as_series(graph.get("high"))
+    return pd.Series(kernels.true_range(high, graph.get("low"), graph.get("close")), index=high.index)
+
+
+@indicator("directional_movement")
+def _directional_movement(graph):
+    return kernels.directional_movement(graph.get("high"), graph.get("low"))
+
+
+@indicator("plus_dm")
+def _plus_dm(graph):
+    return pd.Series(graph.get("directional_movement")[0], index=graph.prices_df.index)
+
+
+@indicator("minus_dm")
+def _minus_dm(graph):
+    return pd.Series(graph.get("directional_movement")[1], index=graph.prices_df.index)
+
+
+@indicator("dmi")
+def _dmi(graph, period):
+    adx, plus_di, minus_di = kernels.directional_index(
+        graph.get("ewm_mean", "true_range", period),
+        graph.get("ewm_mean", "plus_dm", period),
+        graph.get("ewm_mean", "minus_dm", period),
+        period,
+    )
+    return pd.DataFrame({"adx": adx, "+di": plus_di, "-di": minus_di}, index=graph.prices_df.index)
+
+
+@indicator("atr")
+def _atr(graph, window):
+    return graph.get("rolling_mean", "true_range", window)
+
+
+##### Oscillators #####
+@indicator("delta")
+def _delta(graph):
+    return graph.get("close").diff()
+
+
+@indicator("gain")
+def _gain(graph):
+    delta = graph.get("delta")
+    return (delta.where(delta > 0, 0)).fillna(0)
+
+
+@indicator("loss")
+def _loss(graph):
+    delta = graph.get("delta")
+    return (-delta.where(delta < 0, 0)).fillna(0)
+
+
+@indicator("rsi")
+def _rsi(graph, window):
+    avg_gain = graph.get("rolling_mean", "gain", window)
+    avg_loss = graph.get("rolling_mean", "loss", window)
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+@indicator("hist_vol")
+def _hist_vol(graph, window):
+    return graph.get("rolling_std", "returns", window) * math.sqrt(252)
@@ -0,0 +1,316 @@
+"""
+Per-stage timing, counters and optional profiling for the technical analyst.
+
+`Instrumentation.timer(stage, ticker)` is a context manager that adds the
+wall time of the block to the (stage, ticker) entry; `count(name)` increments
+a counter. With `trace_memory=True` every timed block also records its peak
+traced memory above the level at its start (tracemalloc), and with
+`profile=True` the whole run is captured by cProfile. A disabled instance
+(`Instrumentation(enabled=False)`, the module-level `NULL`) makes every call
+a no-op, so instrumented code needs no branches.
+
+cProfile only follows the thread that called `start()`; blocks run on other
+threads are captured with `profile_thread()`. An instance pickled to a worker
+process comes back as a snapshot (stages, counters, profile data) that
+`merge()` adds to the parent's.
+
+Results are available as a per-stage summary, a JSON document or a
+Prometheus text exposition snapshot.
+
+Classes:
+- Instrumentation: timers, counters, tracemalloc peaks and cProfile capture for one run.
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+
+PROMETHEUS_PREFIX = "technical_agent"
+
+
+class Instrumentation:
+    """
+    Collect stage timings and counters for one run.
+
+    Args:
+        enabled (bool): False turns every call into a no-op.
+        trace_memory (bool): record the peak traced memory of every timed block.
+        profile (bool): capture the run with cProfile between `start()` and `stop()`.
+
+    Usage:
+        instrument = Instrumentation(trace_memory=True)
+        instrument.start()
+        try:
+            with instrument.timer("fetch", "TCS.NS"):
+                ...
+            instrument.count("tickers_analyzed")
+        finally:
+            instrument.stop()
+        print(instrument.summary())
+        instrument.write("run.prom")
+
+    Timers may nest and may run on several threads. Memory peaks are process-wide,
+    so blocks that overlap in time (concurrent fetches) include each other's
+    allocations.
+    """
+    def __init__(self, enabled=True, trace_memory=False, profile=False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.profile = profile and enabled
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stages = {}
+        self.counters = {}
+        self.profiler = None
+        self.profiled_thread = None
+        self.thread_profiles = []
+        self.started_tracemalloc = False
+        self.started = None
+        self.seconds = None
+
+    def start(self):
+        """Start the run clock and, if enabled, tracemalloc and cProfile."""
+        if not self.enabled:
+            return self
+        self.started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiled_thread = threading.get_ident()
+            self.profiler.enable()
+        return self
+
+    def stop(self):
+        if not self.enabled or self.started is None:
+            return self
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.create_stats()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def __getstate__(self):
+        # Locks and the live profiler stay behind; the profile travels as raw pstats data
+        state = {key: value for key, value in self.__dict__.items() if key not in ("lock", "local", "profiler")}
+        state["profiler"] = None
+        if self.profiler is not None and hasattr(self.profiler, "stats"):
+            state["thread_profiles"] = self.thread_profiles + [self.profiler.stats]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def profile_thread(self):
+        """Capture the block with cProfile if profiling is on and it runs off the `start()` thread."""
+        if self.profiler is None or threading.get_ident() == self.profiled_thread:
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ profiles through sys.monitoring, which already covers every thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.create_stats()
+            with self.lock:
+                self.thread_profiles.append(profiler.stats)
+
+    def merge(self, other):
+        """Add the stages, counters and profile data of `other`, e.g. a snapshot from a worker process."""
+        if not self.enabled:
+            return self
+        with self.lock:
+            for key, entry in other.stages.items():
+                total = self.stages.setdefault(key, dict(entry, calls=0, errors=0, seconds=0.0, max_seconds=0.0))
+                total["calls"] += entry["calls"]
+                total["errors"] += entry["errors"]
+                total["seconds"] += entry["seconds"]
+                total["max_seconds"] = max(total["max_seconds"], entry["max_seconds"])
+                if entry["peak_bytes"] is not None:
+                    total["peak_bytes"] = max(total["peak_bytes"] or 0, entry["peak_bytes"])
+            for name, value in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.thread_profiles.extend(other.thread_profiles)
+        return self
+
+    def _entry(self, stage, ticker):
+        return self.stages.setdefault((stage, ticker), {
+            "calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "peak_bytes": None,
+        })
+
+    @contextlib.contextmanager
+    def timer(self, stage, ticker=None):
+        """Time the block as `stage` (optionally for one `ticker`); exceptions are counted and re-raised."""
+        if not self.enabled:
+            yield
+            return
+        memory = self.trace_memory and tracemalloc.is_tracing()
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # Keep the enclosing block's peak before resetting it for this one
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            stack.append([current, current])
+        failed = False
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            seconds = time.perf_counter() - t0
+            peak_bytes = None
+            if memory:
+                start_bytes, seen = stack.pop()
+                peak = max(seen, tracemalloc.get_traced_memory()[1])
+                peak_bytes = peak - start_bytes
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+                tracemalloc.reset_peak()
+            with self.lock:
+                entry = self._entry(stage, ticker)
+                entry["calls"] += 1
+                entry["errors"] += failed
+                entry["seconds"] += seconds
+                entry["max_seconds"] = max(entry["max_seconds"], seconds)
+                if peak_bytes is not None:
+                    entry["peak_bytes"] = max(entry["peak_bytes"] or 0, peak_bytes)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary_rows(self):
+        """Stages aggregated over tickers, slowest first."""
+        totals = {}
+        for (stage, ticker), entry in self.stages.items():
+            total = totals.setdefault(stage, {"stage": stage, "tickers": 0, "calls": 0, "errors": 0,
+                                              "seconds": 0.0, "max_seconds": 0.0, "peak_bytes": None})
+            total["tickers"] += ticker is not None
+            total["calls"] += entry["calls"]
+            total["errors"] += entry["errors"]
+            total["seconds"] += entry["seconds"]
+            total["max_seconds"] = max(total["max_seconds"], entry["max_seconds"])
+            if entry["peak_bytes"] is not None:
+                total["peak_bytes"] = max(total["peak_bytes"] or 0, entry["peak_bytes"])
+        return sorted(totals.values(), key=lambda row: row["seconds"], reverse=True)
+
+    def summary(self):
+        lines = [f"{'stage':<24}{'calls':>8}{'errors':>8}{'seconds':>10}{'mean ms':>10}{'max ms':>10}{'peak MiB':>10}"]
+        for row in self.summary_rows():
+            peak = "" if row["peak_bytes"] is None else f"{row['peak_bytes'] / 2**20:.2f}"
+            lines.append(f"{row['stage']:<24}{row['calls']:>8}{row['errors']:>8}{row['seconds']:>10.3f}"
+                         f"{row['seconds'] / row['calls'] * 1e3:>10.2f}{row['max_seconds'] * 1e3:>10.2f}{peak:>10}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name}: {value}")
+        if self.seconds is not None:
+            lines.append(f"run: {self.seconds:.3f}s")
+        return "\n".join(lines)
+
+    def profile_rows(self, limit=25, sort="cumulative"):
+        """Top functions of the cProfile capture, other threads and merged workers included, as dicts."""
+        if self.profiler is None and not self.thread_profiles:
+            return []
+        stats = pstats.Stats(stream=io.StringIO())
+        for profile_data in ([self.profiler] if self.profiler is not None else []) + self.thread_profiles:
+            stats.add(profile_data if isinstance(profile_data, cProfile.Profile) else _ProfileData(profile_data))
+        stats.sort_stats(sort)
+        rows = []
+        for func in stats.fcn_list[:limit]:
+            calls, primitive, tottime, cumtime, _ = stats.stats[func]
+            filename, line, name = func
+            rows.append({"function": f"{filename}:{line}({name})", "calls": calls,
+                         "tottime": tottime, "cumtime": cumtime})
+        return rows
+
+    def to_dict(self):
+        return {
+            "seconds": self.seconds,
+            "counters": dict(self.counters),
+            "stages": self.summary_rows(),
+            "tickers": [
+                {"stage": stage, "ticker": ticker, **entry}
+                for (stage, ticker), entry in sorted(self.stages.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            ],
+            "profile": self.profile_rows(),
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """Prometheus text exposition format snapshot of the stage entries and counters."""
+        def quote(value):
+            return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+        def labels(stage, ticker):
+            text = f"stage={quote(stage)}"
+            return text if ticker is None else text + f",ticker={quote(ticker)}"
+
+        metrics = [
+            ("stage_seconds_total", "counter", "Wall time spent in the stage.", "seconds"),
+            ("stage_calls_total", "counter", "Times the stage ran.", "calls"),
+            ("stage_errors_total", "counter", "Times the stage raised.", "errors"),
+            ("stage_max_seconds", "gauge", "Longest single run of the stage.", "max_seconds"),
+            ("stage_peak_bytes", "gauge", "Peak traced memory above the stage's starting level.", "peak_bytes"),
+        ]
+        lines = []
+        for name, kind, help_text, field in metrics:
+            samples = [(key, entry[field]) for key, entry in self.stages.items() if entry[field] is not None]
+            if not samples:
+                continue
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for (stage, ticker), value in samples:
+                lines.append(f"{prefix}_{name}{{{labels(stage, ticker)}}} {value}")
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{counter}_total counter")
+            lines.append(f"{prefix}_{counter}_total {value}")
+        if self.seconds is not None:
+            lines.append(f"# TYPE {prefix}_run_seconds gauge")
+            lines.append(f"{prefix}_run_seconds {self.seconds}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the snapshot to `path`: Prometheus text for .prom/.txt files, JSON otherwise."""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json(indent=1)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+
+class _ProfileData:
+    """Raw pstats data (a profiler's `stats` dict) in the form pstats.Stats loads."""
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+NULL = Instrumentation(enabled=False)
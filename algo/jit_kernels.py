@@ -0,0 +1,244 @@
+"""
+Numba-compiled loops for the sequential indicator recursions.
+
+Exponential smoothing (EMA with min_periods, Wilder smoothing), the ADX
+pipeline, the Renko band walk and the consecutive-brick counter are
+recursions over the bars. `kernels.py` and `renko.py` evaluate them with
+blocked array operations; when Numba is installed they call the loops here
+instead, which run each recursion in a single compiled pass. Compiled code is
+cached on disk (`cache=True`), so only the first run after a change pays the
+compile time, and nothing is compiled at import.
+
+Without Numba the functions below are plain Python: `kernels.py` still uses
+`ewm_loop` for the rare series with interior gaps, everything else falls back
+to the NumPy paths. Set `jit_kernels.ENABLED = False` to force the fallback.
+
+Functions:
+- ewm_loop(x, alpha, adjust, min_periods, out): pandas' ewm mean recurrence.
+- adx_loop(high, low, close, period, out): (3, n) ADX, +DI, -DI in one pass.
+- band_walk(lo, hi, out): Renko band top after each bar, clamped into [lo, hi].
+- consecutive_loop(uptrend, out): signed run-length counts of brick directions.
+- benchmark_jit(n_bars): per-call time of the compiled loops, the NumPy fallback and pandas.
+"""
+
+import math
+import time
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAVE_NUMBA = numba is not None
+ENABLED = HAVE_NUMBA
+
+
+def _jit(func):
+    if numba is None:
+        return func
+    return numba.njit(cache=True, nogil=True)(func)
+
+
+@_jit
+def ewm_loop(x, alpha, adjust, min_periods, out):
+    """`ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean()` (ignore_na=False) into out."""
+    decay = 1.0 - alpha
+    new_weight = 1.0 if adjust else alpha
+    min_obs = max(min_periods, 1)
+    weighted = math.nan
+    old_weight = 1.0
+    observations = 0
+    for i in range(x.shape[0]):
+        cur = x[i]
+        observed = cur == cur
+        if observed:
+            observations += 1
+        if weighted == weighted:
+            old_weight *= decay
+            if observed:
+                if weighted != cur:
+                    weighted = (old_weight * weighted + new_weight * cur) / (old_weight + new_weight)
+                if adjust:
+                    old_weight += new_weight
+                else:
+                    old_weight = 1.0
+        elif observed:
+            weighted = cur
+        out[i] = weighted if observations >= min_obs else math.nan
+    return out
+
+
+@_jit
+def _adjusted_step(weighted, old_weight, cur, decay):
+    # One step of ewm_loop with adjust=True
+    if weighted == weighted:
+        old_weight *= decay
+        if cur == cur:
+            if weighted != cur:
+                weighted = (old_weight * weighted + cur) / (old_weight + 1.0)
+            old_weight += 1.0
+    elif cur == cur:
+        weighted = cur
+    return weighted, old_weight
+
+
+@_jit
+def _fmax(a, b):
+    if a != a:
+        return b
+    if b != b:
+        return a
+    return a if a > b else b
+
+
+@_jit
+def adx_loop(high, low, close, period, out):
+    """Rows ADX, +DI, -DI as `kernels.adx` computes them, without intermediate arrays."""
+    decay = 1.0 - 2.0 / (period + 1.0)
+    tr_avg, tr_weight = math.nan, 1.0
+    plus_avg, plus_weight = math.nan, 1.0
+    minus_avg, minus_weight = math.nan, 1.0
+    adx, adx_weight = math.nan, 1.0
+    for i in range(high.shape[0]):
+        tr = high[i] - low[i]
+        plus_dm = 0.0
+        minus_dm = 0.0
+        if i > 0:
+            tr = _fmax(_fmax(tr, abs(high[i] - close[i - 1])), abs(low[i] - close[i - 1]))
+            up = high[i] - high[i - 1]
+            down = low[i - 1] - low[i]
+            if up > down and up > 0:
+                plus_dm = up
+            if down > up and down > 0:
+                minus_dm = down
+        tr_avg, tr_weight = _adjusted_step(tr_avg, tr_weight, tr, decay)
+        plus_avg, plus_weight = _adjusted_step(plus_avg, plus_weight, plus_dm, decay)
+        minus_avg, minus_weight = _adjusted_step(minus_avg, minus_weight, minus_dm, decay)
+
+        plus_di = math.nan
+        minus_di = math.nan
+        if tr_avg == tr_avg and plus_avg == plus_avg and minus_avg == minus_avg:
+            if tr_avg != 0.0:
+                plus_di = 100.0 * (plus_avg / tr_avg)
+                minus_di = 100.0 * (minus_avg / tr_avg)
+            else:
+                # x / 0 as NumPy evaluates it
+                plus_di = math.nan if plus_avg == 0.0 else math.copysign(math.inf, plus_avg)
+                minus_di = math.nan if minus_avg == 0.0 else math.copysign(math.inf, minus_avg)
+        total = plus_di + minus_di
+        dx = math.nan
+        if total == total and total != 0.0 and not math.isinf(total):
+            dx = 100.0 * abs(plus_di - minus_di) / total
+        adx, adx_weight = _adjusted_step(adx, adx_weight, dx, decay)
+        out[0, i] = adx
+        out[1, i] = plus_di
+        out[2, i] = minus_di
+    return out
+
+
+@_jit
+def band_walk(lo, hi, out):
+    """out[i] = clip(out[i - 1], lo[i], hi[i]) starting from 0, as `renko._clamp_scan` composes it."""
+    top = 0
+    for i in range(lo.shape[0]):
+        if top < lo[i]:
+            top = lo[i]
+        if top > hi[i]:
+            top = hi[i]
+        out[i] = top
+    return out
+
+
+@_jit
+def consecutive_loop(uptrend, out):
+    """1, 2, 3 for successive up bricks, -1, -2 for down bricks, restarting at every reversal."""
+    run = 0
+    for i in range(uptrend.shape[0]):
+        if uptrend[i]:
+            run = run + 1 if run > 0 else 1
+        else:
+            run = run - 1 if run < 0 else -1
+        out[i] = run
+    return out
+
+
+def benchmark_jit(n_bars=1_000_000, repeat=3, seed=0):
+    """
+    Per-call time on `n_bars`-bar series: the compiled loops (first call, which
+    includes compiling or loading the disk cache, and the best of `repeat` later
+    calls), the NumPy fallback and the pandas expression each kernel replaces.
+    """
+    import pandas as pd
+
+    # The flag is toggled on the module kernels.py and renko.py read: under
+    # `python jit_kernels.py` this file runs as __main__, a separate copy
+    import jit_kernels
+    import kernels
+    import renko
+
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 3e-4, n_bars)))
+    high = close + np.abs(rng.normal(0, 2e-4, n_bars))
+    low = close - np.abs(rng.normal(0, 2e-4, n_bars))
+    frame = pd.DataFrame({"high": high, "low": low, "close": close})
+    brick_size = renko.atr_brick_size(high, low, close, 120)
+    uptrend = rng.uniform(size=n_bars) < 0.5
+    dates = np.arange(n_bars)
+
+    cases = {
+        "ema(26, min_periods)": (lambda: kernels.ewm_mean(close, 26, min_periods=26),
+                                 lambda: frame["close"].ewm(span=26, min_periods=26).mean()),
+        "wilder_smoothing(14)": (lambda: kernels.wilder_smoothing(close, 14),
+                                 lambda: frame["close"].ewm(alpha=1 / 14, adjust=False).mean()),
+        "adx(14)": (lambda: kernels.adx(high, low, close, 14),
+                    lambda: kernels._legacy_adx(frame.copy(), 14)),
+        "renko_bricks": (lambda: renko.renko_bricks(dates, close, brick_size), None),
+        "consecutive_bricks": (lambda: renko.consecutive_bricks(uptrend), None),
+    }
+
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    def ms(value):
+        return "-" if value is None else f"{value * 1e3:.1f} ms"
+
+    print(f"{n_bars} bars, numba {'installed' if HAVE_NUMBA else 'not installed'}")
+    print(f"{'kernel':<24}{'first call':>12}{'compiled':>12}{'numpy':>12}{'pandas':>12}{'speedup':>10}")
+    results = []
+    enabled = jit_kernels.ENABLED
+    try:
+        for name, (fn, pandas_fn) in cases.items():
+            row = {"kernel": name, "first_call_s": None, "jit_s": None, "numpy_s": None, "pandas_s": None}
+            jit_kernels.ENABLED = False
+            row["numpy_s"] = best(fn)
+            if HAVE_NUMBA:
+                jit_kernels.ENABLED = True
+                t0 = time.perf_counter()
+                fn()
+                row["first_call_s"] = time.perf_counter() - t0
+                row["jit_s"] = best(fn)
+            if pandas_fn is not None:
+                row["pandas_s"] = best(pandas_fn)
+            # Against pandas where the kernel replaced a pandas expression, else against the NumPy path
+            baseline = row["pandas_s"] if row["pandas_s"] is not None else row["numpy_s"]
+            fastest = row["jit_s"] if row["jit_s"] is not None else row["numpy_s"]
+            compared = row["jit_s"] is not None or row["pandas_s"] is not None
+            row["speedup"] = baseline / fastest if compared else None
+            results.append(row)
+            speedup = "-" if row["speedup"] is None else f"{row['speedup']:.1f}x"
+            print(f"{name:<24}{ms(row['first_call_s']):>12}{ms(row['jit_s']):>12}{ms(row['numpy_s']):>12}"
+                  f"{ms(row['pandas_s']):>12}{speedup:>10}")
+    finally:
+        jit_kernels.ENABLED = enabled
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_jit()
@@ -0,0 +1,403 @@
+"""
+Array kernels behind the pandas indicator functions.
+
+Every kernel takes 1-D price arrays (or Series / one-column DataFrames, which
+are read without copying when they already hold contiguous float64 or float32
+values), never modifies its inputs, and writes its result into `out` when a
+preallocated buffer of the right shape and dtype is passed. float32 inputs
+stay float32; anything else is computed in float64. Results match the pandas
+expressions the strategies were written with (`rolling(n).mean()`,
+`ewm(span=n, adjust=...).mean()`, the true range, ADX, ...), NaN handling
+included, to floating-point rounding.
+
+Exponential averages are first-order linear recurrences; they are evaluated
+in blocks with one cumulative sum per block and a short scalar pass for the
+carry between blocks. Rolling windows use cumulative sums over segments of
+`SEGMENT` bars, centred on each segment's mean, so the rounding error does not
+grow with the length of the series. When Numba is installed the exponential
+averages and ADX run as compiled loops from `jit_kernels.py` instead.
+
+Functions:
+- as_array(values): contiguous float array view of a Series, DataFrame column or array.
+- true_range(high, low, close, out): true range; the first bar falls back to high - low.
+- directional_movement(high, low, out): (2, n) +DM and -DM rows.
+- rolling_sum(values, window, out) / rolling_mean / rolling_std: fixed-window statistics.
+- ewm_mean(values, span, min_periods, adjust, out): exponentially weighted mean.
+- wilder_smoothing(values, period, out): Wilder's running average (alpha = 1 / period).
+- directional_index(tr_avg, plus_dm_avg, minus_dm_avg, period, out): (3, n) ADX, +DI, -DI rows from smoothed inputs.
+- adx(high, low, close, period, out): (3, n) ADX, +DI, -DI rows.
+- atr(high, low, close, window, out): average true range.
+- benchmark_kernels(n_tickers, n_bars): per-ticker time and peak memory against the pandas versions.
+"""
+
+import math
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import jit_kernels
+
+# Bars per cumulative-sum segment of the rolling kernels
+SEGMENT = 1024
+# Exponential blocks are sized so that decay ** -block stays below e ** _GROWTH
+_GROWTH = 30.0
+
+
+def as_array(values):
+    """Contiguous 1-D float32/float64 array of `values`, without a copy when possible."""
+    if isinstance(values, pd.DataFrame):
+        values = values.iloc[:, 0]
+    if isinstance(values, pd.Series):
+        values = values.to_numpy()
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        values = values.astype(np.float64, copy=False)
+    return np.ascontiguousarray(values)
+
+
+def _output(out, shape, dtype):
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape or out.dtype != dtype:
+        raise ValueError(f"out has shape {out.shape} and dtype {out.dtype}, expected {shape} and {dtype}")
+    return out
+
+
+def _dtype(*arrays):
+    return np.float32 if all(a.dtype == np.float32 for a in arrays) else np.float64
+
+
+##### Range and Directional Movement #####
+def true_range(high, low, close, out=None):
+    """max(high - low, |high - previous close|, |low - previous close|), skipping NaN terms."""
+    high, low, close = as_array(high), as_array(low), as_array(close)
+    out = _output(out, high.shape, _dtype(high, low, close))
+    np.subtract(high, low, out=out)
+    if len(out) > 1:
+        gap = np.subtract(high[1:], close[:-1])
+        np.fmax(out[1:], np.abs(gap, out=gap), out=out[1:])
+        np.subtract(low[1:], close[:-1], out=gap)
+        np.fmax(out[1:], np.abs(gap, out=gap), out=out[1:])
+    return out
+
+
+def directional_movement(high, low, out=None):
+    """Rows +DM and -DM; a bar whose move is not the larger positive one (or is NaN) counts 0."""
+    high, low = as_array(high), as_array(low)
+    out = _output(out, (2,) + high.shape, _dtype(high, low))
+    out.fill(0.0)
+    if len(high) > 1:
+        up = np.subtract(high[1:], high[:-1])
+        down = np.subtract(low[:-1], low[1:])
+        with np.errstate(invalid="ignore"):
+            np.copyto(out[0, 1:], up, where=(up > down) & (up > 0))
+            np.copyto(out[1, 1:], down, where=(down > up) & (down > 0))
+    return out
+
+
+##### Rolling Windows #####
+def _window_std(chunk, window, rows):
+    """Two-pass (n - 1) * variance of the windows of `chunk` starting at `rows`."""
+    windows = np.lib.stride_tricks.sliding_window_view(chunk, window)
+    result = np.empty(len(rows), dtype=chunk.dtype)
+    step = max(1, 2**20 // window)
+    for i in range(0, len(rows), step):
+        block = windows[rows[i:i + step]]
+        block = block - block.mean(axis=1, keepdims=True)
+        result[i:i + step] = np.einsum("ij,ij->i", block, block)
+    return result
+
+
+def _rolling(x, window, out, kind):
+    n = len(x)
+    out[:min(window - 1, n)] = np.nan
+    if n < window:
+        return out
+    missing = np.isnan(x)
+    has_nan = missing.any()
+    per_segment = min(n - window + 1, max(SEGMENT, window))
+    size = per_segment + window
+    sums = np.empty(size, dtype=x.dtype)
+    squares = np.empty(size, dtype=x.dtype) if kind == "std" else None
+    counts = np.empty(size, dtype=np.int64) if has_nan else None
+    spare = np.empty(per_segment, dtype=x.dtype) if kind == "std" else None
+
+    # Windows ending at rows start..stop-1 need rows start-window+1..stop-1
+    for start in range(window - 1, n, per_segment):
+        stop = min(start + per_segment, n)
+        chunk = x[start - window + 1:stop]
+        m, k = len(chunk), stop - start
+        if has_nan:
+            valid = m - np.count_nonzero(missing[start - window + 1:stop])
+            ref = np.nansum(chunk) / valid if valid else 0.0
+        else:
+            ref = chunk.mean()
+
+        sums[0] = 0.0
+        np.subtract(chunk, ref, out=sums[1:m + 1])
+        if has_nan:
+            sums[1:m + 1][missing[start - window + 1:stop]] = 0.0
+        if squares is not None:
+            squares[0] = 0.0
+            np.multiply(sums[1:m + 1], sums[1:m + 1], out=squares[1:m + 1])
+            np.cumsum(squares[:m + 1], out=squares[:m + 1])
+        np.cumsum(sums[:m + 1], out=sums[:m + 1])
+
+        result = out[start:stop]
+        np.subtract(sums[window:window + k], sums[:k], out=result)
+        if kind == "sum":
+            result += ref * window
+        elif kind == "mean":
+            result /= window
+            result += ref
+        else:
+            second = spare[:k]
+            np.subtract(squares[window:window + k], squares[:k], out=second)
+            np.multiply(result, result, out=result)
+            result /= window
+            np.subtract(second, result, out=result)
+            # The sums are centred on the segment's mean, not the window's: where a window sits
+            # far from it, cancellation can leave less than 1e-6 relative precision, so those
+            # windows are recomputed around their own mean
+            bound = 1e6 * m * np.finfo(x.dtype).eps * squares[m]
+            uncertain = np.flatnonzero(result < bound)
+            if len(uncertain):
+                result[uncertain] = _window_std(chunk, window, uncertain)
+            result /= window - 1
+            np.maximum(result, 0.0, out=result)
+            np.sqrt(result, out=result)
+        if kind != "sum":
+            # Like pandas, a window of identical values has exactly that mean and zero deviation
+            same = np.empty(m, dtype=np.int64)
+            same[0] = 0
+            np.cumsum(chunk[1:] != chunk[:-1], out=same[1:])
+            flat = np.flatnonzero(same[window - 1:] == same[:k])
+            if len(flat):
+                result[flat] = 0.0 if kind == "std" else chunk[window - 1:][flat]
+        if has_nan:
+            counts[0] = 0
+            np.cumsum(~missing[start - window + 1:stop], out=counts[1:m + 1])
+            result[counts[window:window + k] - counts[:k] < window] = np.nan
+    return out
+
+
+def rolling_sum(values, window, out=None):
+    """`rolling(window).sum()`: NaN unless the whole window is present."""
+    x = as_array(values)
+    return _rolling(x, window, _output(out, x.shape, x.dtype), "sum")
+
+
+def rolling_mean(values, window, out=None):
+    """`rolling(window).mean()`."""
+    x = as_array(values)
+    return _rolling(x, window, _output(out, x.shape, x.dtype), "mean")
+
+
+def rolling_std(values, window, out=None):
+    """`rolling(window).std()` (sample standard deviation)."""
+    x = as_array(values)
+    return _rolling(x, window, _output(out, x.shape, x.dtype), "std")
+
+
+##### Exponential Averages #####
+def _recurrence(x, a, out):
+    """out[t] = a * out[t - 1] + x[t] with out[-1] = 0, for NaN-free x; out may be x."""
+    n = len(x)
+    if n == 0:
+        return out
+    block = max(1, min(n, int(_GROWTH / -math.log(a))))
+    powers = a ** np.arange(block, dtype=out.dtype)
+    scale = 1.0 / powers
+    full = n - n % block
+    carry = 0.0
+    parts = [(x[:full].reshape(-1, block), out[:full].reshape(-1, block))] if full else []
+    if full < n:
+        parts.append((x[full:].reshape(1, -1), out[full:].reshape(1, -1)))
+    for src, dst in parts:
+        m = dst.shape[1]
+        # Each block's own contribution to its last value, then the carry into every block
+        ends = (src @ powers[m - 1::-1]).tolist()
+        carries = np.empty(len(ends), dtype=out.dtype)
+        a_m = a ** m
+        for i, end in enumerate(ends):
+            carries[i] = carry
+            carry = end + a_m * carry
+        np.multiply(src, scale[:m], out=dst)
+        dst[:, 0] += a * carries
+        np.cumsum(dst, axis=1, out=dst)
+        dst *= powers[:m]
+    return out
+
+
+def ewm_mean(values, span, min_periods=0, adjust=True, out=None):
+    """`ewm(span=span, min_periods=min_periods, adjust=adjust).mean()`."""
+    x = as_array(values)
+    out = _output(out, x.shape, x.dtype)
+    n = len(x)
+    if n == 0:
+        return out
+    alpha = 2.0 / (span + 1.0)
+    if jit_kernels.ENABLED:
+        return jit_kernels.ewm_loop(x, alpha, adjust, min_periods, out)
+    decay = 1.0 - alpha
+    present = ~np.isnan(x)
+    first = int(np.argmax(present)) if present.any() else n
+
+    if first == n:
+        out.fill(np.nan)
+        return out
+    if not present[first:].all():
+        # Interior gaps reweight the history; the plain recurrence handles them
+        return jit_kernels.ewm_loop(x, alpha, adjust, min_periods, out)
+    if decay == 0.0:
+        # span=1: the history has no weight and the average is the input itself
+        out[first:] = x[first:]
+    elif adjust:
+        _recurrence(x[first:], decay, out[first:])
+        # Divide by the sum of the weights, (1 - decay ** (t + 1)) / alpha, which is
+        # 1 / alpha to machine precision once decay ** (t + 1) < eps
+        settled = min(n - first, int(math.log(np.finfo(x.dtype).eps) / math.log(decay)) + 1)
+        weights = 1.0 - decay ** np.arange(1, settled + 1, dtype=x.dtype)
+        out[first:first + settled] *= alpha / weights
+        out[first + settled:] *= alpha
+    else:
+        np.multiply(x[first:], alpha, out=out[first:])
+        out[first] = x[first]
+        _recurrence(out[first:], decay, out[first:])
+    out[:first] = np.nan
+    if min_periods > 1:
+        out[np.cumsum(present) < min_periods] = np.nan
+    return out
+
+
+def wilder_smoothing(values, period, out=None):
+    """Wilder's smoothing, `ewm(alpha=1 / period, adjust=False).mean()`."""
+    return ewm_mean(values, 2 * period - 1, adjust=False, out=out)
+
+
+##### Composite Indicators #####
+def directional_index(tr_avg, plus_dm_avg, minus_dm_avg, period=14, out=None):
+    """Rows ADX, +DI, -DI from the smoothed true range and directional movement."""
+    tr_avg, plus_dm_avg, minus_dm_avg = as_array(tr_avg), as_array(plus_dm_avg), as_array(minus_dm_avg)
+    out = _output(out, (3,) + tr_avg.shape, _dtype(tr_avg, plus_dm_avg, minus_dm_avg))
+    adx_row, plus_di, minus_di = out
+    dx = np.empty_like(adx_row)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(plus_dm_avg, tr_avg, out=plus_di)
+        plus_di *= 100
+        np.divide(minus_dm_avg, tr_avg, out=minus_di)
+        minus_di *= 100
+        np.subtract(plus_di, minus_di, out=dx)
+        np.abs(dx, out=dx)
+        dx *= 100
+        np.add(plus_di, minus_di, out=adx_row)
+        np.divide(dx, adx_row, out=dx)
+    ewm_mean(dx, period, out=adx_row)
+    return out
+
+
+def adx(high, low, close, period=14, out=None):
+    """Rows ADX, +DI, -DI as `calculate_adx` computes them."""
+    if jit_kernels.ENABLED:
+        high, low, close = as_array(high), as_array(low), as_array(close)
+        out = _output(out, (3,) + high.shape, _dtype(high, low, close))
+        return jit_kernels.adx_loop(high, low, close, period, out)
+    tr = true_range(high, low, close)
+    dm = directional_movement(high, low)
+    ewm_mean(tr, period, out=tr)
+    ewm_mean(dm[0], period, out=dm[0])
+    ewm_mean(dm[1], period, out=dm[1])
+    return directional_index(tr, dm[0], dm[1], period, out=out)
+
+
+def atr(high, low, close, window=14, out=None):
+    """`rolling(window).mean()` of the true range."""
+    tr = true_range(high, low, close)
+    return _rolling(tr, window, _output(out, tr.shape, tr.dtype), "mean")
+
+
+##### Benchmark #####
+def _legacy_adx(prices_df, period=14):
+    # calculate_adx as it stood before the kernels, scratch columns written into the frame
+    prices_df["high_low"] = prices_df["high"] - prices_df["low"]
+    prices_df["high_close"] = abs(prices_df["high"] - prices_df["close"].shift())
+    prices_df["low_close"] = abs(prices_df["low"] - prices_df["close"].shift())
+    prices_df["tr"] = prices_df[["high_low", "high_close", "low_close"]].max(axis=1)
+    prices_df["up_move"] = prices_df["high"] - prices_df["high"].shift()
+    prices_df["down_move"] = prices_df["low"].shift() - prices_df["low"]
+    prices_df["plus_dm"] = np.where((prices_df["up_move"] > prices_df["down_move"]) & (prices_df["up_move"] > 0), prices_df["up_move"], 0)
+    prices_df["minus_dm"] = np.where((prices_df["down_move"] > prices_df["up_move"]) & (prices_df["down_move"] > 0), prices_df["down_move"], 0)
+    prices_df["+di"] = 100 * (prices_df["plus_dm"].ewm(span=period).mean() / prices_df["tr"].ewm(span=period).mean())
+    prices_df["-di"] = 100 * (prices_df["minus_dm"].ewm(span=period).mean() / prices_df["tr"].ewm(span=period).mean())
+    prices_df["dx"] = 100 * abs(prices_df["+di"] - prices_df["-di"]) / (prices_df["+di"] + prices_df["-di"])
+    prices_df["adx"] = prices_df["dx"].ewm(span=period).mean()
+    return prices_df[["adx", "+di", "-di"]]
+
+
+def _legacy_atr(prices_df, window=14):
+    high_low = prices_df["high"] - prices_df["low"]
+    high_close = abs(prices_df["high"] - prices_df["close"].shift(1))
+    low_close = abs(prices_df["low"] - prices_df["close"].shift(1))
+    true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+    return true_range.rolling(window).mean()
+
+
+def benchmark_kernels(n_tickers=200, n_bars=300, seed=0):
+    """
+    ADX and ATR for `n_tickers` synthetic tickers: the pandas versions against the
+    kernels, with fresh outputs and with one set of `out=` buffers reused for every
+    ticker. Reports time and tracemalloc peak per ticker and the largest difference.
+    """
+    from synthetic_data import synthetic_ohlcv_panel
+
+    panel = synthetic_ohlcv_panel(n_bars, n_tickers, seed=seed)
+    frames = [pd.DataFrame({field: panel[field][:, j] for field in ("open", "high", "low", "close", "volume")})
+              for j in range(n_tickers)]
+    adx_buffer = np.empty((3, n_bars))
+    atr_buffer = np.empty(n_bars)
+
+    def run_pandas(prices_df):
+        return _legacy_adx(prices_df).to_numpy().T, _legacy_atr(prices_df).to_numpy()
+
+    def run_kernels(prices_df):
+        high, low, close = prices_df["high"], prices_df["low"], prices_df["close"]
+        return adx(high, low, close), atr(high, low, close)
+
+    def run_buffers(prices_df):
+        high, low, close = prices_df["high"], prices_df["low"], prices_df["close"]
+        return adx(high, low, close, out=adx_buffer), atr(high, low, close, out=atr_buffer)
+
+    results = {}
+    expected = None
+    for name, run in (("pandas", run_pandas), ("kernels", run_kernels), ("kernels, out=", run_buffers)):
+        inputs = [prices_df.copy() for prices_df in frames]
+        columns = inputs[0].shape[1]
+        t0 = time.perf_counter()
+        for prices_df in inputs:
+            run(prices_df)
+        seconds = time.perf_counter() - t0
+
+        peaks = []
+        for prices_df in inputs[:20]:
+            tracemalloc.start()
+            run(prices_df)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        (adx_rows, atr_values) = run(frames[0].copy())
+        if expected is None:
+            expected = (adx_rows.copy(), atr_values.copy())
+        error = max(np.nanmax(np.abs(adx_rows - expected[0])), np.nanmax(np.abs(atr_values - expected[1])))
+        results[name] = {"seconds_per_ticker": seconds / n_tickers, "peak_bytes": max(peaks),
+                         "columns_added": inputs[0].shape[1] - columns, "max_abs_diff": float(error)}
+
+    print(f"ADX + ATR, {n_tickers} tickers x {n_bars} bars")
+    for name, row in results.items():
+        print(f"{name:<14} {row['seconds_per_ticker'] * 1e3:8.3f} ms/ticker  peak {row['peak_bytes'] / 1024:8.1f} KiB  "
+              f"columns added to the frame {row['columns_added']:>3}  max diff {row['max_abs_diff']:.2e}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_kernels()
@@ -1,45 +1,56 @@
-import MetaTrader5 as mt5
-import os
 import numpy as np
 import pandas as pd
 import datetime as dt
-from stocktrends import Renko
+import os
 import time
 import copy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-os.chdir("C:\\Users\\HP\\Downloads")
-key = open("key.txt","r").read().split()
-path=("C:\\Program Files\\MetaTrader 5\\terminal64.exe")
+from bar_scheduler import BarCloseScheduler
+from broker import MT5Broker
+import kernels
+from order_dispatch import OrderDispatcher
+from renko import renko_bricks
 
-# establish MetaTrader 5 connection to a specified trading account
-if not mt5.initialize(login=int(key[0]),server=key[2],password=key[1]):
-    print("initialize() failed, error code =",mt5.last_error())
+key_path = "C:\\Users\\HP\\Downloads\\key.txt"
+path=("C:\\Program Files\\MetaTrader 5\\terminal64.exe")
 
 pairs = ['EURUSD','GBPUSD','USDCHF','AUDUSD','USDCAD'] #currency pairs to be included in the strategy
 pos_size = 0.5 #max capital allocated/position size for any currency pair. in MT5 the size is in unit of 10^5
+pair_workers = 16 #pairs evaluated at the same time on threads when signal_workers is 1
+signal_workers = max(1, (os.cpu_count() or 1) - 1) #processes computing the Renko/MACD signals; 1 = compute on the pair threads
+dispatcher = OrderDispatcher(max_workers=8) #sends orders, one at a time per symbol
+broker = None #set by connect(): the MetaTrader 5 terminal, or a SimulatedBroker for replays
+_signal_pool = None #started by signal_pool() on first use
 
 
+def connect(new_broker=None):
+    """establish the broker connection; the MetaTrader 5 account in key.txt unless a broker is given"""
+    global broker
+    broker = new_broker if new_broker is not None else MT5Broker.from_key_file(key_path, path)
+    return broker
+
 def MACD(DF,a,b,c):
     """function to calculate MACD
        typical values a = 12; b =26, c =9"""
-    df = DF.copy()
-    df["MA_Fast"] = df["Close"].ewm(span=a,min_periods=a).mean()
-    df["MA_Slow"] = df["Close"].ewm(span=b,min_periods=b).mean()
-    df["MACD"] = df["MA_Fast"] - df["MA_Slow"]
-    df["Signal"] = df["MACD"].ewm(span=c,min_periods=c).mean()
-    df.dropna(inplace=True)
-    return (df["MACD"],df["Signal"])
+    ma_fast = kernels.ewm_mean(DF["Close"], a, min_periods=a)
+    ma_slow = kernels.ewm_mean(DF["Close"], b, min_periods=b)
+    macd = ma_fast - ma_slow
+    signal = kernels.ewm_mean(macd, c, min_periods=c)
+    # keep the rows without any missing value, as dropna() on the full frame did
+    keep = DF.notna().all(axis=1).to_numpy() & ~np.isnan(macd) & ~np.isnan(signal)
+    index = DF.index[keep]
+    return (pd.Series(macd[keep], index=index, name="MACD"), pd.Series(signal[keep], index=index, name="Signal"))
 
 def ATR(DF,n):
     "function to calculate True Range and Average True Range"
     df = DF.copy()
-    df['H-L'] = abs(df['High'] - df['Low'])
-    df['H-PC'] = abs(df['High'] - df['Close'].shift(1))
-    df['L-PC'] = abs(df['Low'] - df['Close'].shift(1))
-    df['TR'] = df[['H-L','H-PC','L-PC']].max(axis=1,skipna=False)
-    df['ATR'] = df['TR'].rolling(n).mean()
-    df2 = df.drop(['H-L','H-PC','L-PC'],axis=1)
-    return df2
+    high, low, close = kernels.as_array(df["High"]), kernels.as_array(df["Low"]), kernels.as_array(df["Close"])
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    # np.maximum keeps NaN like max(skipna=False): the first bar has no true range
+    df['TR'] = np.maximum(np.maximum(np.abs(high - low), np.abs(high - prev_close)), np.abs(low - prev_close))
+    df['ATR'] = kernels.rolling_mean(df['TR'], n)
+    return df
 
 def renko_DF(DF):
     """Function to convert OHLC data into Renko bricks."""
@@ -49,22 +60,8 @@ def renko_DF(DF):
     df.columns = ["date", "open", "close", "high", "low", "volume"]
 
     # Renko transformation
-    df2 = Renko(df)
-    df2.brick_size = round(ATR(DF, 120)["ATR"].iloc[-1], 4)
-    renko_df = df2.get_ohlc_data()
-
-    # Add bar numbers
-    renko_df["bar_num"] = np.where(
-        renko_df["uptrend"] == True, 1, np.where(renko_df["uptrend"] == False, -1, 0)
-    )
-    renko_df = renko_df.copy()  # Explicit copy to avoid SettingWithCopyWarning
-
-    # Correct cumulative bar_num calculation
-    for i in range(1, len(renko_df)):
-       if renko_df.loc[i, "bar_num"] > 0 and renko_df.loc[i - 1, "bar_num"] > 0:
-           renko_df.loc[i, "bar_num"] += renko_df.loc[i - 1, "bar_num"]
-       elif renko_df.loc[i, "bar_num"] < 0 and renko_df.loc[i - 1, "bar_num"] < 0:
-           renko_df.loc[i, "bar_num"] += renko_df.loc[i - 1, "bar_num"]
+    brick_size = round(ATR(DF, 120)["ATR"].iloc[-1], 4)
+    renko_df = renko_bricks(df["date"], df["close"], brick_size)
 
     # Remove duplicate dates
     renko_df.drop_duplicates(subset="date", keep="last", inplace=True)
@@ -90,19 +87,10 @@ def renko_merge(DF):
     return merged_df
 
 def get_position_df():
-    positions = mt5.positions_get()
-    if len(positions) > 0:
-        pos_df = pd.DataFrame(list(positions),columns=positions[0]._asdict().keys())
-        pos_df.time = pd.to_datetime(pos_df.time, unit="s")
-        pos_df.drop(['time_update', 'time_msc', 'time_update_msc', 'external_id'], axis=1, inplace=True)
-        pos_df.type = np.where(pos_df.type==0,1,-1) #to distinguish between long and short positions
-    else:
-        pos_df = pd.DataFrame()
-        
-    return pos_df
+    return broker.positions()
 
 def get_5m_candles(currency,lookback=10,bars=250):
-    data = mt5.copy_rates_from(currency, mt5.TIMEFRAME_M5, dt.datetime.now() - dt.timedelta(10), 250)   
+    data = broker.rates_from(currency, 300, broker.now() - dt.timedelta(lookback), bars)
     data_df = pd.DataFrame(data) 
     data_df.time = pd.to_datetime(data_df.time, unit="s")
     data_df.set_index("time", inplace=True)
@@ -110,31 +98,7 @@ def get_5m_candles(currency,lookback=10,bars=250):
     return data_df
 
 def place_market_order(symbol,vol,buy_sell,sl_pip,tp_pip):
-    pip_unit = 10*mt5.symbol_info(symbol).point
-    if buy_sell.capitalize()[0] == "B":
-        direction = mt5.ORDER_TYPE_BUY
-        price = mt5.symbol_info_tick(symbol).ask
-        sl = price - sl_pip*pip_unit
-        tp = price + tp_pip*pip_unit
-    else:
-        direction = mt5.ORDER_TYPE_SELL
-        price = mt5.symbol_info_tick(symbol).bid
-        sl = price + sl_pip*pip_unit
-        tp = price - tp_pip*pip_unit
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": symbol,
-        "volume": vol,
-        "type": direction,
-        "price": price,
-        "sl": sl,
-        "tp":tp,
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_RETURN,
-    }
-    
-    result = mt5.order_send(request)
-    return result
+    return broker.market_order(symbol,vol,buy_sell,sl_pip,tp_pip)
 
 def trade_signal(MERGED_DF,l_s):
     "function to generate signal"
@@ -160,57 +124,189 @@ def trade_signal(MERGED_DF,l_s):
     return signal
     
 
-def main():
+def last_closed_bar(symbol, timeframe):
+    return broker.last_closed_bar(symbol, timeframe)
+
+def signal_pool():
+    "process pool for the signal computation, started on first use"
+    global _signal_pool
+    if _signal_pool is None:
+        _signal_pool = ProcessPoolExecutor(max_workers=signal_workers)
+    return _signal_pool
+
+def position_side(open_pos, currency):
+    "long/short/'' for the pair, and its open positions"
+    long_short = ""
+    open_pos_cur = pd.DataFrame()
+    if len(open_pos)>0:
+        open_pos_cur = open_pos[open_pos["symbol"]==currency]
+        if len(open_pos_cur)>0:
+            if (open_pos_cur.type * open_pos_cur.volume).sum() > 0:
+                long_short = "long"
+            elif (open_pos_cur.type * open_pos_cur.volume).sum() < 0:
+                long_short = "short"
+    return long_short, open_pos_cur
+
+def pair_signal(ohlc, long_short):
+    "signal for one pair's candles; runs in a signal_pool process or a pair thread"
+    return trade_signal(renko_merge(ohlc),long_short)
+
+def process_pair(currency, open_pos):
+    "fetch candles, compute the signal and queue the resulting orders for one pair"
+    print(currency)
+    long_short, open_pos_cur = position_side(open_pos, currency)
+    ohlc = get_5m_candles(currency) 
+    send_orders(currency, pair_signal(ohlc, long_short), open_pos_cur)
+
+def send_orders(currency, signal, open_pos_cur):
+    "queue the orders for a pair's signal"
+    if signal == "Buy" or signal =="Sell":
+        dispatcher.submit(currency,place_market_order,currency,pos_size,signal,sl_pip=10, tp_pip=20)
+        print("New {} position initiated for {}".format(signal, currency))
+
+    elif signal == "Close":
+        tot_pos = (open_pos_cur.type * open_pos_cur.volume).sum()
+        if tot_pos > 0:
+            dispatcher.submit(currency,place_market_order,currency,tot_pos,"Sell",sl_pip=10, tp_pip=20)
+        elif tot_pos < 0:
+            dispatcher.submit(currency,place_market_order,currency,abs(tot_pos),"Buy",sl_pip=10, tp_pip=20)
+        print("All positions closed for ", currency)
+    elif signal == "Close_Buy":
+        tot_pos = (open_pos_cur.type * open_pos_cur.volume).sum()
+        dispatcher.submit(currency,place_market_order,currency,abs(tot_pos)+pos_size,"Buy",sl_pip=10, tp_pip=20)
+        print("Existing Short position closed for ", currency)
+        print("New long position initiated for ", currency)
+    elif signal == "Close_Sell":
+        tot_pos = (open_pos_cur.type * open_pos_cur.volume).sum()
+        dispatcher.submit(currency,place_market_order,currency,tot_pos+pos_size,"Sell",sl_pip=10, tp_pip=20)
+        print("Existing Long position closed for ", currency)
+        print("New Short position initiated for ", currency)
+
+def main(symbols=None):
+    """process all pairs; orders go out as soon as each pair's signal is ready.
+       MT5Broker runs one terminal call at a time, so candles are read back to back on this thread
+       while the signals of the pairs already read are computed on signal_workers processes.
+       With signal_workers = 1 the pairs run on pair_workers threads instead"""
     try:
         open_pos = get_position_df()
-        for currency in pairs:
-            print(currency)
-            long_short = ""
-            if len(open_pos)>0:
-                open_pos_cur = open_pos[open_pos["symbol"]==currency]
-                if len(open_pos_cur)>0:
-                    if (open_pos_cur.type * open_pos_cur.volume).sum() > 0:
-                        long_short = "long"
-                    elif (open_pos_cur.type * open_pos_cur.volume).sum() < 0:
-                        long_short = "short"   
-            
-            ohlc = get_5m_candles(currency) 
-            signal = trade_signal(renko_merge(ohlc),long_short)
-    
-            if signal == "Buy" or signal =="Sell":
-                place_market_order(currency,pos_size,signal,sl_pip=10, tp_pip=20)
-                print("New {} position initiated for {}".format(signal, currency))
-
-            elif signal == "Close":
-                tot_pos = (open_pos_cur.type * open_pos_cur.volume).sum()
-                if tot_pos > 0:
-                    place_market_order(currency,tot_pos,"Sell",sl_pip=10, tp_pip=20)
-                elif tot_pos < 0:
-                    place_market_order(currency,abs(tot_pos),"Buy",sl_pip=10, tp_pip=20)
-                print("All positions closed for ", currency)
-            elif signal == "Close_Buy":
-                tot_pos = (open_pos_cur.type * open_pos_cur.volume).sum()
-                place_market_order(currency,abs(tot_pos)+pos_size,"Buy",sl_pip=10, tp_pip=20)
-                print("Existing Short position closed for ", currency)
-                print("New long position initiated for ", currency)
-            elif signal == "Close_Sell":
-                tot_pos = (open_pos_cur.type * open_pos_cur.volume).sum()
-                place_market_order(currency,tot_pos+pos_size,"Sell",sl_pip=10, tp_pip=20)
-                print("Existing Long position closed for ", currency)
-                print("New Short position initiated for ", currency)
+        symbols = pairs if symbols is None else symbols
+        if signal_workers > 1:
+            pool = signal_pool()
+            futures = {}
+            for currency in symbols:
+                print(currency)
+                try:
+                    long_short, open_pos_cur = position_side(open_pos, currency)
+                    futures[pool.submit(pair_signal, get_5m_candles(currency), long_short)] = (currency, open_pos_cur)
+                except Exception as e:
+                    print(currency, e)
+                    print("error encountered....skipping this pair")
+            for future in as_completed(futures):
+                currency, open_pos_cur = futures[future]
+                try:
+                    send_orders(currency, future.result(), open_pos_cur)
+                except Exception as e:
+                    print(currency, e)
+                    print("error encountered....skipping this pair")
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, min(len(symbols), pair_workers))) as pool:
+                futures = {pool.submit(process_pair, currency, open_pos): currency for currency in symbols}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(futures[future], e)
+                        print("error encountered....skipping this pair")
+        dispatcher.wait()
     except Exception as e:
         print(e)
         print("error encountered....skipping this iteration")
 
 
-# Continuous execution        
-starttime=time.time()
-timeout = time.time() + 60*60*1  # 60 seconds times 60 meaning the script will run for 1 hr
-while time.time() <= timeout:
+# Continuous execution: evaluate a pair only when a new M5 bar has closed for it
+def on_bar_close(bars):
+    print("passthrough at ",broker.now().strftime('%Y-%m-%d %H:%M:%S'))
+    main([symbol for symbol, timeframe, bar_time in bars])
+
+def run(duration=60*60*1, clock=time.time, sleep=time.sleep, handler=on_bar_close):
+    "run the strategy on every bar close for `duration` seconds (1 hr by default)"
+    scheduler = BarCloseScheduler(last_closed_bar, [(currency, 300) for currency in pairs], clock=clock, sleep=sleep)
     try:
-        print("passthrough at ",time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time())))
-        main()
-        time.sleep(300 - ((time.time() - starttime) % 300.0)) # 5 minute interval between each new execution
+        scheduler.run(handler, duration=duration)
     except KeyboardInterrupt:
         print('\n\nKeyboard exception received. Exiting.')
-        exit()
+    print(scheduler.summary())
+    return scheduler
+
+def benchmark_live_loop(pair_counts=(5, 50), hours=0.5, speed=100, order_latency=0.02, fetch_latency=0.005, seed=0,
+                        workers=(1, 4)):
+    """
+    Run the live loop against a SimulatedBroker replaying synthetic M5 bars at
+    `speed` times real time, and report bar-close-to-last-order latency per cycle
+    for every number of signal processes in `workers` (1 = pair threads only).
+
+    Latencies are real seconds; broker reads and orders hold the simulated terminal
+    for the given real latencies, one call at a time as with MT5Broker. Reads alone
+    take pairs x fetch_latency per cycle, so the latency cannot stay flat as pairs
+    are added; the processes only take the signal computation off that path.
+    """
+    import contextlib
+    import io
+
+    from bar_scheduler import AcceleratedClock
+    from broker import SimulatedBroker
+    from synthetic_data import synthetic_fx_bars
+
+    global pairs, signal_workers, _signal_pool
+    saved = pairs, signal_workers
+    results = []
+    try:
+        for n_workers in workers:
+            signal_workers = n_workers
+            if _signal_pool is not None:
+                _signal_pool.shutdown()
+                _signal_pool = None
+            for n_pairs in pair_counts:
+                pairs = [f"PAIR{i:03d}" for i in range(n_pairs)]
+                history = 250 + 10 * 288  # get_5m_candles looks back 10 days for 250 bars
+                bars = synthetic_fx_bars(pairs, history + int(hours * 12) + 2, seed=seed)
+                start = int(bars[pairs[0]]["time"].iloc[history]) + 1
+                if n_workers > 1:
+                    signal_pool().submit(int).result()  # start the pool before the clock does
+                clock = AcceleratedClock(start, speed)
+                sim = connect(SimulatedBroker(bars, clock.now, fetch_latency=fetch_latency, order_latency=order_latency))
+
+                cycles = []
+                def timed_cycle(changed):
+                    t0 = time.perf_counter()
+                    on_bar_close(changed)
+                    cycles.append((len(changed), time.perf_counter() - t0))
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    scheduler = run(hours * 3600, clock=clock.now, sleep=clock.sleep, handler=timed_cycle)
+                latencies = np.array([seconds for _, seconds in cycles])
+                evaluations = sum(n for n, _ in cycles)
+                result = {
+                    "pairs": n_pairs,
+                    "signal_workers": n_workers,
+                    "cycles": len(cycles),
+                    "evaluations": evaluations,
+                    "orders": len(sim.fills),
+                    "mean_latency_s": float(latencies.mean()),
+                    "max_latency_s": float(latencies.max()),
+                    "bar_events": scheduler.summary(),
+                }
+                results.append(result)
+                print(f"{n_pairs:>3} pairs, {n_workers} signal processes: {len(cycles)} cycles, {evaluations} evaluations, "
+                      f"{len(sim.fills)} orders, bar close -> last order mean {result['mean_latency_s']:.3f}s "
+                      f"max {result['max_latency_s']:.3f}s, bars {result['bar_events']}")
+    finally:
+        pairs, signal_workers = saved
+        if _signal_pool is not None:
+            _signal_pool.shutdown()
+            _signal_pool = None
+    return results
+
+if __name__ == "__main__":
+    connect()
+    run()
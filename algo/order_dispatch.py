@@ -0,0 +1,128 @@
+"""
+Order dispatch with per-symbol ordering.
+
+`OrderDispatcher` sends orders on a thread pool so that a slow order for one
+symbol does not hold up the others, while orders for the same symbol are
+still sent one after another in submission order (a "close" must reach the
+broker before the "open" that follows it).
+
+Classes:
+- OrderDispatcher: per-symbol FIFO queues drained by a shared thread pool.
+
+Functions:
+- benchmark_cycle(pair_counts): bar-close-to-order latency of a sequential and a concurrent cycle.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class OrderDispatcher:
+    """
+    Run `send(*args, **kwargs)` calls on `max_workers` threads, one at a time per symbol.
+
+    Usage:
+        dispatcher = OrderDispatcher()
+        dispatcher.submit("EURUSD", place_market_order, "EURUSD", 0.5, "Buy", sl_pip=10, tp_pip=20)
+        dispatcher.wait()
+
+    Every sent order is appended to `log` as (symbol, submitted, sent) perf_counter times.
+    """
+    def __init__(self, max_workers=8):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.queues = {}
+        self.log = []
+
+    def submit(self, symbol, send, *args, **kwargs):
+        """Queue an order for `symbol`; returns a Future with the result of `send`."""
+        future = Future()
+        with self.lock:
+            queue = self.queues.setdefault(symbol, deque())
+            queue.append((send, args, kwargs, future, time.perf_counter()))
+            start = len(queue) == 1
+        if start:
+            self.executor.submit(self._drain, symbol)
+        return future
+
+    def _drain(self, symbol):
+        while True:
+            with self.lock:
+                send, args, kwargs, future, submitted = self.queues[symbol][0]
+            try:
+                future.set_result(send(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            with self.lock:
+                self.log.append((symbol, submitted, time.perf_counter()))
+                queue = self.queues[symbol]
+                queue.popleft()
+                if not queue:
+                    del self.queues[symbol]
+                    self.idle.notify_all()
+                    return
+
+    def wait(self, timeout=None):
+        """Block until every queued order has been sent; returns False on timeout."""
+        with self.lock:
+            return self.idle.wait_for(lambda: not self.queues, timeout)
+
+    def close(self):
+        self.wait()
+        self.executor.shutdown(wait=True)
+
+
+def benchmark_cycle(pair_counts=(5, 10, 25, 50), fetch_latency=0.05, signal_seconds=0.005,
+                    order_latency=0.03, workers=16):
+    """
+    Time from the start of a cycle (bar close) to the last order sent, for
+    a loop over pairs and for concurrent fetch + signal with dispatched orders.
+
+    Fetches and orders are simulated with sleeps; every pair places one order.
+    """
+    def fetch(symbol):
+        time.sleep(fetch_latency)
+        return symbol
+
+    def signal(candles):
+        end = time.perf_counter() + signal_seconds
+        while time.perf_counter() < end:
+            pass
+        return "Buy"
+
+    def send(symbol, signal_name):
+        time.sleep(order_latency)
+        return symbol, signal_name
+
+    results = []
+    for n_pairs in pair_counts:
+        symbols = [f"PAIR{i:02d}" for i in range(n_pairs)]
+
+        t0 = time.perf_counter()
+        for symbol in symbols:
+            send(symbol, signal(fetch(symbol)))
+        sequential = time.perf_counter() - t0
+
+        dispatcher = OrderDispatcher(max_workers=workers)
+
+        def process_pair(symbol):
+            dispatcher.submit(symbol, send, symbol, signal(fetch(symbol)))
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(process_pair, symbols))
+        dispatcher.wait()
+        concurrent = time.perf_counter() - t0
+        dispatcher.close()
+
+        results.append({"pairs": n_pairs, "sequential_s": sequential, "concurrent_s": concurrent})
+        print(f"{n_pairs:>3} pairs: bar close -> last order {sequential:.2f}s sequential, "
+              f"{concurrent:.2f}s concurrent")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_cycle()
@@ -0,0 +1,195 @@
+"""
+Process-pool execution of the per-ticker strategy computations.
+
+The strategies in `technical_agent.py` are CPU-bound pandas work, so with
+`workers > 1` tickers are spread over a process pool. Price arrays are packed
+once into shared memory and each worker rebuilds its tickers' frames from
+there, instead of every DataFrame being pickled to the workers. Reports come
+back in the input ticker order and an exception in one ticker is recorded as
+a failure for that ticker only. Indicator statistics and instrumentation
+collected in the workers are merged into the caller's.
+
+Functions:
+- analyze_in_processes(prices, workers): {ticker: report} plus failures for a dict of price frames.
+- attach_shared(name): a worker's handle on a shared memory block owned by the parent.
+- benchmark_workers(n_tickers, worker_counts): speedup over the sequential loop.
+"""
+
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from indicator_graph import IndicatorStats, _as_series
+from instrumentation import NULL, Instrumentation
+from technical_agent import analyze_prices
+
+FIELDS = ["close", "high", "low", "open", "volume"]
+
+# Worker-side view of the shared price arrays, set up by _init_worker
+_shared = {}
+
+
+def attach_shared(name):
+    """Open the shared memory block `name` created by the parent process, without taking ownership of it."""
+    try:
+        # Python 3.13+: the parent owns the block, the worker must not track it
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Older versions register the block again with the resource tracker the
+        # workers share with the parent; the parent's unlink clears that entry
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(values_name, dates_name, total_rows, tickers, offsets):
+    values_shm = attach_shared(values_name)
+    dates_shm = attach_shared(dates_name)
+    _shared["blocks"] = (values_shm, dates_shm)
+    _shared["values"] = np.ndarray((total_rows, len(FIELDS)), dtype=np.float64, buffer=values_shm.buf)
+    _shared["dates"] = np.ndarray((total_rows,), dtype=np.int64, buffer=dates_shm.buf)
+    _shared["tickers"] = tickers
+    _shared["offsets"] = offsets
+
+
+def _worker_frame(i):
+    start, end = _shared["offsets"][i], _shared["offsets"][i + 1]
+    ticker = _shared["tickers"][i]
+    columns = pd.MultiIndex.from_product([FIELDS, [ticker]], names=["Price", "Ticker"])
+    index = pd.DatetimeIndex(_shared["dates"][start:end].copy(), name="Date")
+    return pd.DataFrame(_shared["values"][start:end].copy(), index=index, columns=columns)
+
+
+def _analyze_chunk(indices, collect_stats=False, instrument_options=None):
+    results = []
+    stats = IndicatorStats() if collect_stats else None
+    instrument = Instrumentation(**instrument_options) if instrument_options is not None else NULL
+    instrument.start()
+    try:
+        for i in indices:
+            ticker = _shared["tickers"][i]
+            try:
+                results.append((i, analyze_prices(_worker_frame(i), ticker, stats, instrument), None))
+            except Exception as e:
+                results.append((i, None, f"{type(e).__name__}: {e}"))
+    finally:
+        instrument.stop()
+    return results, stats, instrument if instrument.enabled else None
+
+
+def analyze_in_processes(prices, workers, chunks_per_worker=4, stats=None, instrument=NULL):
+    """
+    Run `analyze_prices` for every ticker on a pool of `workers` processes.
+
+    Args:
+        prices (dict): {ticker: price DataFrame} as returned by `fetch_stock_data`.
+        workers (int): number of worker processes.
+        chunks_per_worker (int): tickers are sent in about workers * chunks_per_worker batches.
+        stats (IndicatorStats): if given, every batch collects its own statistics in
+            its worker and they are merged into this one.
+        instrument (Instrumentation): if enabled, every batch times (and traces or
+            profiles, as `instrument` does) each ticker's strategies in its worker
+            and the snapshots are merged into this one.
+
+    Returns:
+        tuple: (reports, failures) — reports maps ticker to its analysis in input order,
+               failures maps ticker to the error that stopped its analysis.
+    """
+    tickers = list(prices)
+    lengths = [len(prices[ticker]) for ticker in tickers]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    total_rows = int(offsets[-1])
+
+    values_shm = shared_memory.SharedMemory(create=True, size=max(total_rows * len(FIELDS) * 8, 1))
+    dates_shm = shared_memory.SharedMemory(create=True, size=max(total_rows * 8, 1))
+    try:
+        values = np.ndarray((total_rows, len(FIELDS)), dtype=np.float64, buffer=values_shm.buf)
+        dates = np.ndarray((total_rows,), dtype=np.int64, buffer=dates_shm.buf)
+        for i, ticker in enumerate(tickers):
+            prices_df = prices[ticker]
+            start, end = offsets[i], offsets[i + 1]
+            for k, field in enumerate(FIELDS):
+                values[start:end, k] = np.asarray(_as_series(prices_df[field]), dtype=np.float64)
+            dates[start:end] = prices_df.index.tz_localize(None).asi8 if prices_df.index.tz else prices_df.index.asi8
+        # The views must be released before the blocks can be closed
+        del values, dates
+
+        chunk_size = max(1, math.ceil(len(tickers) / (workers * chunks_per_worker)))
+        chunks = [range(s, min(s + chunk_size, len(tickers))) for s in range(0, len(tickers), chunk_size)]
+        outcomes = {}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(values_shm.name, dates_shm.name, total_rows, tickers, offsets),
+        ) as pool:
+            instrument_options = None
+            if instrument.enabled:
+                instrument_options = {"trace_memory": instrument.trace_memory, "profile": instrument.profile}
+            futures = [pool.submit(_analyze_chunk, chunk, stats is not None, instrument_options) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    results, chunk_stats, chunk_instrument = future.result()
+                    for i, report, error in results:
+                        outcomes[i] = (report, error)
+                    if chunk_stats is not None:
+                        stats.merge(chunk_stats)
+                    if chunk_instrument is not None:
+                        instrument.merge(chunk_instrument)
+                except Exception as e:
+                    # A worker died; only the tickers of its batch are lost
+                    for i in chunk:
+                        outcomes[i] = (None, f"{type(e).__name__}: {e}")
+    finally:
+        values_shm.close()
+        values_shm.unlink()
+        dates_shm.close()
+        dates_shm.unlink()
+
+    reports = {}
+    failures = {}
+    for i, ticker in enumerate(tickers):
+        report, error = outcomes[i]
+        if error is None:
+            reports[ticker] = report
+        else:
+            failures[ticker] = error
+    return reports, failures
+
+
+def benchmark_workers(n_tickers=1000, worker_counts=(1, 8, 16), n_dates=300, seed=0):
+    """
+    Time the sequential loop against the process pool on synthetic data.
+
+    Speedups are only meaningful on a machine with at least max(worker_counts) cores.
+    """
+    import os
+
+    from synthetic_data import panel_to_yf_frame, synthetic_ohlcv_panel
+
+    panel = synthetic_ohlcv_panel(n_dates, n_tickers, seed=seed)
+    prices = {ticker: panel_to_yf_frame(panel, j) for j, ticker in enumerate(panel["tickers"])}
+
+    t0 = time.perf_counter()
+    for ticker, prices_df in prices.items():
+        try:
+            analyze_prices(prices_df, ticker)
+        except Exception:
+            pass
+    sequential = time.perf_counter() - t0
+    print(f"{n_tickers} tickers on {os.cpu_count()} cores: sequential {sequential:.2f}s")
+
+    results = [{"workers": 0, "seconds": sequential, "speedup": 1.0}]
+    for workers in worker_counts:
+        t0 = time.perf_counter()
+        reports, failures = analyze_in_processes(prices, workers)
+        elapsed = time.perf_counter() - t0
+        results.append({"workers": workers, "seconds": elapsed, "speedup": sequential / elapsed})
+        print(f"{workers:>3} workers: {elapsed:.2f}s  speedup {sequential / elapsed:.1f}x  "
+              f"({len(reports)} reports, {len(failures)} failures)")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_workers()
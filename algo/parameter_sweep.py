@@ -0,0 +1,152 @@
+"""
+Parameter sweep for the monthly rebalancing strategy of `portfolio_rebalance.py`.
+
+Evaluates every combination of portfolio size `m`, drop count `x`, rebalance
+frequency, ranking lookback and stock universe, and ranks the results by
+Sharpe ratio. The price matrix is put once into shared memory; worker
+processes read it without copying, build the return and score matrices for
+their (frequency, lookback, universe) group and run all (m, x) settings of
+the group together with `rebalance_batch`.
+
+KPIs come from `performance_metrics`, with the same definitions as the
+KPI functions of `portfolio_rebalance.py`.
+
+Functions:
+- sweep(prices, m_values, x_values, freqs, lookbacks, universes, workers): ranked result table.
+- benchmark_sweep(n_tickers, years, workers): time a few-thousand-combination sweep on synthetic prices.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from parallel_agent import attach_shared
+from performance_metrics import METRICS, performance_metrics
+from rebalance_engine import rebalance_batch, returns_from_prices
+
+PERIODS_PER_YEAR = {"B": 252, "D": 252, "W": 52, "ME": 12, "M": 12, "QE": 4, "Q": 4}
+
+# Worker-side view of the shared prices and the matrices of the current group, set up by _init_worker
+_shared = {}
+
+
+def periods_per_year(freq):
+    """Periods per year for a pandas offset alias such as "ME" or "W-FRI"."""
+    return PERIODS_PER_YEAR[freq.split("-")[0]]
+
+
+def _init_worker(prices_name, shape, dates, tickers):
+    shm = attach_shared(prices_name)
+    _shared["block"] = shm
+    _shared["prices"] = pd.DataFrame(np.ndarray(shape, dtype=np.float64, buffer=shm.buf),
+                                     index=pd.DatetimeIndex(dates), columns=tickers, copy=False)
+
+
+def _group_matrices(freq, lookback, universe):
+    """Return and score matrices of one group; only the latest group is kept."""
+    key = (freq, lookback, tuple(universe))
+    if _shared.get("group") != key:
+        returns = returns_from_prices(_shared["prices"][list(universe)], freq)
+        # Rank on the compounded return of the last `lookback` periods
+        scores = np.expm1(np.log1p(returns).rolling(lookback).sum()) if lookback > 1 else returns
+        _shared["group"] = key
+        _shared["matrices"] = (returns.iloc[lookback - 1:].to_numpy(), scores.iloc[lookback - 1:].to_numpy())
+    return _shared["matrices"]
+
+
+def _run_group(freq, lookback, universe, settings, rf):
+    returns, scores = _group_matrices(freq, lookback, universe)
+    ms, xs = zip(*settings)
+    stats = performance_metrics(rebalance_batch(returns, ms, xs, scores=scores), periods_per_year(freq), rf)
+    return [(m, x, *values) for (m, x), values in zip(settings, stats.itertuples(index=False))]
+
+
+def sweep(prices, m_values, x_values, freqs=("ME",), lookbacks=(1,), universes=None, workers=None,
+          rf=0.025, max_settings_per_task=256, out_path=None):
+    """
+    Evaluate every (freq, lookback, universe, m, x) combination with x <= m.
+
+    Args:
+        prices (DataFrame): (dates x tickers) adjusted closes, daily or coarser.
+        m_values, x_values (sequence of int): portfolio sizes and drop counts.
+        freqs (sequence of str): rebalance frequencies as pandas offset aliases ("ME", "W-FRI", "D").
+        lookbacks (sequence of int): stocks are ranked on their compounded return over this
+            many periods; 1 is `pflio`'s ranking on the latest period.
+        universes (dict): {name: list of tickers}; default all columns as "all".
+        workers (int): worker processes; 1 runs in this process. Default os.cpu_count().
+        rf (float): risk-free rate for the Sharpe ratio.
+        max_settings_per_task (int): (m, x) settings per task, so that groups spread over workers.
+        out_path (str): also write the table to this CSV file.
+
+    Returns:
+        DataFrame with one row per combination, sorted by Sharpe ratio (best first).
+    """
+    universes = universes or {"all": list(prices.columns)}
+    settings = [(m, x) for m, x in product(m_values, x_values) if x <= m]
+    tasks = []
+    for freq, lookback, name in product(freqs, lookbacks, universes):
+        for s in range(0, len(settings), max_settings_per_task):
+            tasks.append((freq, lookback, name, settings[s:s + max_settings_per_task]))
+
+    values = np.ascontiguousarray(prices.to_numpy(dtype=np.float64))
+    workers = workers or os.cpu_count() or 1
+    rows = []
+    if workers == 1:
+        _shared["prices"] = prices.astype(np.float64)
+        for freq, lookback, name, chunk in tasks:
+            rows.extend((freq, lookback, name, *r) for r in _run_group(freq, lookback, universes[name], chunk, rf))
+        _shared.clear()
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+            # Tasks of the same group go to the pool back to back so workers reuse their matrices
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(shm.name, values.shape, prices.index.to_numpy(), list(prices.columns)),
+            ) as pool:
+                futures = [pool.submit(_run_group, freq, lookback, universes[name], chunk, rf)
+                           for freq, lookback, name, chunk in tasks]
+                for (freq, lookback, name, _), future in zip(tasks, futures):
+                    rows.extend((freq, lookback, name, *r) for r in future.result())
+        finally:
+            shm.close()
+            shm.unlink()
+
+    table = pd.DataFrame(rows, columns=["freq", "lookback", "universe", "m", "x", *METRICS])
+    table = table.sort_values("sharpe", ascending=False, ignore_index=True, na_position="last")
+    if out_path:
+        table.to_csv(out_path, index=False)
+    return table
+
+
+def benchmark_sweep(n_tickers=50, years=10, workers=None, seed=0):
+    """
+    Sweep m in 1..40, x in 1..10, monthly and weekly rebalancing, lookbacks 1/3/6/12
+    and two universes over `years` of synthetic daily prices, and report the time.
+    """
+    from synthetic_data import synthetic_ohlcv_panel
+
+    panel = synthetic_ohlcv_panel(years * 252, n_tickers, seed=seed)
+    prices = pd.DataFrame(panel["close"], index=panel["dates"], columns=panel["tickers"])
+    universes = {"all": list(prices.columns), "first_half": list(prices.columns[:n_tickers // 2])}
+    workers = workers or os.cpu_count() or 1
+
+    t0 = time.perf_counter()
+    table = sweep(prices, range(1, 41), range(1, 11), freqs=("ME", "W-FRI"), lookbacks=(1, 3, 6, 12),
+                  universes=universes, workers=workers)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(table)} combinations over {years} years x {n_tickers} tickers on {workers} "
+          f"worker(s): {elapsed:.1f}s ({len(table) / elapsed:.0f} combinations/s)")
+    print(table.head(10).to_string(index=False))
+    return elapsed, table
+
+
+if __name__ == "__main__":
+    benchmark_sweep()
@@ -2,121 +2,127 @@
 # Backtesting strategy - I : Monthly portfolio rebalancing
 import numpy as np
 import pandas as pd
-import yfinance as yf
 import datetime as dt
 import copy
 import matplotlib.pyplot as plt
 
+from bootstrap import bootstrap_metrics
+from concurrent_fetch import fetch_many
+from performance_metrics import performance_metrics
+from price_store import PriceStore, YFinanceProvider
+import rebalance_engine
+from rebalance_engine import rebalance_returns
+from result_cache import ResultCache
+from timeframes import TimeframeStore
+
 
 def CAGR(DF):
     "function to calculate the Cumulative Annual Growth Rate of a trading strategy"
-    df = DF.copy()
-    df["cum_return"] = (1 + df["mon_ret"]).cumprod()
-    n = len(df)/12
-    CAGR = (df["cum_return"].tolist()[-1])**(1/n) - 1
-    return CAGR
+    return performance_metrics(DF["mon_ret"])["cagr"].iloc[0]
 
 def volatility(DF):
     "function to calculate annualized volatility of a trading strategy"
-    df = DF.copy()
-    vol = df["mon_ret"].std() * np.sqrt(12)
-    return vol
+    return performance_metrics(DF["mon_ret"])["volatility"].iloc[0]
 
 def sharpe(DF,rf):
     "function to calculate sharpe ratio ; rf is the risk free rate"
-    df = DF.copy()
-    sr = (CAGR(df) - rf)/volatility(df)
-    return sr
+    return performance_metrics(DF["mon_ret"],rf=rf)["sharpe"].iloc[0]
     
 
 def max_dd(DF):
     "function to calculate max drawdown"
-    df = DF.copy()
-    df["cum_return"] = (1 + df["mon_ret"]).cumprod()
-    df["cum_roll_max"] = df["cum_return"].cummax()
-    df["drawdown"] = df["cum_roll_max"] - df["cum_return"]
-    df["drawdown_pct"] = df["drawdown"]/df["cum_roll_max"]
-    max_dd = df["drawdown_pct"].max()
-    return max_dd
-
-# Download historical data (monthly) for DJI constituent stocks
-
-tickers = ["ADANIENT.NS", "ADANIPORTS.NS", "APOLLOHOSP.NS", "ASIANPAINT.NS", 
-           "AXISBANK.NS", "BAJAJ-AUTO.NS", "BAJFINANCE.NS", "BAJAJFINSV.NS", 
-           "BEL.NS", "BPCL.NS", "BHARTIARTL.NS", "BRITANNIA.NS", 
-           "CIPLA.NS", "COALINDIA.NS", "DRREDDY.NS", "ITC.NS", 
-           "EICHERMOT.NS", "GRASIM.NS", "HCLTECH.NS", "HDFCBANK.NS", 
-           "HDFCLIFE.NS", "HEROMOTOCO.NS", "HINDALCO.NS", "HINDUNILVR.NS", 
-           "ICICIBANK.NS", "ITC.NS", "INDUSINDBK.NS", "INFY.NS", 
-           "JSWSTEEL.NS", "KOTAKBANK.NS", "LT.NS", "M&M.NS", 
-           "MARUTI.NS", "NTPC.NS", "NESTLEIND.NS", "ONGC.NS", 
-           "POWERGRID.NS", "RELIANCE.NS", "SBILIFE.NS", "SHRIRAMFIN.NS", 
-           "SBIN.NS", "SUNPHARMA.NS", "TCS.NS", "TATACONSUM.NS", 
-           "TATAMOTORS.NS", "TATASTEEL.NS", "TECHM.NS", "TITAN.NS", 
-           "TRENT.NS", "ULTRACEMCO.NS", "WIPRO.NS"]
-
-ohlc_mon = {} # directory with ohlc value for each stock            
-start = dt.datetime.today()-dt.timedelta(3650)
-end = dt.datetime.today()
-
-# looping over tickers and creating a dataframe with close prices
-for ticker in tickers:
-    ohlc_mon[ticker] = yf.download(ticker,start,end,interval='1mo')
-    ohlc_mon[ticker].dropna(inplace=True,how="all")
- 
-tickers = ohlc_mon.keys() # redefine tickers variable after removing any tickers with corrupted data
-
-################################Backtesting####################################
-
-# calculating monthly return for each stock and consolidating return info by stock in a separate dataframe
-ohlc_dict = copy.deepcopy(ohlc_mon)
-return_df = pd.DataFrame()
-for ticker in tickers:
-    print("calculating monthly return for ",ticker)
-    ohlc_dict[ticker]["mon_ret"] = ohlc_dict[ticker]["Adj Close"].pct_change()
-    return_df[ticker] = ohlc_dict[ticker]["mon_ret"]
-return_df.dropna(inplace=True)
-
-
-# function to calculate portfolio return iteratively
-def pflio(DF,m,x):
-    """Returns cumulative portfolio return
+    return performance_metrics(DF["mon_ret"])["max_drawdown"].iloc[0]
+
+# backtest results are cached on disk by return data and parameters, so repeated
+# pflio calls (KPIs, plot, re-runs of the script) are computed only once
+result_cache = ResultCache()
+
+# function to calculate portfolio return
+@result_cache.cached(depends=[rebalance_engine])
+def pflio(DF,m,x,tickers=None):
+    """Returns monthly portfolio return
     DF = dataframe with monthly return info for all stocks
     m = number of stock in the portfolio
-    x = number of underperforming stocks to be removed from portfolio monthly"""
-    df = DF.copy()
-    portfolio = []
-    monthly_ret = [0]
-    for i in range(len(df)):
-        if len(portfolio) > 0:
-            monthly_ret.append(df[portfolio].iloc[i,:].mean())
-            bad_stocks = df[portfolio].iloc[i,:].sort_values(ascending=True)[:x].index.values.tolist()
-            portfolio = [t for t in portfolio if t not in bad_stocks]
-        fill = m - len(portfolio)
-        new_picks = df[[t for t in tickers if t not in portfolio]].iloc[i,:].sort_values(ascending=False)[:fill].index.values.tolist()
-        portfolio = portfolio + new_picks
-        print(portfolio)
-    monthly_ret_df = pd.DataFrame(np.array(monthly_ret),columns=["mon_ret"])
-    return monthly_ret_df
-
-
-#calculating overall strategy's KPIs
-print('CAGR:',CAGR(pflio(return_df,6,3)))
-print('SHARPE RATIO:',sharpe(pflio(return_df,6,3),0.025))
-print('MAX_DRAWDOWN',max_dd(pflio(return_df,6,3)))
-
-#calculating KPIs for Index buy and hold strategy over the same period
-NIFTY = yf.download("^NSEI",dt.date.today()-dt.timedelta(3650),dt.date.today(),interval='1mo')
-NIFTY["mon_ret"] = NIFTY["Adj Close"].pct_change().fillna(0)
-CAGR(NIFTY)
-sharpe(NIFTY,0.025)
-max_dd(NIFTY)
-
-#visualization
-fig, ax = plt.subplots()
-plt.plot((1+pflio(return_df,6,3)).cumprod())
-plt.plot((1+NIFTY["mon_ret"].reset_index(drop=True)).cumprod())
-plt.title("Index Return vs Strategy Return")
-plt.ylabel("cumulative return")
-plt.xlabel("months")
-ax.legend(["Strategy Return","Index Return"])
+    x = number of underperforming stocks to be removed from portfolio monthly
+    tickers = stocks to choose from (all columns of DF by default)
+    The rebalancing itself runs on the return matrix in rebalance_engine"""
+    if tickers is not None:
+        DF = DF[list(tickers)]
+    return rebalance_returns(DF,m,x)
+
+
+if __name__ == "__main__":
+    # Download historical data (monthly) for DJI constituent stocks
+
+    tickers = ["ADANIENT.NS", "ADANIPORTS.NS", "APOLLOHOSP.NS", "ASIANPAINT.NS", 
+               "AXISBANK.NS", "BAJAJ-AUTO.NS", "BAJFINANCE.NS", "BAJAJFINSV.NS", 
+               "BEL.NS", "BPCL.NS", "BHARTIARTL.NS", "BRITANNIA.NS", 
+               "CIPLA.NS", "COALINDIA.NS", "DRREDDY.NS", "ITC.NS", 
+               "EICHERMOT.NS", "GRASIM.NS", "HCLTECH.NS", "HDFCBANK.NS", 
+               "HDFCLIFE.NS", "HEROMOTOCO.NS", "HINDALCO.NS", "HINDUNILVR.NS", 
+               "ICICIBANK.NS", "ITC.NS", "INDUSINDBK.NS", "INFY.NS", 
+               "JSWSTEEL.NS", "KOTAKBANK.NS", "LT.NS", "M&M.NS", 
+               "MARUTI.NS", "NTPC.NS", "NESTLEIND.NS", "ONGC.NS", 
+               "POWERGRID.NS", "RELIANCE.NS", "SBILIFE.NS", "SHRIRAMFIN.NS", 
+               "SBIN.NS", "SUNPHARMA.NS", "TCS.NS", "TATACONSUM.NS", 
+               "TATAMOTORS.NS", "TATASTEEL.NS", "TECHM.NS", "TITAN.NS", 
+               "TRENT.NS", "ULTRACEMCO.NS", "WIPRO.NS"]
+
+    start = dt.datetime.today()-dt.timedelta(3650)
+    end = dt.datetime.today()
+
+    # local store in front of yfinance: daily bars are downloaded once (only days not fetched
+    # before) and monthly bars are built from them on each exchange's sessions
+    # (unadjusted download so the "Adj Close" column is kept)
+    store = TimeframeStore(PriceStore(provider=YFinanceProvider(auto_adjust=False)), base_interval="1d")
+
+    # downloading all tickers concurrently; tickers that fail after retries are reported and left out
+    ohlc_mon, failed = fetch_many(lambda ticker: store.fetch(ticker,start,end,interval='1mo'), tickers, max_workers=8, rate_limit=5)
+    for ticker, error in failed.items():
+        print("could not download", ticker, ":", error)
+    for ticker in ohlc_mon:
+        ohlc_mon[ticker].dropna(inplace=True,how="all")
+
+    tickers = ohlc_mon.keys() # redefine tickers variable after removing any tickers with corrupted data
+
+    ################################Backtesting####################################
+
+    # calculating monthly return for each stock and consolidating return info by stock in a separate dataframe
+    ohlc_dict = copy.deepcopy(ohlc_mon)
+    return_df = pd.DataFrame()
+    for ticker in tickers:
+        print("calculating monthly return for ",ticker)
+        ohlc_dict[ticker]["mon_ret"] = ohlc_dict[ticker]["Adj Close"].pct_change()
+        return_df[ticker] = ohlc_dict[ticker]["mon_ret"]
+    return_df.dropna(inplace=True)
+
+    #calculating overall strategy's KPIs
+    print('CAGR:',CAGR(pflio(return_df,6,3,list(tickers))))
+    print('SHARPE RATIO:',sharpe(pflio(return_df,6,3,list(tickers)),0.025))
+    print('MAX_DRAWDOWN',max_dd(pflio(return_df,6,3,list(tickers))))
+
+    #calculating KPIs for Index buy and hold strategy over the same period
+    NIFTY = store.fetch("^NSEI",dt.date.today()-dt.timedelta(3650),dt.date.today(),interval='1mo')
+    NIFTY["mon_ret"] = NIFTY["Adj Close"].pct_change().fillna(0)
+    CAGR(NIFTY)
+    sharpe(NIFTY,0.025)
+    max_dd(NIFTY)
+
+    #strategy and index KPIs side by side, over the months both cover
+    strategy_ret = pflio(return_df,6,3,list(tickers))["mon_ret"]
+    index_ret = NIFTY["mon_ret"].reset_index(drop=True)
+    months = min(len(strategy_ret),len(index_ret))
+    print(performance_metrics(strategy_ret[-months:].reset_index(drop=True).rename("strategy"),rf=0.025,benchmark=index_ret[-months:]))
+
+    #how robust the comparison is: confidence intervals from 10,000 block-bootstrap paths
+    print(bootstrap_metrics(strategy_ret[-months:],benchmark=index_ret[-months:],rf=0.025)[0])
+
+    #visualization
+    fig, ax = plt.subplots()
+    plt.plot((1+pflio(return_df,6,3,list(tickers))).cumprod())
+    plt.plot((1+NIFTY["mon_ret"].reset_index(drop=True)).cumprod())
+    plt.title("Index Return vs Strategy Return")
+    plt.ylabel("cumulative return")
+    plt.xlabel("months")
+    ax.legend(["Strategy Return","Index Return"])
+    print('backtest cache:',result_cache.stats())
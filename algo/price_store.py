@@ -0,0 +1,352 @@
+"""
+Local columnar OHLCV store with incremental gap-filling.
+
+Bars are kept on disk partitioned by provider, interval and ticker, one NumPy
+file per column plus a small JSON file recording which date ranges have
+already been fetched. A request only goes to the data provider for the parts
+of the range that are not covered yet; everything else is served locally.
+
+Classes:
+- PriceProvider: interface for OHLCV sources.
+- YFinanceProvider: downloads bars with yfinance.
+- LocalFileProvider: serves bars from CSV files, an offline stand-in for tests and benchmarks.
+- PriceStore: the on-disk cache that sits in front of a provider.
+
+Functions:
+- default_price_store(): the shared store used by `fetch_stock_data`.
+- benchmark_store(n_tickers): cold and warm fetch latency on synthetic data.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIR = os.path.join(os.path.expanduser("~"), ".dailyinvestai", "price_store")
+
+
+class PriceProvider(ABC):
+    """
+    Source of OHLCV bars for one ticker.
+
+    `fetch` returns a DataFrame with one flat column per field ("Open", "High",
+    "Low", "Close", "Volume", ...) indexed by bar time, covering [start, end).
+    """
+    name = "provider"
+
+    @abstractmethod
+    def fetch(self, ticker, start, end, interval):
+        raise NotImplementedError
+
+
+class YFinanceProvider(PriceProvider):
+    """
+    Download bars with yfinance; extra keyword arguments (e.g. auto_adjust=False) are passed through.
+
+    Uses `Ticker.history` with the same defaults `yf.download` applies, because
+    `yf.download` keeps its results in module-level state and is not safe to
+    call from several threads at once. A range without bars (a holiday, a
+    weekend, today before the open) comes back as an empty frame; other errors
+    (network, rate limits) are raised, so callers can retry them.
+    """
+    def __init__(self, **download_kwargs):
+        self.download_kwargs = download_kwargs
+        self.name = "yfinance" if not download_kwargs else "yfinance-" + "-".join(
+            f"{k}={v}" for k, v in sorted(download_kwargs.items())
+        )
+
+    def fetch(self, ticker, start, end, interval):
+        import yfinance as yf
+        from yfinance.exceptions import YFPricesMissingError
+
+        kwargs = {"auto_adjust": True, "actions": False, **self.download_kwargs}
+        try:
+            prices_df = yf.Ticker(ticker).history(start=start, end=end, interval=interval, **kwargs)
+        except YFPricesMissingError:
+            # yfinance 1.x raises when the range has no bars
+            return pd.DataFrame()
+        # yf.download drops the exchange timezone for daily and longer bars
+        if interval in ("1d", "5d", "1wk", "1mo", "3mo") and prices_df.index.tz is not None:
+            prices_df.index = prices_df.index.tz_localize(None)
+        return prices_df
+
+
+class LocalFileProvider(PriceProvider):
+    """
+    Serve bars from `<root>/<interval>/<ticker>.csv` files instead of the network.
+
+    `latency` adds a fixed delay per call to mimic a remote source; `calls`
+    counts fetches so tests can check what reached the provider.
+    """
+    name = "local"
+
+    def __init__(self, root, latency=0.0):
+        self.root = root
+        self.latency = latency
+        self.calls = 0
+        self._frames = {}
+
+    def fetch(self, ticker, start, end, interval):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        key = (ticker, interval)
+        if key not in self._frames:
+            path = os.path.join(self.root, interval, f"{ticker}.csv")
+            if not os.path.exists(path):
+                return pd.DataFrame()
+            self._frames[key] = pd.read_csv(path, index_col=0, parse_dates=True, float_precision="round_trip")
+        prices_df = self._frames[key]
+        return prices_df[(prices_df.index >= start) & (prices_df.index < end)].copy()
+
+    @staticmethod
+    def write(root, ticker, prices_df, interval="1d"):
+        """Save a flat-column price frame where LocalFileProvider will find it."""
+        os.makedirs(os.path.join(root, interval), exist_ok=True)
+        prices_df.to_csv(os.path.join(root, interval, f"{ticker}.csv"))
+
+
+def _timestamp(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize(None) if ts.tz is not None else ts
+
+
+def _align_start(ts, interval):
+    # Weekly and monthly bars are labelled by their period start; refetch whole periods
+    if interval in ("1wk", "5d"):
+        return ts.normalize() - pd.Timedelta(days=ts.weekday())
+    if interval in ("1mo", "3mo"):
+        return ts.normalize().replace(day=1)
+    return ts
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class PriceStore:
+    """
+    On-disk columnar cache of OHLCV bars in front of a PriceProvider.
+
+    The root defaults to $PRICE_STORE_DIR, falling back to ~/.dailyinvestai/price_store.
+    Layout: `<root>/<provider>/<interval>/<ticker>/` holding `index.npy`, one
+    `<column>.npy` per field and `meta.json` (column names, timezone and the
+    fetched date ranges). Ranges are marked covered only up to today, so the
+    latest, possibly incomplete bar is refetched on the next call. A range the
+    provider returned no bars for counts as covered only if it ended before
+    today (a holiday or weekend); provider errors leave the range uncovered.
+
+    Usage:
+        store = PriceStore("/tmp/prices", LocalFileProvider("/tmp/csv"))
+        prices_df = store.fetch("TCS.NS", "2024-01-01", "2025-01-01")
+    """
+    def __init__(self, root=None, provider=None):
+        self.root = root if root is not None else os.environ.get("PRICE_STORE_DIR", DEFAULT_STORE_DIR)
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self.provider_fetches = 0
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, ticker, interval):
+        with self._locks_lock:
+            return self._locks.setdefault((ticker, interval), threading.Lock())
+
+    def _path(self, ticker, interval):
+        return os.path.join(self.root, self.provider.name, interval, ticker.replace(os.sep, "_"))
+
+    def _load(self, ticker, interval):
+        path = self._path(ticker, interval)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None, []
+        with open(meta_path) as f:
+            meta = json.load(f)
+        index = pd.DatetimeIndex(np.load(os.path.join(path, "index.npy")), name=meta["index_name"])
+        if meta["tz"]:
+            index = index.tz_localize("UTC").tz_convert(meta["tz"])
+        data = {
+            column: np.load(os.path.join(path, f"{file_name}.npy"))
+            for column, file_name in zip(meta["columns"], meta["files"])
+        }
+        prices_df = pd.DataFrame(data, index=index, columns=meta["columns"])
+        coverage = [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in meta["coverage"]]
+        return prices_df, coverage
+
+    def _save(self, ticker, interval, prices_df, coverage):
+        path = self._path(ticker, interval)
+        os.makedirs(path, exist_ok=True)
+        index = prices_df.index
+        tz = str(index.tz) if index.tz is not None else None
+        stored_index = index.tz_convert("UTC").tz_localize(None) if tz else index
+        files = [str(column).replace(" ", "_").replace(os.sep, "_") for column in prices_df.columns]
+
+        def replace(name, write):
+            # Unique temp files, so concurrent writers never share a half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=path, prefix=f"{name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(tmp_path, os.path.join(path, name))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+        def save_array(name, values):
+            replace(f"{name}.npy", lambda f: np.save(f, values))
+
+        save_array("index", stored_index.to_numpy(dtype="datetime64[ns]"))
+        for column, file_name in zip(prices_df.columns, files):
+            save_array(file_name, prices_df[column].to_numpy())
+
+        # meta.json is written last: it is what makes the new columns visible
+        meta = {
+            "columns": [str(column) for column in prices_df.columns],
+            "files": files,
+            "index_name": index.name,
+            "tz": tz,
+            "coverage": [[str(start), str(end)] for start, end in coverage],
+        }
+        replace("meta.json", lambda f: f.write(json.dumps(meta).encode()))
+
+    def missing_ranges(self, ticker, start, end, interval="1d", coverage=None):
+        """Sub-ranges of [start, end) not fetched yet, as (start, end) Timestamps."""
+        start, end = _timestamp(start), _timestamp(end)
+        if coverage is None:
+            coverage = self._load(ticker, interval)[1]
+        missing = []
+        cursor = start
+        for covered_start, covered_end in coverage:
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end:
+            missing.append((cursor, end))
+        return [(_align_start(gap_start, interval), gap_end) for gap_start, gap_end in missing]
+
+    def fetch(self, ticker, start, end, interval="1d"):
+        """
+        Bars for [start, end), fetching only the missing ranges from the provider.
+
+        Returns a flat-column DataFrame; empty if the provider has no data.
+        """
+        start, end = _timestamp(start), _timestamp(end)
+        # One fetch per partition at a time: a retry waits for a timed-out attempt still running
+        with self._lock(ticker, interval):
+            stored = self._fill(ticker, start, end, interval)
+        if stored is None:
+            return pd.DataFrame()
+        index = stored.index.tz_localize(None) if stored.index.tz is not None else stored.index
+        return stored[(index >= start) & (index < end)].copy()
+
+    def _fill(self, ticker, start, end, interval):
+        stored, coverage = self._load(ticker, interval)
+        gaps = self.missing_ranges(ticker, start, end, interval, coverage)
+
+        if gaps:
+            pieces = [] if stored is None else [stored]
+            today = pd.Timestamp.today().normalize()
+            covered = []
+            # A provider error propagates before anything is saved, so the gaps stay uncovered
+            for gap_start, gap_end in gaps:
+                self.provider_fetches += 1
+                fetched = self.provider.fetch(ticker, gap_start, gap_end, interval)
+                if fetched is not None and len(fetched):
+                    pieces.append(fetched)
+                    if gap_start < today:
+                        covered.append((gap_start, min(gap_end, today)))
+                elif gap_end <= today:
+                    # No bars in a past range (holiday, weekend): nothing will appear there later
+                    covered.append((gap_start, gap_end))
+            if len(pieces) > (stored is not None):
+                merged = pd.concat(pieces)
+                stored = merged[~merged.index.duplicated(keep="last")].sort_index()
+            # A ticker with no bars at all has nothing to save; it is asked again next time
+            if covered and stored is not None:
+                coverage = _merge_ranges(coverage + covered)
+                self._save(ticker, interval, stored, coverage)
+        return stored
+
+
+_default_store = None
+
+
+def default_price_store():
+    """Shared yfinance-backed PriceStore at the default root."""
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store
+
+
+def benchmark_store(n_tickers=50, n_dates=2500, latency=0.05):
+    """
+    Report cold, warm and one-new-bar fetch latency for `n_tickers` tickers.
+
+    A LocalFileProvider with `latency` seconds per call stands in for yfinance.
+    """
+    import tempfile
+
+    from synthetic_data import synthetic_ohlcv_panel
+
+    panel = synthetic_ohlcv_panel(n_dates, n_tickers, start="2015-01-01")
+    dates = panel["dates"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_root = os.path.join(tmp_dir, "csv")
+        for j, ticker in enumerate(panel["tickers"]):
+            prices_df = pd.DataFrame(
+                {field.capitalize(): panel[field][:, j] for field in ["open", "high", "low", "close", "volume"]},
+                index=pd.DatetimeIndex(dates, name="Date"),
+            )
+            LocalFileProvider.write(csv_root, ticker, prices_df)
+        provider = LocalFileProvider(csv_root, latency=latency)
+        store = PriceStore(os.path.join(tmp_dir, "store"), provider)
+
+        def run(end):
+            t0 = time.perf_counter()
+            for ticker in panel["tickers"]:
+                store.fetch(ticker, dates[0], end)
+            return time.perf_counter() - t0
+
+        provider.calls = 0
+        cold = run(dates[-2])
+        cold_calls = provider.calls
+        provider.calls = 0
+        warm = run(dates[-2])
+        warm_calls = provider.calls
+        provider.calls = 0
+        incremental = run(dates[-1] + pd.Timedelta(days=1))
+        incremental_calls = provider.calls
+
+    results = {
+        "tickers": n_tickers,
+        "cold_s": cold,
+        "cold_provider_calls": cold_calls,
+        "warm_s": warm,
+        "warm_provider_calls": warm_calls,
+        "incremental_s": incremental,
+        "incremental_provider_calls": incremental_calls,
+    }
+    print(f"{n_tickers} tickers x {n_dates} bars, provider latency {latency * 1000:.0f} ms")
+    print(f"  cold:        {cold:7.3f}s  ({cold_calls} provider calls)")
+    print(f"  warm:        {warm:7.3f}s  ({warm_calls} provider calls)")
+    print(f"  one new bar: {incremental:7.3f}s  ({incremental_calls} provider calls)")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_store()
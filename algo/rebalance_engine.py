@@ -0,0 +1,218 @@
+"""
+Rank-based portfolio rebalancing on a (periods x tickers) return matrix.
+
+Same strategy as `pflio` in `portfolio_rebalance.py`: hold `m` stocks, and at
+every period drop the `x` worst performers among the holdings and refill the
+portfolio with the best performers among the rest. Holdings are a boolean
+membership mask over the columns and the worst/best picks use
+`np.argpartition`, so each period costs a few array operations over the
+universe instead of sorting Series and rebuilding ticker lists.
+
+The monthly (or daily, weekly...) return series equals `pflio`'s. Exact ties
+between returns are broken by column order; `pflio` breaks them by the order
+of its portfolio list and pandas' unstable sort. NaN returns (a stock not yet
+listed) are ranked last in both directions, as `sort_values` does, and left
+out of the period's mean.
+
+Functions:
+- rebalance_returns(returns, m, x): period returns of the strategy, optionally with the holdings mask.
+- rebalance_batch(returns, ms, xs): period returns of many (m, x) settings in one pass.
+- returns_from_prices(prices, freq): period returns from a (dates x tickers) price frame.
+- benchmark_rebalance(configs): timing against the `pflio` loop.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _rank_keys(scores, nan_key=np.inf):
+    """Sort keys with NaN last: ascending for the worst holdings, descending for the best picks."""
+    nan = np.isnan(scores)
+    return np.where(nan, nan_key, scores), np.where(nan, nan_key, -scores)
+
+
+def _smallest(keys, k):
+    """Positions of the `k` smallest keys, ties taken in position order."""
+    if k >= len(keys):
+        return np.arange(len(keys))
+    if k <= 0:
+        return np.arange(0)
+    kth = np.partition(keys, k - 1)[k - 1]
+    below = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[:k - len(below)]
+    return np.concatenate([below, ties])
+
+
+def rebalance_returns(returns, m, x, holdings=False, scores=None):
+    """
+    Period returns of the "hold m, replace the x worst" strategy.
+
+    Args:
+        returns (DataFrame or ndarray): (periods x tickers) simple returns.
+        m (int): number of stocks in the portfolio.
+        x (int): number of underperforming stocks removed every period.
+        holdings (bool): also return the (periods x tickers) boolean mask of the
+            portfolio chosen at the end of each period.
+        scores (DataFrame or ndarray): what stocks are ranked by, same shape as
+            `returns` (e.g. trailing multi-period returns); default the returns.
+
+    Returns:
+        DataFrame with a "mon_ret" column like `pflio`: 0 for the first period, then
+        the equal-weighted return of the portfolio held over each period.
+    """
+    columns = returns.columns if isinstance(returns, pd.DataFrame) else None
+    ret = np.asarray(returns, dtype=np.float64)
+    n_periods, n_tickers = ret.shape
+    nan = np.isnan(ret)
+    worst_key, best_key = _rank_keys(ret if scores is None else np.asarray(scores, dtype=np.float64))
+
+    member = np.zeros(n_tickers, dtype=bool)
+    period_ret = np.zeros(n_periods)
+    held = np.zeros((n_periods, n_tickers), dtype=bool) if holdings else None
+    for i in range(n_periods):
+        members = np.flatnonzero(member)
+        if len(members):
+            row = ret[i, members]
+            valid = ~nan[i, members]
+            period_ret[i] = row[valid].mean() if valid.any() else np.nan
+            member[members[_smallest(worst_key[i, members], x)]] = False
+        fill = m - int(member.sum())
+        if fill > 0:
+            candidates = np.flatnonzero(~member)
+            member[candidates[_smallest(best_key[i, candidates], fill)]] = True
+        if holdings:
+            held[i] = member
+
+    monthly_ret_df = pd.DataFrame(period_ret, columns=["mon_ret"])
+    if holdings:
+        return monthly_ret_df, pd.DataFrame(held, index=getattr(returns, "index", None), columns=columns)
+    return monthly_ret_df
+
+
+def _batch_smallest(keys, k):
+    """
+    Boolean mask of the k[c] smallest keys in every row c of a 2-D array, ties
+    taken in column order. Only the max(k) smallest per row are sorted.
+    """
+    n_rows, n_cols = keys.shape
+    k_max = min(int(k.max()), n_cols) if n_rows else 0
+    chosen = np.zeros(keys.shape, dtype=bool)
+    if k_max <= 0:
+        return chosen
+    if k_max < n_cols:
+        part = np.argpartition(keys, k_max - 1, axis=1)[:, :k_max]
+        part.sort(axis=1)
+    else:
+        part = np.broadcast_to(np.arange(n_cols), keys.shape)
+    order = np.argsort(np.take_along_axis(keys, part, axis=1), axis=1, kind="stable")
+    smallest = np.take_along_axis(part, order, axis=1)
+    rows = np.arange(n_rows)[:, None]
+    chosen[rows, smallest] = np.arange(k_max) < k[:, None]
+    return chosen
+
+
+def rebalance_batch(returns, ms, xs, scores=None):
+    """
+    `rebalance_returns` for many (m, x) settings at once on the same return matrix.
+
+    Every setting keeps its own membership row of a (settings x tickers) mask and
+    each period is one set of 2-D array operations for all of them.
+
+    Args:
+        returns (DataFrame or ndarray): (periods x tickers) simple returns.
+        ms, xs (sequence of int): portfolio size and drop count of each setting.
+        scores: ranking matrix as in `rebalance_returns`.
+
+    Returns:
+        ndarray of shape (periods, settings) with the period returns of each setting.
+        When equal scores straddle a cut-off the pick among them can differ from
+        `rebalance_returns`.
+    """
+    ret = np.asarray(returns, dtype=np.float64)
+    ms = np.asarray(ms, dtype=np.int64)
+    xs = np.asarray(xs, dtype=np.int64)
+    n_periods, n_tickers = ret.shape
+    valid = ~np.isnan(ret)
+    ret0 = np.where(valid, ret, 0.0)
+    # Finite NaN keys so that non-members (+inf) still sort after them
+    worst_key, best_key = _rank_keys(ret if scores is None else np.asarray(scores, dtype=np.float64),
+                                     np.finfo(np.float64).max)
+
+    member = np.zeros((len(ms), n_tickers), dtype=bool)
+    period_ret = np.zeros((n_periods, len(ms)))
+    for i in range(n_periods):
+        if i:
+            counted = member & valid[i]
+            n = counted.sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                period_ret[i] = np.where(n > 0, (member * ret0[i]).sum(axis=1) / n, np.nan)
+            member &= ~_batch_smallest(np.where(member, worst_key[i], np.inf), xs)
+        fill = ms - member.sum(axis=1)
+        member |= _batch_smallest(np.where(member, np.inf, best_key[i]), np.minimum(fill, n_tickers - member.sum(axis=1)))
+    return period_ret
+
+
+def returns_from_prices(prices, freq="ME"):
+    """
+    Simple returns between period ends of a (dates x tickers) price frame.
+
+    `freq` is a pandas offset alias ("D", "W-FRI", "ME"...). Rows where every
+    ticker is NaN are dropped; stocks without a price yet stay NaN.
+    """
+    period_close = prices.resample(freq).last()
+    return period_close.pct_change(fill_method=None).iloc[1:].dropna(how="all")
+
+
+def _legacy_pflio(DF, m, x):
+    """The previous loop from `portfolio_rebalance.py`, without the per-period print."""
+    df = DF.copy()
+    tickers = df.columns
+    portfolio = []
+    monthly_ret = [0]
+    for i in range(len(df)):
+        if len(portfolio) > 0:
+            monthly_ret.append(df[portfolio].iloc[i, :].mean())
+            bad_stocks = df[portfolio].iloc[i, :].sort_values(ascending=True)[:x].index.values.tolist()
+            portfolio = [t for t in portfolio if t not in bad_stocks]
+        fill = m - len(portfolio)
+        new_picks = df[[t for t in tickers if t not in portfolio]].iloc[i, :].sort_values(ascending=False)[:fill].index.values.tolist()
+        portfolio = portfolio + new_picks
+    return pd.DataFrame(np.array(monthly_ret), columns=["mon_ret"])
+
+
+def benchmark_rebalance(configs=(("ME", 120, 50), ("W-FRI", 520, 500), ("D", 2500, 500)),
+                        m=6, x=3, legacy_max_cells=300_000, seed=0):
+    """
+    Time `rebalance_returns` against the `pflio` loop on synthetic returns.
+
+    configs: (frequency label, periods, tickers). The loop is skipped when
+    periods x tickers exceeds `legacy_max_cells`; where both run the return
+    series are compared.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for freq, n_periods, n_tickers in configs:
+        returns = pd.DataFrame(rng.normal(0.01, 0.08, (n_periods, n_tickers)),
+                               columns=[f"T{j:04d}" for j in range(n_tickers)])
+        t0 = time.perf_counter()
+        fast = rebalance_returns(returns, m, x)
+        engine = time.perf_counter() - t0
+        row = {"freq": freq, "periods": n_periods, "tickers": n_tickers, "engine_s": engine,
+               "legacy_s": None, "match": None}
+        if n_periods * n_tickers <= legacy_max_cells:
+            t0 = time.perf_counter()
+            slow = _legacy_pflio(returns, m, x)
+            row["legacy_s"] = time.perf_counter() - t0
+            row["match"] = bool(np.allclose(fast["mon_ret"].to_numpy(), slow["mon_ret"].to_numpy(), equal_nan=True))
+        results.append(row)
+        legacy_text = "skipped" if row["legacy_s"] is None else (
+            f"{row['legacy_s']:.2f}s ({row['legacy_s'] / engine:.0f}x slower, match={row['match']})"
+        )
+        print(f"{freq:>6} {n_periods:>5} periods x {n_tickers:>4} tickers: engine {engine:.3f}s, pflio {legacy_text}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_rebalance()
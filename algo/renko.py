@@ -0,0 +1,234 @@
+"""
+Vectorized Renko brick builder.
+
+A Renko chart with a two-brick reversal only ever moves a one-brick band
+[top - 1, top] (in brick units): the band moves up when price reaches
+top + 1 and down when it reaches top - 2, whatever the current trend. Each
+bar therefore clamps `top` into [floor(q), ceil(q) + 1] for the price q in
+brick units, and a chain of clamps composes into a single clamp. The band
+for every bar is computed with a blocked prefix scan over these clamps, so
+the whole series is built with array operations in linear time instead of
+one Python iteration (and one DataFrame append) per bar. With Numba installed
+the band walk and the brick counter run as compiled loops (`jit_kernels.py`).
+
+The bricks match `stocktrends.Renko(...).get_ohlc_data()` in its default
+period-close mode, except that a price landing exactly on a brick boundary
+always completes the brick (stocktrends decides those by float rounding of
+its running brick level). `bar_num` is the signed count of consecutive
+bricks in the same direction.
+
+Functions:
+- atr_brick_size(high, low, close, n): brick size from the latest n-bar average true range.
+- renko_bricks(dates, close, brick_size, high, low): Renko bricks as a DataFrame.
+- consecutive_bricks(uptrend): signed run-length counts of brick directions.
+- benchmark_renko(sizes): timing against stocktrends and the bar_num loop.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+import jit_kernels
+
+_BLOCK = 64
+_NO_LOW = np.iinfo(np.int64).min
+_NO_HIGH = np.iinfo(np.int64).max
+
+
+def atr_brick_size(high, low, close, n=120, decimals=4):
+    """
+    Mean true range of the last `n` bars, rounded to `decimals`.
+
+    Same value as `round(ATR(DF, n)["ATR"].iloc[-1], decimals)` in `mt5_renko_macd2.py`.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    tr = np.max(np.abs([high - low, high - prev_close, low - prev_close]), axis=0)
+    return round(float(np.mean(tr[-n:])) if len(tr) >= n else float("nan"), decimals)
+
+
+def _clamp_scan(lo, hi):
+    """
+    Inclusive prefix composition of the clamps x -> clip(x, lo[i], hi[i]).
+
+    Returns (L, H) such that clip(x, L[i], H[i]) equals applying clamps 0..i in turn.
+    Blocks of _BLOCK are scanned in log2(_BLOCK) vectorized passes and the block
+    totals are scanned recursively, which keeps the total work linear.
+    """
+    n = len(lo)
+    n_blocks = -(-n // _BLOCK)
+    L = np.full(n_blocks * _BLOCK, _NO_LOW, dtype=np.int64)
+    H = np.full(n_blocks * _BLOCK, _NO_HIGH, dtype=np.int64)
+    L[:n] = lo
+    H[:n] = hi
+    L = L.reshape(n_blocks, _BLOCK)
+    H = H.reshape(n_blocks, _BLOCK)
+
+    k = 1
+    while k < _BLOCK:
+        # Composing "earlier then later" clamps: clip the earlier bounds into the later ones
+        L[:, k:], H[:, k:] = (
+            np.clip(L[:, :-k], L[:, k:], H[:, k:]),
+            np.clip(H[:, :-k], L[:, k:], H[:, k:]),
+        )
+        k *= 2
+
+    if n_blocks > 1:
+        prefix_L, prefix_H = _clamp_scan(L[:-1, -1], H[:-1, -1])
+        L[1:], H[1:] = (
+            np.clip(prefix_L[:, None], L[1:], H[1:]),
+            np.clip(prefix_H[:, None], L[1:], H[1:]),
+        )
+    return L.ravel()[:n], H.ravel()[:n]
+
+
+def consecutive_bricks(uptrend):
+    """
+    Signed count of consecutive bricks in the same direction: 1, 2, 3 for
+    successive up bricks, -1, -2 for down bricks, restarting at every reversal.
+    """
+    if jit_kernels.ENABLED:
+        uptrend = np.asarray(uptrend, dtype=bool)
+        return jit_kernels.consecutive_loop(uptrend, np.empty(len(uptrend), dtype=np.int64))
+    sign = np.where(np.asarray(uptrend, dtype=bool), 1, -1)
+    if len(sign) == 0:
+        return sign
+    idx = np.arange(len(sign))
+    run_start = np.where(np.concatenate([[True], sign[1:] != sign[:-1]]), idx, 0)
+    np.maximum.accumulate(run_start, out=run_start)
+    return sign * (idx - run_start + 1)
+
+
+def renko_bricks(dates, close, brick_size, high=None, low=None):
+    """
+    Build Renko bricks of `brick_size` from bar prices.
+
+    Args:
+        dates: bar timestamps; each brick carries the date of the bar that completed it.
+        close: bar closes, used for both directions unless high/low are given.
+        brick_size (float): brick height, e.g. from `atr_brick_size`.
+        high, low: optional bar highs and lows. Up moves are then measured with the
+            high and down moves with the low; a bar wide enough to move the band both
+            ways resolves towards the side its close is on.
+
+    Returns:
+        DataFrame with columns date, open, high, low, close, uptrend, bar_num; the
+        first row is the seed brick ending at the first close rounded down to a
+        multiple of the brick size.
+    """
+    dates = np.asarray(dates)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    base = close[0] // brick_size * brick_size
+
+    # Price in brick units; rounding keeps exact multiples of the brick size on the grid
+    q_up = np.round(((close if high is None else np.asarray(high, dtype=np.float64)) - base) / brick_size, 9)
+    q_down = np.round(((close if low is None else np.asarray(low, dtype=np.float64)) - base) / brick_size, 9)
+    q_up = pd.Series(q_up).ffill().fillna(0.0).to_numpy()
+    q_down = pd.Series(q_down).ffill().fillna(0.0).to_numpy()
+    lo = np.floor(q_up).astype(np.int64)
+    hi = np.ceil(q_down).astype(np.int64) + 1
+    conflict = lo > hi
+    if conflict.any():
+        q_close = np.round((close - base) / brick_size, 9)
+        towards_up = np.abs(q_up - q_close) <= np.abs(q_close - q_down)
+        lo = np.where(conflict & ~towards_up, hi, lo)
+        hi = np.where(conflict & towards_up, lo, hi)
+
+    top = np.zeros(n + 1, dtype=np.int64)
+    if jit_kernels.ENABLED:
+        jit_kernels.band_walk(lo, hi, top[1:])
+    else:
+        scan_lo, scan_hi = _clamp_scan(lo, hi)
+        np.clip(0, scan_lo, scan_hi, out=top[1:])
+    move = np.diff(top)
+    counts = np.abs(move)
+
+    # One brick per band step, dated by the bar that produced it
+    bar = np.repeat(np.arange(n), counts)
+    up = np.repeat(move > 0, counts)
+    step = np.arange(len(bar)) - np.repeat(np.cumsum(counts) - counts, counts)
+    start = np.repeat(top[:-1], counts)
+    brick_close = np.where(up, start + step + 1, start - step - 2)
+    brick_open = np.where(up, brick_close - 1, brick_close + 1)
+
+    uptrend = np.concatenate([[True], up])
+    close_level = np.concatenate([[0], brick_close])
+    open_level = np.concatenate([[-1], brick_open])
+    return pd.DataFrame({
+        "date": np.concatenate([dates[:1], dates[bar]]),
+        "open": base + open_level * brick_size,
+        "high": base + np.maximum(open_level, close_level) * brick_size,
+        "low": base + np.minimum(open_level, close_level) * brick_size,
+        "close": base + close_level * brick_size,
+        "uptrend": uptrend,
+        "bar_num": consecutive_bricks(uptrend),
+    })
+
+
+def _legacy_renko_frame(dates, close, brick_size):
+    """The previous implementation: stocktrends bricks plus a row-by-row bar_num loop."""
+    from stocktrends import Renko
+
+    df = pd.DataFrame({"date": dates, "open": close, "high": close, "low": close, "close": close})
+    renko = Renko(df)
+    renko.brick_size = brick_size
+    renko_df = renko.get_ohlc_data()
+    renko_df["bar_num"] = np.where(
+        renko_df["uptrend"] == True, 1, np.where(renko_df["uptrend"] == False, -1, 0)
+    )
+    renko_df = renko_df.copy()
+    for i in range(1, len(renko_df)):
+        if renko_df.loc[i, "bar_num"] > 0 and renko_df.loc[i - 1, "bar_num"] > 0:
+            renko_df.loc[i, "bar_num"] += renko_df.loc[i - 1, "bar_num"]
+        elif renko_df.loc[i, "bar_num"] < 0 and renko_df.loc[i - 1, "bar_num"] < 0:
+            renko_df.loc[i, "bar_num"] += renko_df.loc[i - 1, "bar_num"]
+    return renko_df
+
+
+def benchmark_renko(sizes=(10_000, 100_000, 1_000_000), legacy_max_bars=100_000, seed=0):
+    """
+    Time `renko_bricks` against stocktrends + the bar_num loop on synthetic M5 closes.
+
+    The legacy path appends to a DataFrame once per bar and is skipped above
+    `legacy_max_bars`. Where both run, the brick sequences are compared; the
+    closes are not rounded to a tick grid, because on prices that land exactly
+    on a brick boundary the legacy result depends on float rounding of its
+    running brick level.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for n in sizes:
+        close = 1.1 * np.exp(np.cumsum(rng.normal(0, 3e-4, n)))
+        high = close + np.abs(rng.normal(0, 2e-4, n))
+        low = close - np.abs(rng.normal(0, 2e-4, n))
+        dates = pd.date_range("2015-01-01", periods=n, freq="5min").to_numpy()
+        brick_size = atr_brick_size(high, low, close, 120)
+
+        t0 = time.perf_counter()
+        bricks = renko_bricks(dates, close, brick_size)
+        vectorized = time.perf_counter() - t0
+        row = {"bars": n, "bricks": len(bricks), "vectorized_s": vectorized, "legacy_s": None, "match": None}
+
+        if n <= legacy_max_bars:
+            t0 = time.perf_counter()
+            legacy = _legacy_renko_frame(dates, close, brick_size)
+            row["legacy_s"] = time.perf_counter() - t0
+            row["match"] = (
+                len(legacy) == len(bricks)
+                and bool((legacy["bar_num"].to_numpy() == bricks["bar_num"].to_numpy()).all())
+                and np.allclose(legacy["close"].to_numpy(dtype=np.float64), bricks["close"].to_numpy(), atol=1e-9)
+            )
+        results.append(row)
+        legacy_text = "skipped" if row["legacy_s"] is None else (
+            f"{row['legacy_s']:.2f}s ({row['legacy_s'] / vectorized:.0f}x slower, match={row['match']})"
+        )
+        print(f"{n:>9} bars -> {len(bricks):>7} bricks: vectorized {vectorized:.3f}s, legacy {legacy_text}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_renko()
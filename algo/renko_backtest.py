@@ -0,0 +1,401 @@
+"""
+Vectorized historical backtest of the Renko + MACD strategy in `mt5_renko_macd2.py`.
+
+`trade_signal` decides from the last row of the merged frame. Here the same
+conditions are evaluated for every bar at once:
+
+    bull   = bar_num >= 2  and macd > signal
+    bear   = bar_num <= -2 and macd < signal
+    cross_down / cross_up = MACD crossing below / above its signal line
+
+Flat: bull -> Buy, bear -> Sell. Long: bear -> Close_Sell (reverse), cross_down -> Close.
+Short: bull -> Close_Buy (reverse), cross_up -> Close.
+
+Signals are taken at bar close and filled at the next bar's open; every position
+carries the live strategy's 10 pip stop loss and 20 pip take profit, checked
+against each bar's high and low. The next entry and exit bar for every bar are
+precomputed as whole-series "next true index" arrays, so the engine only steps
+from trade to trade and scans each held bar once for stops.
+
+Differences from the live loop: bricks are built once over the whole history
+with a single brick size per pair (live rebuilds them from a 250-bar window
+every cycle), and orders fill at the next open plus spread.
+
+Functions:
+- strategy_frame(ohlc, brick_size): per-bar bar_num, macd, signal and the four conditions.
+- backtest_pair(ohlc, symbol): trades and equity curve for one pair.
+- quote_conversion(symbol, bars, account_currency): per-bar factor from a pair's quote currency to the account's.
+- backtest(bars): all pairs in the account currency, combined equity curve and KPIs.
+- replay_pair(ohlc, symbol): the same rules stepped bar by bar, as a reference for backtest_pair.
+- compare_with_replay(n_pairs, n_bars): check backtest_pair trade-for-trade against replay_pair.
+- kpis(trades, equity): summary statistics.
+- benchmark_backtest(n_pairs, years): wall-clock time on synthetic M5 bars.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from mt5_renko_macd2 import ATR, MACD
+from renko import renko_bricks
+
+CONTRACT_SIZE = 100_000
+
+
+def _next_true(mask):
+    """For every position, the index of the next True at or after it (len(mask) if none)."""
+    n = len(mask)
+    idx = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(idx[::-1])[::-1]
+
+
+def strategy_frame(ohlc, brick_size=None, brick_price="High"):
+    """
+    Per-bar strategy inputs for an OHLC frame shaped like `get_5m_candles` output.
+
+    Args:
+        ohlc (DataFrame): Open, High, Low, Close columns indexed by bar time.
+        brick_size (float): Renko brick size; default is the median ATR(120), rounded to 4 decimals.
+        brick_price (str): column the bricks are built from. `renko_DF` relabels columns
+            by position and passes High, so that is the default.
+    """
+    if brick_size is None:
+        brick_size = round(float(ATR(ohlc, 120)["ATR"].median()), 4)
+    bricks = renko_bricks(ohlc.index, ohlc[brick_price], brick_size)
+    bricks = bricks.drop_duplicates(subset="date", keep="last").set_index("date")
+
+    frame = pd.DataFrame(index=ohlc.index)
+    frame["bar_num"] = bricks["bar_num"].reindex(ohlc.index).ffill()
+    macd, macd_sig = MACD(ohlc, 12, 26, 9)
+    frame["macd"] = macd.reindex(ohlc.index)
+    frame["macd_sig"] = macd_sig.reindex(ohlc.index)
+
+    above = (frame["macd"] > frame["macd_sig"]).to_numpy()
+    below = (frame["macd"] < frame["macd_sig"]).to_numpy()
+    prev_above = np.concatenate([[False], above[:-1]])
+    prev_below = np.concatenate([[False], below[:-1]])
+    bar_num = frame["bar_num"].to_numpy()
+    frame["bull"] = (bar_num >= 2) & above
+    frame["bear"] = (bar_num <= -2) & below
+    frame["cross_down"] = below & prev_above
+    frame["cross_up"] = above & prev_below
+    frame.attrs["brick_size"] = brick_size
+    return frame
+
+
+def backtest_pair(ohlc, symbol="", brick_size=None, volume=0.5, sl_pip=10, tp_pip=20,
+                  pip_size=None, spread_pips=1.0, brick_price="High"):
+    """
+    Backtest one pair.
+
+    Returns (trades, equity): a DataFrame with one row per trade (direction, entry and
+    exit time and price, exit reason, pnl) and the per-bar equity change series
+    (realized plus open P&L in quote currency, starting at 0).
+    """
+    frame = strategy_frame(ohlc, brick_size, brick_price)
+    if pip_size is None:
+        pip_size = 0.01 if symbol.endswith("JPY") else 0.0001
+    spread = spread_pips * pip_size
+    units = volume * CONTRACT_SIZE
+
+    open_ = ohlc["Open"].to_numpy(dtype=np.float64)
+    high = ohlc["High"].to_numpy(dtype=np.float64)
+    low = ohlc["Low"].to_numpy(dtype=np.float64)
+    close = ohlc["Close"].to_numpy(dtype=np.float64)
+    bull = frame["bull"].to_numpy()
+    bear = frame["bear"].to_numpy()
+    n = len(close)
+
+    next_entry = _next_true(bull | bear)
+    next_long_exit = _next_true(bear | frame["cross_down"].to_numpy())
+    next_short_exit = _next_true(bull | frame["cross_up"].to_numpy())
+
+    rows = []
+    t = next_entry[0] if n else 0
+    while t < n - 1:
+        d = 1 if bull[t] else -1
+        e = t + 1
+        # Buys fill at the ask (open + spread), sells at the bid
+        entry_price = open_[e] + (spread if d == 1 else 0.0)
+        sl = entry_price - d * sl_pip * pip_size
+        tp = entry_price + d * tp_pip * pip_size
+        u = (next_long_exit if d == 1 else next_short_exit)[e]
+        last = min(u, n - 1)
+
+        if d == 1:
+            sl_hit, tp_hit = low[e:last + 1] <= sl, high[e:last + 1] >= tp
+        else:
+            sl_hit, tp_hit = high[e:last + 1] >= sl, low[e:last + 1] <= tp
+        hits = np.flatnonzero(sl_hit | tp_hit)
+
+        if len(hits):
+            # A bar touching both levels is assumed to hit the stop loss first
+            x = e + hits[0]
+            reason = "SL" if sl_hit[hits[0]] else "TP"
+            exit_price = sl if reason == "SL" else tp
+            t = next_entry[x]
+        elif u < n - 1:
+            x = u + 1
+            exit_price = open_[x] + (spread if d == -1 else 0.0)
+            reversal = bear[u] if d == 1 else bull[u]
+            reason = ("Close_Sell" if d == 1 else "Close_Buy") if reversal else "Close"
+            t = u if reversal else next_entry[u + 1]
+        else:
+            x = n - 1
+            exit_price = close[x]
+            reason = "end"
+            t = n
+        rows.append((d, e, x, entry_price, exit_price, reason))
+
+    trades = pd.DataFrame(rows, columns=["direction", "entry_bar", "exit_bar", "entry_price", "exit_price", "exit_reason"])
+    trades["pnl"] = trades["direction"] * (trades["exit_price"] - trades["entry_price"]) * units
+
+    # Equity: realized P&L booked on the exit bar plus mark-to-market of the open trade
+    realized = np.zeros(n)
+    np.add.at(realized, trades["exit_bar"].to_numpy(dtype=np.int64), trades["pnl"].to_numpy())
+    unrealized = np.zeros(n)
+    if len(trades):
+        # Open trades are marked to market from the entry bar up to the bar before the exit
+        starts = trades["entry_bar"].to_numpy(dtype=np.int64)
+        lengths = trades["exit_bar"].to_numpy(dtype=np.int64) - starts
+        trade_of_bar = np.repeat(np.arange(len(trades)), lengths)
+        bars_held = np.repeat(starts, lengths) + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        unrealized[bars_held] = (
+            trades["direction"].to_numpy()[trade_of_bar]
+            * (close[bars_held] - trades["entry_price"].to_numpy()[trade_of_bar]) * units
+        )
+    equity = pd.Series(np.cumsum(realized) + unrealized, index=ohlc.index, name=symbol or "equity")
+
+    index = ohlc.index
+    trades.insert(0, "symbol", symbol)
+    trades["entry_time"] = index[trades["entry_bar"].to_numpy(dtype=np.int64)]
+    trades["exit_time"] = index[trades["exit_bar"].to_numpy(dtype=np.int64)]
+    trades["direction"] = np.where(trades["direction"] == 1, "long", "short")
+    trades = trades.drop(columns=["entry_bar", "exit_bar"])
+    return trades, equity
+
+
+def replay_pair(ohlc, symbol="", brick_size=None, volume=0.5, sl_pip=10, tp_pip=20,
+                pip_size=None, spread_pips=1.0, brick_price="High"):
+    """
+    Reference implementation of `backtest_pair`: walks the bars one at a time with
+    the live loop's state (flat / long / short and the order waiting for the next
+    open) instead of jumping between precomputed entry and exit bars.
+
+    Returns the trades in the same layout as `backtest_pair`.
+    """
+    frame = strategy_frame(ohlc, brick_size, brick_price)
+    if pip_size is None:
+        pip_size = 0.01 if symbol.endswith("JPY") else 0.0001
+    spread = spread_pips * pip_size
+    units = volume * CONTRACT_SIZE
+    open_, high, low, close = (ohlc[c].to_numpy(dtype=np.float64) for c in ["Open", "High", "Low", "Close"])
+    bull, bear = frame["bull"].to_numpy(), frame["bear"].to_numpy()
+    cross_down, cross_up = frame["cross_down"].to_numpy(), frame["cross_up"].to_numpy()
+    n = len(close)
+
+    rows = []
+    position = 0
+    pending = None  # order decided at the previous close: ("enter", d) or ("exit", reason, reverse)
+
+    def enter(d, i):
+        price = open_[i] + (spread if d == 1 else 0.0)
+        return d, i, price, price - d * sl_pip * pip_size, price + d * tp_pip * pip_size
+
+    for i in range(n):
+        if pending is not None:
+            if pending[0] == "enter":
+                position, entry_bar, entry_price, sl, tp = enter(pending[1], i)
+            else:
+                exit_price = open_[i] + (spread if position == -1 else 0.0)
+                rows.append((position, entry_bar, i, entry_price, exit_price, pending[1]))
+                position = 0
+                if pending[2]:
+                    position, entry_bar, entry_price, sl, tp = enter(-rows[-1][0], i)
+            pending = None
+
+        if position:
+            sl_hit = low[i] <= sl if position == 1 else high[i] >= sl
+            tp_hit = high[i] >= tp if position == 1 else low[i] <= tp
+            if sl_hit or tp_hit:
+                rows.append((position, entry_bar, i, entry_price, sl if sl_hit else tp, "SL" if sl_hit else "TP"))
+                position = 0
+
+        if i == n - 1:
+            break
+        if position == 0:
+            if bull[i] or bear[i]:
+                pending = ("enter", 1 if bull[i] else -1)
+        elif position == 1:
+            if bear[i]:
+                pending = ("exit", "Close_Sell", True)
+            elif cross_down[i]:
+                pending = ("exit", "Close", False)
+        else:
+            if bull[i]:
+                pending = ("exit", "Close_Buy", True)
+            elif cross_up[i]:
+                pending = ("exit", "Close", False)
+
+    if position:
+        rows.append((position, entry_bar, n - 1, entry_price, close[n - 1], "end"))
+
+    trades = pd.DataFrame(rows, columns=["direction", "entry_bar", "exit_bar", "entry_price", "exit_price", "exit_reason"])
+    trades["pnl"] = trades["direction"] * (trades["exit_price"] - trades["entry_price"]) * units
+    index = ohlc.index
+    trades.insert(0, "symbol", symbol)
+    trades["entry_time"] = index[trades["entry_bar"].to_numpy(dtype=np.int64)]
+    trades["exit_time"] = index[trades["exit_bar"].to_numpy(dtype=np.int64)]
+    trades["direction"] = np.where(trades["direction"] == 1, "long", "short")
+    return trades.drop(columns=["entry_bar", "exit_bar"])
+
+
+def compare_with_replay(n_pairs=3, n_bars=50_000, seed=0):
+    """
+    Run `backtest_pair` and `replay_pair` on synthetic M5 bars and check that they
+    produce the same trades (times, directions, exit reasons, prices and P&L).
+    """
+    from synthetic_data import synthetic_fx_bars
+
+    symbols = ["EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "USDCAD"][:n_pairs]
+    results = {}
+    for symbol, rates in synthetic_fx_bars(symbols, n_bars, seed=seed).items():
+        ohlc = mt5_rates_to_ohlc(rates)
+        fast, _ = backtest_pair(ohlc, symbol)
+        slow = replay_pair(ohlc, symbol)
+        same = len(fast) == len(slow) and all(
+            fast[c].equals(slow[c]) for c in ["symbol", "direction", "exit_reason", "entry_time", "exit_time"]
+        ) and all(np.allclose(fast[c], slow[c], rtol=0, atol=1e-9) for c in ["entry_price", "exit_price", "pnl"])
+        results[symbol] = same
+        print(f"{symbol}: {len(fast)} trades vectorized, {len(slow)} replayed, identical: {same}")
+    if not all(results.values()):
+        raise AssertionError(f"backtest_pair differs from the bar-by-bar replay: {results}")
+    return results
+
+
+def kpis(trades, equity, initial_capital=100_000.0):
+    """
+    Summary statistics for a trade list and an equity change curve.
+
+    Daily returns are daily P&L over `initial_capital` (the account is not
+    compounded). An account that reaches zero is ruined: trading stops there,
+    the account is held at zero from then on, only trades closed by then are
+    counted and `ruined` / `ruin_time` report it. max_drawdown is in the
+    currency of `equity`, max_drawdown_pct relative to the peak account (at most 1).
+    """
+    account = initial_capital + equity
+    broke = (account <= 0).to_numpy()
+    ruined = bool(broke.any())
+    ruin_time = account.index[broke.argmax()] if ruined else None
+    if ruined:
+        account = account.where(~np.maximum.accumulate(broke), 0.0)
+        trades = trades[trades["exit_time"] <= ruin_time]
+    equity = account - initial_capital
+    daily_ret = account.resample("1D").last().dropna().diff().dropna() / initial_capital
+    running_max = account.cummax()
+    drawdown = running_max - account
+    wins = trades["pnl"][trades["pnl"] > 0]
+    losses = trades["pnl"][trades["pnl"] < 0]
+    return {
+        "trades": len(trades),
+        "net_pnl": float(equity.iloc[-1]) if len(equity) else 0.0,
+        "return": float(equity.iloc[-1] / initial_capital) if len(equity) else 0.0,
+        "win_rate": float(len(wins) / len(trades)) if len(trades) else float("nan"),
+        "profit_factor": float(wins.sum() / -losses.sum()) if len(losses) else float("inf"),
+        "avg_trade": float(trades["pnl"].mean()) if len(trades) else float("nan"),
+        "max_drawdown": float(drawdown.max()),
+        "max_drawdown_pct": float((drawdown / running_max.where(running_max > 0)).max()),
+        "sharpe": float(daily_ret.mean() / daily_ret.std() * np.sqrt(252)) if daily_ret.std() > 0 else float("nan"),
+        "ruined": ruined,
+        "ruin_time": ruin_time,
+        "exit_reasons": trades["exit_reason"].value_counts().to_dict(),
+    }
+
+
+def quote_conversion(symbol, bars, account_currency="USD"):
+    """
+    Factor turning `symbol`'s quote-currency amounts into `account_currency`, per bar of `symbol`.
+
+    The first six letters of a symbol are its base and quote currency (EURJPY: EUR
+    quoted in JPY). A quote currency other than the account's is converted at the
+    close of the account/quote pair (divided, e.g. USDJPY) or the quote/account
+    pair (multiplied, e.g. JPYUSD), which must be in `bars`; otherwise ValueError.
+    """
+    quote = symbol[3:6]
+    index = bars[symbol].index
+    if quote == account_currency:
+        return pd.Series(1.0, index=index)
+    by_name = {name[:6]: ohlc for name, ohlc in bars.items()}
+    if account_currency + quote in by_name:
+        rate = 1.0 / by_name[account_currency + quote]["Close"]
+    elif quote + account_currency in by_name:
+        rate = by_name[quote + account_currency]["Close"]
+    else:
+        raise ValueError(f"cannot convert {symbol} P&L from {quote} to {account_currency}: "
+                         f"add {account_currency}{quote} or {quote}{account_currency} to the bars")
+    # The latest rate known at each bar of the pair
+    return rate.reindex(rate.index.union(index)).ffill().bfill().reindex(index)
+
+
+def backtest(bars, initial_capital=100_000.0, account_currency="USD", **kwargs):
+    """
+    Backtest every pair in `bars` ({symbol: OHLC frame}) on one `account_currency` account.
+
+    P&L is converted from each pair's quote currency with `quote_conversion`: a
+    trade's at its exit bar, the equity curve bar by bar as it changes.
+
+    Returns (trades, equity, stats): trades sorted by entry time, with pnl in the
+    account currency and pnl_quote in the pair's, up to the account's ruin if it is
+    ruined; the combined equity change curve (pairs aligned on time, forward-filled);
+    and `kpis` for it.
+    """
+    all_trades = []
+    curves = []
+    for symbol, ohlc in bars.items():
+        trades, equity = backtest_pair(ohlc, symbol, **kwargs)
+        factor = quote_conversion(symbol, bars, account_currency)
+        trades["pnl_quote"] = trades["pnl"]
+        trades["pnl"] = trades["pnl_quote"] * factor.reindex(trades["exit_time"]).to_numpy()
+        changes = equity.diff().fillna(equity.iloc[:1]) * factor
+        all_trades.append(trades)
+        curves.append(changes.cumsum())
+    trades = pd.concat(all_trades, ignore_index=True).sort_values("entry_time", ignore_index=True)
+    equity = pd.concat(curves, axis=1).ffill().fillna(0.0).sum(axis=1)
+    stats = kpis(trades, equity, initial_capital)
+    if stats["ruined"]:
+        trades = trades[trades["exit_time"] <= stats["ruin_time"]].reset_index(drop=True)
+    return trades, equity, stats
+
+
+def mt5_rates_to_ohlc(rates):
+    """MetaTrader rates (as from `copy_rates_range` or `synthetic_fx_bars`) in the `get_5m_candles` layout."""
+    data_df = pd.DataFrame(rates)
+    data_df.time = pd.to_datetime(data_df.time, unit="s")
+    data_df.set_index("time", inplace=True)
+    data_df.rename(columns={"open": "Open", "high": "High", "low": "Low", "close": "Close"}, inplace=True)
+    return data_df
+
+
+def benchmark_backtest(n_pairs=5, years=3, seed=0):
+    """Backtest `n_pairs` synthetic pairs over `years` of M5 bars and report the wall-clock time."""
+    from synthetic_data import synthetic_fx_bars
+
+    symbols = ["EURUSD", "GBPUSD", "USDCHF", "AUDUSD", "USDCAD", "NZDUSD", "USDJPY", "EURJPY"]
+    symbols = (symbols * (n_pairs // len(symbols) + 1))[:n_pairs]
+    symbols = [s if symbols.index(s) == i else f"{s}{i}" for i, s in enumerate(symbols)]
+    n_bars = int(years * 365 * 288)
+    bars = {symbol: mt5_rates_to_ohlc(rates) for symbol, rates in synthetic_fx_bars(symbols, n_bars, seed=seed).items()}
+
+    t0 = time.perf_counter()
+    trades, equity, stats = backtest(bars)
+    elapsed = time.perf_counter() - t0
+    print(f"{n_pairs} pairs x {n_bars} M5 bars ({years} years): {elapsed:.2f}s, {len(trades)} trades")
+    print({k: v for k, v in stats.items() if k != "exit_reasons"})
+    print(stats["exit_reasons"])
+    return elapsed, stats
+
+
+if __name__ == "__main__":
+    compare_with_replay()
+    benchmark_backtest()
@@ -0,0 +1,221 @@
+"""
+Streaming per-ticker results for the technical analyst.
+
+`technical_analyst_agent_yf` keeps every ticker's report in one dict and only
+returns a single JSON string at the end. `iter_reports` instead yields each
+report as soon as it is ready: prices are downloaded concurrently with
+`iter_fetch` and every ticker is analyzed as its download completes, while the
+remaining downloads continue. `write_ndjson` writes one JSON line per ticker
+to a file path, file object or socket and flushes it, so a consumer sees
+results while the run is still going and no report is kept once written.
+
+Reports are built without the recursive `normalize_pandas` pass; NumPy scalars
+and arrays (and pandas objects, should a metric hold one) are converted by the
+encoder's `default` hook where they occur.
+
+Functions:
+- json_default(obj): JSON conversion for NumPy and pandas values.
+- dumps_record(record): one compact NDJSON line.
+- iter_reports(data, fetch): yield (ticker, report, error) as each ticker finishes.
+- aiter_reports(data, fetch): async-iterator version of iter_reports.
+- write_ndjson(data, target, fetch): stream every report to a file or socket as NDJSON.
+- benchmark_stream(n_tickers, latency): time to first result and peak memory, streaming vs batch.
+"""
+
+import asyncio
+import datetime
+import io
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from concurrent_fetch import iter_fetch
+from instrumentation import NULL, Instrumentation
+from technical_agent import analyze_prices, fetch_stock_data
+
+
+def json_default(obj):
+    """`default` hook for json.dumps: NumPy scalars and arrays, pandas objects and timestamps."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (np.ndarray, pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict("records")
+    if isinstance(obj, (pd.Timestamp, datetime.date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_record(record):
+    return json.dumps(record, default=json_default, separators=(",", ":")) + "\n"
+
+
+def iter_reports(data, fetch=None):
+    """
+    Yield (ticker, report, error) for every ticker in completion order.
+
+    Args:
+        data (dict): as for `technical_analyst_agent_yf` ("tickers", "start_date",
+            "end_date", "fetch_workers", "fetch_rate_limit", "fetch_timeout"; an
+            Instrumentation in data["instrument"] times fetch and strategies).
+        fetch (callable): fetch(ticker) -> price DataFrame; default `fetch_stock_data`
+            over the data's date range.
+
+    error is None for a finished report; a ticker whose download fails, has no prices
+    or whose analysis raises is yielded with report None and the reason, and the
+    remaining tickers continue.
+    """
+    instrument = data.get("instrument")
+    if not isinstance(instrument, Instrumentation):
+        instrument = NULL
+    if fetch is None:
+        start_date, end_date = data["start_date"], data["end_date"]
+        fetch = lambda ticker: fetch_stock_data(ticker, start_date, end_date)
+
+    def timed_fetch(ticker):
+        with instrument.timer("fetch", ticker):
+            return fetch(ticker)
+
+    for ticker, prices_df, error in iter_fetch(
+        timed_fetch,
+        data["tickers"],
+        max_workers=data.get("fetch_workers", 8),
+        rate_limit=data.get("fetch_rate_limit"),
+        timeout=data.get("fetch_timeout"),
+    ):
+        if error is None and (prices_df is None or prices_df.empty):
+            error = "no price data"
+        if error is not None:
+            yield ticker, None, error
+            continue
+        try:
+            report = analyze_prices(prices_df, ticker, instrument=instrument, normalize=False)
+        except Exception as e:
+            yield ticker, None, f"{type(e).__name__}: {e}"
+            continue
+        yield ticker, report, None
+
+
+async def aiter_reports(data, fetch=None):
+    """
+    Async iterator over `iter_reports(data, fetch)`.
+
+    Each step runs on the event loop's default executor, so the loop stays free
+    while prices download and strategies run.
+    """
+    loop = asyncio.get_running_loop()
+    reports = iter_reports(data, fetch)
+    finished = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, next, reports, finished)
+            if item is finished:
+                return
+            yield item
+    finally:
+        reports.close()
+
+
+def write_ndjson(data, target, fetch=None):
+    """
+    Write one JSON line per ticker as soon as its report is ready.
+
+    Args:
+        data (dict), fetch: as for `iter_reports`.
+        target: file path, text or binary file object, or connected socket.
+
+    Each line is {"ticker": ..., "report": {...}} or {"ticker": ..., "error": "..."}.
+
+    Returns:
+        dict: reports and errors written, seconds to the first line and in total.
+    """
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "w") as f:
+            return write_ndjson(data, f, fetch)
+
+    if hasattr(target, "sendall"):
+        write = lambda line: target.sendall(line.encode())
+    elif isinstance(target, (io.RawIOBase, io.BufferedIOBase)) or "b" in getattr(target, "mode", ""):
+        write = lambda line: (target.write(line.encode()), target.flush())
+    else:
+        write = lambda line: (target.write(line), target.flush())
+
+    t0 = time.perf_counter()
+    summary = {"reports": 0, "errors": 0, "first_result_seconds": None, "seconds": None}
+    for ticker, report, error in iter_reports(data, fetch):
+        if error is None:
+            write(dumps_record({"ticker": ticker, "report": report}))
+            summary["reports"] += 1
+        else:
+            write(dumps_record({"ticker": ticker, "error": error}))
+            summary["errors"] += 1
+        if summary["first_result_seconds"] is None:
+            summary["first_result_seconds"] = time.perf_counter() - t0
+    summary["seconds"] = time.perf_counter() - t0
+    return summary
+
+
+def benchmark_stream(n_tickers=500, n_dates=300, latency=0.01, fetch_workers=8, seed=0):
+    """
+    Compare the batch agent loop (fetch all, analyze all, one json.dumps) with
+    `write_ndjson` on synthetic tickers whose fetch sleeps `latency` seconds.
+
+    Reports time to the first result, total time and the tracemalloc peak of each.
+    The price frames are built beforehand and the in-memory NDJSON sink (a file or
+    socket in real use) is subtracted, so the peaks cover the run's own allocations.
+    """
+    from concurrent_fetch import fetch_many
+    from synthetic_data import panel_to_yf_frame, synthetic_ohlcv_panel
+
+    panel = synthetic_ohlcv_panel(n_dates, n_tickers, seed=seed)
+    prices = {ticker: panel_to_yf_frame(panel, j) for j, ticker in enumerate(panel["tickers"])}
+
+    def fetch(ticker):
+        time.sleep(latency)
+        return prices[ticker]
+
+    def batch():
+        fetched, _ = fetch_many(fetch, panel["tickers"], max_workers=fetch_workers)
+        technical_analysis = {}
+        for ticker, prices_df in fetched.items():
+            try:
+                technical_analysis[ticker] = analyze_prices(prices_df, ticker)
+            except Exception:
+                pass
+        return json.dumps(technical_analysis)
+
+    data = {"tickers": panel["tickers"], "fetch_workers": fetch_workers}
+    results = {}
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    text = batch()
+    seconds = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # The batch result is only available once every ticker is done
+    results["batch"] = {"first_result_seconds": seconds, "seconds": seconds, "peak_bytes": peak, "bytes": len(text)}
+    del text
+
+    sink = io.BytesIO()
+    tracemalloc.start()
+    summary = write_ndjson(data, sink, fetch)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results["stream"] = {"first_result_seconds": summary["first_result_seconds"], "seconds": summary["seconds"],
+                         "peak_bytes": peak - sink.getbuffer().nbytes, "bytes": sink.getbuffer().nbytes}
+
+    print(f"{n_tickers} tickers x {n_dates} bars, {latency * 1e3:.0f} ms fetch latency, {fetch_workers} fetch workers")
+    for name, row in results.items():
+        print(f"{name:>6}: first result {row['first_result_seconds']:.3f}s, total {row['seconds']:.2f}s, "
+              f"peak {row['peak_bytes'] / 2**20:.1f} MiB, output {row['bytes'] / 2**20:.2f} MiB")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_stream()
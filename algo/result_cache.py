@@ -0,0 +1,297 @@
+"""
+Persistent, content-addressed cache for backtest results.
+
+A result is stored under a hash of the function name, its code and its
+arguments, with DataFrames and arrays hashed by their contents (values, index
+and columns), so re-running a backtest on the same return data with the same parameters
+is served from disk, across runs and processes, no matter where the data
+came from. Changing the function's source, the source of anything listed in
+its `depends`, its `version` or `CACHE_VERSION` starts from new entries.
+Entries are pickle files in one directory; the cache is bounded in
+bytes and evicts the least recently used entries first. Recently used entries
+are also kept in memory as pickled bytes, so every lookup returns a fresh copy
+that callers may modify.
+
+Classes:
+- ResultCache: get/put by key, a `cached` decorator and hit/miss statistics.
+
+Functions:
+- fingerprint(value): content hash of a DataFrame, Series, array or plain value.
+- code_fingerprint(*objects): hash of the source (or bytecode) of functions and modules.
+- benchmark_cache(n_months, n_tickers): repeated pflio calls with and without the cache.
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".dailyinvestai", "result_cache")
+# Part of every key; bump it to invalidate all stored results
+CACHE_VERSION = 1
+
+
+def _update(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(b"frame")
+        _update(h, value.index)
+        _update(h, value.columns)
+        for dtype in value.dtypes:
+            h.update(str(dtype).encode())
+        _update(h, value.to_numpy())
+    elif isinstance(value, pd.Series):
+        h.update(b"series")
+        _update(h, value.index)
+        h.update(str(value.name).encode())
+        _update(h, value.to_numpy())
+    elif isinstance(value, pd.Index):
+        h.update(type(value).__name__.encode())
+        _update(h, value.to_numpy())
+    elif isinstance(value, np.ndarray):
+        h.update(f"array{value.dtype.str}{value.shape}".encode())
+        if value.dtype.kind == "O":
+            h.update(pickle.dumps(value.tolist(), protocol=4))
+        else:
+            h.update(np.ascontiguousarray(value).view(np.uint8).data)
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update(h, item)
+    elif isinstance(value, dict):
+        h.update(f"dict{len(value)}".encode())
+        for k in sorted(value, key=repr):
+            _update(h, k)
+            _update(h, value[k])
+    else:
+        h.update(repr(value).encode())
+
+
+def fingerprint(*values):
+    """Hex digest identifying `values` by content."""
+    h = hashlib.blake2b(digest_size=20)
+    for value in values:
+        _update(h, value)
+    return h.hexdigest()
+
+
+def code_fingerprint(*objects):
+    """Hex digest of the source of functions, classes or modules (bytecode where the source is unavailable)."""
+    h = hashlib.blake2b(digest_size=20)
+    for obj in objects:
+        try:
+            h.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            code = getattr(obj, "__code__", None)
+            if code is None:
+                raise TypeError(f"cannot fingerprint the code of {obj!r}")
+            h.update(code.co_code)
+            _update(h, code.co_consts)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Directory of pickled results keyed by content hash, bounded to `max_bytes`.
+
+    Usage:
+        cache = ResultCache()
+        pflio = cache.cached(pflio, depends=[rebalance_engine])
+        pflio(return_df, 6, 3)   # computed and stored
+        pflio(return_df, 6, 3)   # served from the cache
+        cache.stats()
+
+    Args:
+        root (str): cache directory; default ~/.dailyinvestai/result_cache.
+        max_bytes (int): total size of the entries on disk; least recently used
+            entries are deleted beyond it.
+        memory_bytes (int): size of the in-process copy of recently used entries.
+    """
+    def __init__(self, root=None, max_bytes=256 * 2**20, memory_bytes=32 * 2**20):
+        self.root = root or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Entries on disk by last use (file mtime), oldest first
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".pkl"):
+                st = os.stat(os.path.join(self.root, name))
+                entries.append((st.st_mtime, name[:-4], st.st_size))
+        self.sizes = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self.total_bytes = sum(self.sizes.values())
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".pkl")
+
+    def key(self, name, *args, **kwargs):
+        """Cache key for calling `name` with these arguments."""
+        return fingerprint(name, args, kwargs)
+
+    def _remember(self, key, blob):
+        self.memory[key] = blob
+        self.memory.move_to_end(key)
+        held = sum(len(b) for b in self.memory.values())
+        while held > self.memory_bytes and len(self.memory) > 1:
+            _, dropped = self.memory.popitem(last=False)
+            held -= len(dropped)
+
+    def get(self, key):
+        """Returns (True, value) on a hit and (False, None) on a miss."""
+        with self.lock:
+            blob = self.memory.get(key)
+            if blob is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+            elif key in self.sizes:
+                try:
+                    with open(self._path(key), "rb") as f:
+                        blob = f.read()
+                except OSError:
+                    # Deleted by another process
+                    self.total_bytes -= self.sizes.pop(key)
+                else:
+                    self._remember(key, blob)
+            if blob is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            if key in self.sizes:
+                self.sizes.move_to_end(key)
+                try:
+                    os.utime(self._path(key))
+                except OSError:
+                    pass
+        return True, pickle.loads(blob)
+
+    def put(self, key, value):
+        """Store `value` under `key` and evict least recently used entries beyond `max_bytes`."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, self._path(key))
+        with self.lock:
+            self.total_bytes += len(blob) - self.sizes.pop(key, 0)
+            self.sizes[key] = len(blob)
+            self._remember(key, blob)
+            while self.total_bytes > self.max_bytes and len(self.sizes) > 1:
+                old, size = self.sizes.popitem(last=False)
+                self.total_bytes -= size
+                self.memory.pop(old, None)
+                self.evictions += 1
+                try:
+                    os.remove(self._path(old))
+                except OSError:
+                    pass
+
+    def cached(self, fn=None, *, version=None, depends=()):
+        """
+        Decorator: look calls of `fn` up by the content of their arguments before computing them.
+
+        Arguments are bound to `fn`'s signature with defaults applied, so f(a, m=1)
+        and f(a, 1) share an entry. The key also covers the code of `fn` and of
+        the functions or modules in `depends` (what `fn` calls), `version` and
+        CACHE_VERSION. Globals that `fn` reads are not part of the key; pass them
+        as arguments.
+
+        Usage: `cache.cached(fn)` or `@cache.cached(version=2, depends=[rebalance_engine])`.
+        """
+        if fn is None:
+            return lambda fn: self.cached(fn, version=version, depends=depends)
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        signature = inspect.signature(fn)
+        salt = (CACHE_VERSION, version, fn.__code__.co_code, code_fingerprint(fn, *depends))
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = self.key(name, salt, dict(bound.arguments))
+            hit, value = self.get(key)
+            if not hit:
+                value = fn(*args, **kwargs)
+                self.put(key, value)
+            return value
+
+        wrapper.cache = self
+        return wrapper
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.sizes):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self.sizes.clear()
+            self.memory.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self.sizes),
+            "bytes": self.total_bytes,
+        }
+
+
+def benchmark_cache(n_months=120, n_tickers=500, repeats=4, seed=0):
+    """
+    Time `repeats` pflio-style calls (as the KPI section of `portfolio_rebalance.py`
+    makes) without a cache, with a cold cache and from a new process-level
+    instance reading the same directory.
+    """
+    import rebalance_engine
+    from rebalance_engine import _legacy_pflio
+
+    rng = np.random.default_rng(seed)
+    returns = pd.DataFrame(rng.normal(0.01, 0.08, (n_months, n_tickers)),
+                           columns=[f"T{j:04d}" for j in range(n_tickers)])
+    with tempfile.TemporaryDirectory() as root:
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            _legacy_pflio(returns, 6, 3)
+        uncached = time.perf_counter() - t0
+
+        cache = ResultCache(root)
+        pflio = cache.cached(_legacy_pflio, depends=[rebalance_engine])
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            pflio(returns, 6, 3)
+        cold = time.perf_counter() - t0
+        print("first run:", cache.stats())
+
+        cache = ResultCache(root)
+        pflio = cache.cached(_legacy_pflio, depends=[rebalance_engine])
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            pflio(returns, 6, 3)
+        warm = time.perf_counter() - t0
+        print("second run:", cache.stats())
+
+    print(f"{repeats} x pflio on {n_months} months x {n_tickers} tickers: {uncached:.2f}s uncached, "
+          f"{cold:.2f}s first run, {warm:.4f}s from disk")
+    return {"uncached_s": uncached, "cold_s": cold, "warm_s": warm}
+
+
+if __name__ == "__main__":
+    benchmark_cache()
@@ -0,0 +1,205 @@
+"""
+Full-universe technical screener.
+
+Runs the four strategies of `technical_agent.py` and `weighted_signal_combination`
+over a whole listed universe (e.g. the ~760 NSE names in
+`data/all_companies_nse.xlsx`) and keeps only the strongest names: the top-K
+bullish and top-K bearish tickers by combined score, held in two bounded
+heaps so memory does not grow with the universe. Prices come from the local
+`PriceStore`; tickers are processed in batches on the vectorized panel engine
+of `technical_panel.py`, and the run stops after the batch that exceeds the
+time budget, reporting how much of the universe was screened. Within a batch,
+tickers with the same dates share a panel; a ticker missing days is evaluated
+on its own dates, so its rolling windows are the ones `analyze_prices` uses.
+
+Ranking uses the unrounded combined confidence; the reports of
+`technical_analyst_agent_yf` round it to a whole number.
+
+Functions:
+- load_universe(path, suffix): ticker symbols from the NSE company list.
+- screen(tickers, start_date, end_date, top_k, time_budget): ranked table of the top bullish and bearish names.
+- benchmark_screener(n_tickers, time_budget): cold and warm screening time on a local store.
+"""
+
+import contextlib
+import heapq
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from concurrent_fetch import fetch_many
+from price_store import default_price_store
+from technical_agent import weighted_signal_combination
+from technical_panel import latest_strategy_signals, panel_latest_values
+
+DEFAULT_UNIVERSE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "all_companies_nse.xlsx")
+
+STRATEGY_WEIGHTS = {
+    "trend": 0.30,
+    "mean_reversion": 0.25,
+    "momentum": 0.30,
+    "volatility": 0.15,
+}
+
+FIELDS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+
+def load_universe(path=DEFAULT_UNIVERSE, suffix=".NS"):
+    """Symbols of the "symbol" column of the company list, with the Yahoo exchange suffix."""
+    listed = pd.read_excel(path)
+    listed.columns = [c.lower() for c in listed.columns]
+    symbols = listed["symbol"].dropna().astype(str).str.strip()
+    return [symbol + suffix for symbol in dict.fromkeys(symbols) if symbol]
+
+
+def _date_groups(prices, tickers):
+    """Tickers grouped by identical date index, in first-seen order."""
+    groups = {}
+    for ticker in tickers:
+        index = prices[ticker].index
+        groups.setdefault((len(index), index.asi8.tobytes()), []).append(ticker)
+    return list(groups.values())
+
+
+def _batch_panel(prices, tickers):
+    """(dates x tickers) OHLCV arrays aligned on the union of the tickers' dates."""
+    frames = {ticker: prices[ticker] for ticker in tickers}
+    dates = frames[tickers[0]].index
+    for ticker in tickers[1:]:
+        if not frames[ticker].index.equals(dates):
+            dates = dates.union(frames[ticker].index)
+    panel = {"dates": dates, "tickers": list(tickers)}
+    for field, column in FIELDS.items():
+        values = np.full((len(dates), len(tickers)), np.nan)
+        for j, ticker in enumerate(tickers):
+            frame = frames[ticker]
+            rows = slice(None) if frame.index.equals(dates) else dates.get_indexer(frame.index)
+            values[rows, j] = frame[column].to_numpy(dtype=np.float64)
+        panel[field] = values
+    return panel
+
+
+def _push(heap, top_k, item):
+    """Keep the `top_k` largest items of a min-heap."""
+    if len(heap) < top_k:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heappushpop(heap, item)
+
+
+def screen(tickers, start_date, end_date, top_k=20, time_budget=None, batch_size=250, store=None,
+           fetch_workers=8):
+    """
+    Screen `tickers` and return the top-K bullish and bearish names.
+
+    Args:
+        tickers (list): universe to screen, e.g. from `load_universe`.
+        start_date, end_date: price history window (as for `technical_analyst_agent_yf`).
+        top_k (int): names kept per side.
+        time_budget (float): seconds after which no further batch is started (None = no limit).
+        batch_size (int): tickers loaded and evaluated together.
+        store (PriceStore): price source; default `default_price_store()`.
+        fetch_workers (int): concurrent store reads / downloads.
+
+    Returns:
+        tuple: (table, stats) — table has one row per kept name: side, rank, ticker,
+               signal, score (signed combined score), confidence and the four strategy
+               signals; stats counts screened, skipped and failed tickers and the time.
+    """
+    store = store if store is not None else default_price_store()
+    t0 = time.perf_counter()
+    bullish, bearish = [], []
+    screened = 0
+    failed = {}
+    started = 0
+
+    for start in range(0, len(tickers), batch_size):
+        if time_budget is not None and time.perf_counter() - t0 >= time_budget:
+            break
+        batch = tickers[start:start + batch_size]
+        started += len(batch)
+        prices, failures = fetch_many(lambda ticker: store.fetch(ticker, start_date, end_date), batch,
+                                      max_workers=fetch_workers)
+        failed.update(failures)
+        available = [ticker for ticker in batch if ticker in prices and len(prices[ticker])]
+        if not available:
+            continue
+
+        # Aligning tickers with different dates would put NaN rows inside the rolling windows
+        for group in _date_groups(prices, available):
+            latest, has_data = panel_latest_values(_batch_panel(prices, group))
+            with contextlib.redirect_stdout(io.StringIO()):
+                for j, ticker in enumerate(group):
+                    if not has_data[j]:
+                        continue
+                    trend, mean_reversion, momentum, volatility = latest_strategy_signals(
+                        {name: values[j] for name, values in latest.items()}
+                    )
+                    combined = weighted_signal_combination(
+                        {"trend": trend, "mean_reversion": mean_reversion, "momentum": momentum,
+                         "volatility": volatility},
+                        STRATEGY_WEIGHTS,
+                    )
+                    screened += 1
+                    row = (combined["signal"], ticker, trend["signal"], mean_reversion["signal"],
+                           momentum["signal"], volatility["signal"])
+                    if combined["signal"] == "bullish":
+                        _push(bullish, top_k, (combined["confidence"], ticker, row))
+                    elif combined["signal"] == "bearish":
+                        _push(bearish, top_k, (combined["confidence"], ticker, row))
+
+    rows = []
+    for side, heap, sign in (("bullish", bullish, 1), ("bearish", bearish, -1)):
+        for rank, (confidence, _, row) in enumerate(sorted(heap, reverse=True), start=1):
+            signal, ticker, trend, mean_reversion, momentum, volatility = row
+            rows.append((side, rank, ticker, signal, sign * confidence, confidence,
+                         trend, mean_reversion, momentum, volatility))
+    table = pd.DataFrame(rows, columns=["side", "rank", "ticker", "signal", "score", "confidence",
+                                        "trend", "mean_reversion", "momentum", "volatility"])
+    stats = {
+        "universe": len(tickers),
+        "screened": screened,
+        "failed": len(failed),
+        "not_reached": len(tickers) - started,
+        "seconds": time.perf_counter() - t0,
+    }
+    return table, stats
+
+
+def benchmark_screener(n_tickers=2000, n_dates=300, top_k=20, time_budget=30.0, seed=0):
+    """
+    Screen `n_tickers` synthetic tickers from a PriceStore backed by local CSV files:
+    first with an empty store (every ticker read from CSV), then warm.
+    """
+    import tempfile
+
+    from price_store import LocalFileProvider, PriceStore
+    from synthetic_data import synthetic_ohlcv_panel
+
+    panel = synthetic_ohlcv_panel(n_dates, n_tickers, seed=seed)
+    dates = panel["dates"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_root = os.path.join(tmp_dir, "csv")
+        for j, ticker in enumerate(panel["tickers"]):
+            prices_df = pd.DataFrame({column: panel[field][:, j] for field, column in FIELDS.items()},
+                                     index=pd.DatetimeIndex(dates, name="Date"))
+            LocalFileProvider.write(csv_root, ticker, prices_df)
+        store = PriceStore(os.path.join(tmp_dir, "store"), LocalFileProvider(csv_root))
+        end = dates[-1] + pd.Timedelta(days=1)
+
+        results = {}
+        for run in ("cold", "warm"):
+            table, stats = screen(panel["tickers"], dates[0], end, top_k=top_k, time_budget=time_budget,
+                                  store=store)
+            results[run] = stats
+            print(f"{run}: {stats['screened']}/{stats['universe']} tickers screened in {stats['seconds']:.2f}s "
+                  f"(budget {time_budget:.0f}s, {stats['not_reached']} not reached, {stats['failed']} failed)")
+    print(table.head(10).to_string(index=False))
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_screener()
@@ -0,0 +1,357 @@
+"""
+Streaming, O(1)-per-bar indicator state for incremental updates.
+
+`StreamingIndicatorSet` keeps the running state of every indicator the four
+strategies in `technical_agent.py` use (EMA recursions, the ADX exponential
+sums, ring-buffer rolling windows with sliding Welford mean/variance) and
+updates it one bar at a time. The state can be checkpointed to disk, so a
+nightly refresh only has to feed the bars that arrived since the last run.
+
+Classes:
+- RollingWindow: fixed-size ring buffer with running sum, mean and sample std.
+- StreamingIndicatorSet: per-ticker indicator state emitting the strategy signals.
+
+Functions:
+- compare_with_batch(prices_df): check streaming results against the pandas path.
+"""
+
+import math
+import os
+import pickle
+
+import numpy as np
+
+from indicator_graph import _as_series
+from technical_agent import analyze_prices, build_ticker_report
+from technical_panel import latest_strategy_signals
+
+NAN = float("nan")
+
+
+class RollingWindow:
+    """
+    Fixed-size ring buffer with sliding Welford mean and variance.
+
+    Matches `Series.rolling(size)`: results are NaN until `size` values have
+    been pushed and while any value in the window is NaN.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.buffer = [0.0] * size
+        self.head = 0
+        self.count = 0
+        self.nan_count = 0
+        self.mean_value = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        is_nan = math.isnan(x)
+        if self.count == self.size:
+            old = self.buffer[self.head]
+            self.nan_count -= math.isnan(old)
+        else:
+            old = None
+            self.count += 1
+        self.nan_count += is_nan
+        self.buffer[self.head] = x
+        self.head = (self.head + 1) % self.size
+
+        if self.nan_count:
+            return
+        if old is None or math.isnan(old) or self.head == 0:
+            # Window just became clean, or the ring wrapped around: resync exactly
+            # so rounding from the sliding updates cannot accumulate
+            self._recompute()
+        else:
+            old_mean = self.mean_value
+            self.mean_value += (x - old) / self.size
+            self.m2 += (x - old) * (x - self.mean_value + old - old_mean)
+
+    def _recompute(self):
+        values = self.buffer[:self.count]
+        self.mean_value = math.fsum(values) / self.count
+        self.m2 = math.fsum((v - self.mean_value) ** 2 for v in values)
+
+    def ready(self):
+        return self.count == self.size and self.nan_count == 0
+
+    def mean(self):
+        return self.mean_value if self.ready() else NAN
+
+    def sum(self):
+        return self.mean_value * self.size if self.ready() else NAN
+
+    def std(self):
+        if not self.ready():
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / (self.size - 1))
+
+
+class _Ema:
+    """
+    `ewm(span=span, adjust=False).mean()` recursion.
+
+    Like pandas (ignore_na=False), the old value keeps decaying across NaNs:
+    after `k` of them the next observation is weighted against (1 - alpha)**(k+1).
+    """
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = NAN
+        self.gap = 0
+
+    def __setstate__(self, state):
+        # Checkpoints written before NaN gaps were tracked load with no gap open
+        state.setdefault("gap", 0)
+        self.__dict__.update(state)
+
+    def push(self, x):
+        if math.isnan(self.value):
+            self.value = x
+        elif math.isnan(x):
+            self.gap += 1
+        elif self.gap:
+            old_weight = (1.0 - self.alpha) ** (self.gap + 1)
+            self.value += self.alpha * (x - self.value) / (old_weight + self.alpha)
+            self.gap = 0
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class _AdjustedEwm:
+    """`ewm(span=span).mean()` (adjust=True) as running weighted sums."""
+    def __init__(self, span):
+        self.decay = 1.0 - 2.0 / (span + 1.0)
+        self.num = 0.0
+        self.den = 0.0
+
+    def push(self, x):
+        self.num *= self.decay
+        self.den *= self.decay
+        if not math.isnan(x):
+            self.num += x
+            self.den += 1.0
+        return self.num / self.den if self.den > 0 else NAN
+
+
+def _div(a, b):
+    if math.isnan(a) or math.isnan(b):
+        return NAN
+    if b == 0:
+        return NAN if a == 0 else math.copysign(math.inf, a)
+    return a / b
+
+
+class StreamingIndicatorSet:
+    """
+    Incremental indicator state for one ticker.
+
+    Usage:
+        state = StreamingIndicatorSet.load(path) if os.path.exists(path) else StreamingIndicatorSet()
+        state.update_frame(prices_df)       # only bars newer than the last checkpoint are used
+        report = state.report()
+        state.save(path)
+    """
+    def __init__(self, adx_period=14, atr_window=14):
+        self.ema_8 = _Ema(8)
+        self.ema_21 = _Ema(21)
+        self.ema_55 = _Ema(55)
+
+        self.tr_avg = _AdjustedEwm(adx_period)
+        self.plus_dm_avg = _AdjustedEwm(adx_period)
+        self.minus_dm_avg = _AdjustedEwm(adx_period)
+        self.dx_avg = _AdjustedEwm(adx_period)
+
+        self.close_20 = RollingWindow(20)
+        self.close_50 = RollingWindow(50)
+        self.gain_14 = RollingWindow(14)
+        self.loss_14 = RollingWindow(14)
+        self.returns_21 = RollingWindow(21)
+        self.returns_63 = RollingWindow(63)
+        self.returns_126 = RollingWindow(126)
+        self.volume_21 = RollingWindow(21)
+        self.tr_window = RollingWindow(atr_window)
+        self.hist_vol_63 = RollingWindow(63)
+
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_close = NAN
+        self.last_close = NAN
+        self.last_timestamp = None
+        self.bars = 0
+        self.latest = {}
+
+    def __setstate__(self, state):
+        # Checkpoints written before NaN closes were padded resume from their previous close
+        state.setdefault("last_close", state["prev_close"])
+        self.__dict__.update(state)
+
+    def update(self, high, low, close, volume, timestamp=None):
+        """Fold one new bar into the state and return the latest indicator values."""
+        prev_close = self.prev_close
+        # Returns follow pct_change(): closes are padded across NaNs, so a gap reads as flat
+        last_close = self.last_close if math.isnan(close) else close
+        returns = _div(last_close, self.last_close) - 1
+
+        # Trend following
+        ema_8 = self.ema_8.push(close)
+        ema_21 = self.ema_21.push(close)
+        ema_55 = self.ema_55.push(close)
+
+        high_close = abs(high - prev_close)
+        low_close = abs(low - prev_close)
+        tr = max((v for v in (high - low, high_close, low_close) if not math.isnan(v)), default=NAN)
+        up_move = high - self.prev_high
+        down_move = self.prev_low - low
+        plus_dm = up_move if (up_move > down_move and up_move > 0) else 0.0
+        minus_dm = down_move if (down_move > up_move and down_move > 0) else 0.0
+        tr_avg = self.tr_avg.push(tr)
+        plus_di = 100 * _div(self.plus_dm_avg.push(plus_dm), tr_avg)
+        minus_di = 100 * _div(self.minus_dm_avg.push(minus_dm), tr_avg)
+        dx = 100 * _div(abs(plus_di - minus_di), plus_di + minus_di)
+        adx = self.dx_avg.push(dx)
+
+        # Mean reversion
+        self.close_20.push(close)
+        self.close_50.push(close)
+        delta = close - prev_close
+        self.gain_14.push(delta if delta > 0 else 0.0)
+        self.loss_14.push(-delta if delta < 0 else 0.0)
+        z_score = _div(close - self.close_50.mean(), self.close_50.std())
+        bb_upper = self.close_20.mean() + self.close_20.std() * 2
+        bb_lower = self.close_20.mean() - self.close_20.std() * 2
+        price_vs_bb = _div(close - bb_lower, bb_upper - bb_lower)
+        rs = _div(self.gain_14.mean(), self.loss_14.mean())
+        rsi_14 = 100 - _div(100, 1 + rs)
+
+        # Momentum
+        self.returns_21.push(returns)
+        self.returns_63.push(returns)
+        self.returns_126.push(returns)
+        self.volume_21.push(volume)
+
+        # Volatility
+        hist_vol = self.returns_21.std() * math.sqrt(252)
+        self.hist_vol_63.push(hist_vol)
+        vol_ma = self.hist_vol_63.mean()
+        self.tr_window.push(tr)
+        atr = self.tr_window.mean()
+        atr = 0.0 if math.isnan(atr) else atr
+        close_for_atr = 0.0 if math.isnan(close) else close
+
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        self.last_close = last_close
+        self.last_timestamp = timestamp
+        self.bars += 1
+        self.latest = {
+            "ema_8": ema_8,
+            "ema_21": ema_21,
+            "ema_55": ema_55,
+            "adx": adx,
+            "z_score": z_score,
+            "price_vs_bb": price_vs_bb,
+            "rsi_14": rsi_14,
+            "momentum_1m": self.returns_21.sum(),
+            "momentum_3m": self.returns_63.sum(),
+            "momentum_6m": self.returns_126.sum(),
+            "volume_momentum": _div(volume, self.volume_21.mean()),
+            "historical_volatility": hist_vol,
+            "volatility_regime": _div(hist_vol, vol_ma),
+            "volatility_z_score": _div(hist_vol - vol_ma, self.hist_vol_63.std()),
+            "atr_ratio": atr / close_for_atr if close_for_atr != 0 else 0.0,
+        }
+        return self.latest
+
+    def update_frame(self, prices_df):
+        """
+        Feed the rows of a price DataFrame that are newer than the last bar seen.
+
+        Returns the number of bars consumed.
+        """
+        columns = [
+            np.asarray(_as_series(prices_df[field]), dtype=np.float64)
+            for field in ["high", "low", "close", "volume"]
+        ]
+        index = prices_df.index
+        start = 0 if self.last_timestamp is None else index.searchsorted(self.last_timestamp, side="right")
+        for i in range(start, len(index)):
+            self.update(columns[0][i], columns[1][i], columns[2][i], columns[3][i], index[i])
+        return len(index) - start
+
+    def signals(self):
+        """Trend, mean reversion, momentum and volatility signal dicts for the latest bar."""
+        return latest_strategy_signals(self.latest)
+
+    def report(self):
+        """The per-ticker report `technical_analyst_agent_yf` would build for the same history."""
+        return build_ticker_report(*self.signals())
+
+    def save(self, path):
+        """Checkpoint the state to `path` (written atomically)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    @classmethod
+    def from_frame(cls, prices_df, **kwargs):
+        state = cls(**kwargs)
+        state.update_frame(prices_df)
+        return state
+
+
+def compare_with_batch(prices_df, checkpoint_path=None, nan_gap=0):
+    """
+    Stream `prices_df` bar by bar and compare the result with the pandas strategies.
+
+    If `checkpoint_path` is given, the stream is checkpointed halfway through and
+    resumed from disk, which must not change the result. If `nan_gap` is given,
+    that many bars 40 bars before the end are blanked first (missing quotes),
+    which the EMAs and returns must handle like pandas does.
+
+    Returns the largest absolute difference between the two reports and the
+    latest EMA values.
+    """
+    from technical_agent import calculate_ema
+    from technical_panel import _report_diff
+
+    if nan_gap:
+        prices_df = prices_df.copy()
+        gap_start = len(prices_df) - 40
+        prices_df.iloc[gap_start:gap_start + nan_gap] = np.nan
+    if checkpoint_path is None:
+        state = StreamingIndicatorSet.from_frame(prices_df)
+    else:
+        half = len(prices_df) // 2
+        StreamingIndicatorSet.from_frame(prices_df.iloc[:half]).save(checkpoint_path)
+        state = StreamingIndicatorSet.load(checkpoint_path)
+        state.update_frame(prices_df)
+
+    batch_report = analyze_prices(prices_df.copy(), "")
+    ema_diff = max(
+        abs(float(calculate_ema(prices_df, span).iloc[-1]) - state.latest[f"ema_{span}"]) for span in (8, 21, 55)
+    )
+    return max(_report_diff(batch_report, state.report()), ema_diff)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    from synthetic_data import synthetic_ohlcv_panel, panel_to_yf_frame
+
+    panel = synthetic_ohlcv_panel(1000, 20, seed=1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for j, ticker in enumerate(panel["tickers"]):
+            try:
+                prices_df = panel_to_yf_frame(panel, j)
+                diff = compare_with_batch(prices_df, os.path.join(tmp_dir, "state.pkl"))
+                gap_diff = compare_with_batch(prices_df, nan_gap=3)
+            except Exception as e:
+                print(f"{ticker}: batch path failed ({e})")
+                continue
+            print(f"{ticker}: max abs diff {diff:.2e}, with a 3-bar NaN gap {gap_diff:.2e}")
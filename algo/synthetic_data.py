@@ -0,0 +1,84 @@
+"""
+Deterministic synthetic market data for offline benchmarks.
+
+Functions:
+- synthetic_ohlcv_panel(n_dates, n_tickers, seed): aligned (dates x tickers) OHLCV arrays.
+- panel_to_yf_frame(panel, j): one ticker of a panel shaped like a renamed yfinance download.
+- synthetic_fx_bars(symbols, n_bars, seed): MetaTrader-style M5 rates for currency pairs.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ohlcv_panel(n_dates, n_tickers, seed=0, start="2015-01-01", freq="B"):
+    """
+    Generate geometric random walk OHLCV bars for several tickers on a shared calendar.
+
+    Returns a dict with "dates" (DatetimeIndex), "tickers" (list of str) and
+    "open", "high", "low", "close", "volume" float64 arrays of shape (n_dates, n_tickers).
+    """
+    rng = np.random.default_rng(seed)
+    shape = (n_dates, n_tickers)
+    start_price = rng.uniform(20, 2000, n_tickers)
+    log_ret = rng.normal(0.0003, 0.02, shape)
+    close = start_price * np.exp(np.cumsum(log_ret, axis=0))
+    open_ = close * np.exp(rng.normal(0, 0.005, shape))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.015, shape))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.015, shape))
+    volume = np.floor(rng.lognormal(13, 0.5, shape))
+
+    return {
+        "dates": pd.date_range(start, periods=n_dates, freq=freq),
+        "tickers": [f"SYN{j:04d}.NS" for j in range(n_tickers)],
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    }
+
+
+def panel_to_yf_frame(panel, j):
+    """
+    Build the DataFrame `fetch_stock_data` would return for ticker j of the panel
+    (lower-case price level, ticker level underneath).
+    """
+    ticker = panel["tickers"][j]
+    fields = ["close", "high", "low", "open", "volume"]
+    columns = pd.MultiIndex.from_product([fields, [ticker]], names=["Price", "Ticker"])
+    values = np.column_stack([panel[field][:, j] for field in fields])
+    prices_df = pd.DataFrame(values, index=panel["dates"], columns=columns)
+    prices_df.index.name = "Date"
+    return prices_df.dropna(how="all")
+
+
+def synthetic_fx_bars(symbols, n_bars, seed=0, start="2024-01-01", bar_seconds=300):
+    """
+    Generate random walk bars for currency pairs in the layout of MetaTrader rates.
+
+    Returns {symbol: DataFrame} with columns time (bar open, epoch seconds), open,
+    high, low, close, tick_volume, spread and real_volume; prices are rounded to
+    the pair's tick (3 decimals for JPY pairs, 5 otherwise).
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp(start).value // 10**9 + bar_seconds * np.arange(n_bars, dtype=np.int64)
+    bars = {}
+    for symbol in symbols:
+        digits = 3 if symbol.endswith("JPY") else 5
+        start_price = rng.uniform(100, 160) if digits == 3 else rng.uniform(0.6, 1.4)
+        close = start_price * np.exp(np.cumsum(rng.normal(0, 3e-4, n_bars)))
+        open_ = np.concatenate([[start_price], close[:-1]])
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 1.5e-4, n_bars)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 1.5e-4, n_bars)))
+        bars[symbol] = pd.DataFrame({
+            "time": times,
+            "open": np.round(open_, digits),
+            "high": np.round(high, digits),
+            "low": np.round(low, digits),
+            "close": np.round(close, digits),
+            "tick_volume": rng.integers(50, 2000, n_bars),
+            "spread": np.full(n_bars, 10),
+            "real_volume": np.zeros(n_bars, dtype=np.int64),
+        })
+    return bars
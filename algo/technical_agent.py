@@ -1,73 +1,64 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import math
 import json
+
+from concurrent_fetch import fetch_many
+from indicator_graph import IndicatorGraph, IndicatorStats
+from instrumentation import NULL, Instrumentation
+from price_store import default_price_store
         
 ##### Placeholder Signal Calculation Functions #####
-def calculate_rsi(prices_df: pd.DataFrame, period: int = 14) -> pd.Series:
-    delta = prices_df["close"].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-    avg_gain = gain.rolling(window=14).mean()
-    avg_loss = loss.rolling(window=14).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_bollinger_bands(prices_df: pd.DataFrame, window: int = 20) -> tuple[pd.Series, pd.Series]:
-    sma = prices_df["close"].rolling(20).mean()
-    std_dev = prices_df["close"].rolling(20).std()
+# Each indicator reads its intermediates (returns, true range, rolling stats, ...)
+# from an IndicatorGraph; pass the same graph to several calls to share them.
+def calculate_rsi(prices_df: pd.DataFrame, period: int = 14, indicators: IndicatorGraph = None) -> pd.Series:
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
+    # The averaging window is 14 bars whatever `period` is
+    return indicators.get("rsi", 14)
+
+def calculate_bollinger_bands(prices_df: pd.DataFrame, window: int = 20, indicators: IndicatorGraph = None) -> tuple[pd.Series, pd.Series]:
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
+    sma = indicators.get("rolling_mean", "close", 20)
+    std_dev = indicators.get("rolling_std", "close", 20)
     upper_band = sma + (std_dev * 2)
     lower_band = sma - (std_dev * 2)
     return upper_band, lower_band
 
-def calculate_ema(prices_df: pd.DataFrame, window: int) -> pd.Series:
-    return prices_df["close"].ewm(span=window, adjust=False).mean()
-
-def calculate_adx(prices_df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-    prices_df["high_low"] = prices_df["high"] - prices_df["low"]
-    prices_df["high_close"] = abs(prices_df["high"] - prices_df["close"].shift())
-    prices_df["low_close"] = abs(prices_df["low"] - prices_df["close"].shift())
-    prices_df["tr"] = prices_df[["high_low", "high_close", "low_close"]].max(axis=1)
-
-    prices_df["up_move"] = prices_df["high"] - prices_df["high"].shift()
-    prices_df["down_move"] = prices_df["low"].shift() - prices_df["low"]
-
-    prices_df["plus_dm"] = np.where((prices_df["up_move"] > prices_df["down_move"]) & (prices_df["up_move"] > 0), prices_df["up_move"], 0)
-    prices_df["minus_dm"] = np.where((prices_df["down_move"] > prices_df["up_move"]) & (prices_df["down_move"] > 0), prices_df["down_move"], 0)
+def calculate_ema(prices_df: pd.DataFrame, window: int, indicators: IndicatorGraph = None) -> pd.Series:
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
+    return indicators.get("ema", window)
 
-    prices_df["+di"] = 100 * (prices_df["plus_dm"].ewm(span=period).mean() / prices_df["tr"].ewm(span=period).mean())
-    prices_df["-di"] = 100 * (prices_df["minus_dm"].ewm(span=period).mean() / prices_df["tr"].ewm(span=period).mean())
-    prices_df["dx"] = 100 * abs(prices_df["+di"] - prices_df["-di"]) / (prices_df["+di"] + prices_df["-di"])
-    prices_df["adx"] = prices_df["dx"].ewm(span=period).mean()
+def calculate_adx(prices_df: pd.DataFrame, period: int = 14, indicators: IndicatorGraph = None) -> pd.DataFrame:
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
+    return indicators.get("dmi", period)
 
-    return prices_df[["adx", "+di", "-di"]]
-
-def calculate_atr(prices_df, window=14):
+def calculate_atr(prices_df, window=14, indicators=None):
     """
     Calculate the Average True Range (ATR).
     """
-    high_low = prices_df["high"] - prices_df["low"]
-    high_close = abs(prices_df["high"] - prices_df["close"].shift(1))
-    low_close = abs(prices_df["low"] - prices_df["close"].shift(1))
-
-    true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    atr = true_range.rolling(window).mean()
-    return atr
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
+    return indicators.get("atr", window)
 
 # === Strategy Functions ===
-def calculate_trend_signals(prices_df):
+def calculate_trend_signals(prices_df, indicators=None):
     """
     Advanced trend following strategy using multiple timeframes and indicators
     """
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
+
     # Calculate EMAs for multiple timeframes
-    ema_8 = calculate_ema(prices_df, 8)
-    ema_21 = calculate_ema(prices_df, 21)
-    ema_55 = calculate_ema(prices_df, 55)
+    ema_8 = calculate_ema(prices_df, 8, indicators)
+    ema_21 = calculate_ema(prices_df, 21, indicators)
+    ema_55 = calculate_ema(prices_df, 55, indicators)
 
     # Calculate ADX for trend strength
-    adx = calculate_adx(prices_df, 14)
+    adx = calculate_adx(prices_df, 14, indicators)
 
     # Determine trend direction and strength
     short_trend = (ema_8 > ema_21)
@@ -99,21 +90,24 @@ def calculate_trend_signals(prices_df):
             "trend_strength": float(trend_strength),
         },
     }
-def calculate_mean_reversion_signals(prices_df):
+def calculate_mean_reversion_signals(prices_df, indicators=None):
     """
     Mean reversion strategy using statistical measures and Bollinger Bands
     """
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
+
     # Calculate z-score of price relative to moving average
-    ma_50 = prices_df["close"].rolling(window=50).mean()
-    std_50 = prices_df["close"].rolling(window=50).std()
+    ma_50 = indicators.get("rolling_mean", "close", 50)
+    std_50 = indicators.get("rolling_std", "close", 50)
     z_score = (prices_df["close"] - ma_50) / std_50
 
     # Calculate Bollinger Bands
-    bb_upper, bb_lower = calculate_bollinger_bands(prices_df)
+    bb_upper, bb_lower = calculate_bollinger_bands(prices_df, indicators=indicators)
 
     # Calculate RSI with multiple timeframes
-    rsi_14 = calculate_rsi(prices_df, 14)
-    rsi_28 = calculate_rsi(prices_df, 28)
+    rsi_14 = calculate_rsi(prices_df, 14, indicators)
+    rsi_28 = calculate_rsi(prices_df, 28, indicators)
 
     # Extract the last scalar values
     z_score_last = z_score.iloc[-1] if isinstance(z_score.iloc[-1], (int, float)) else z_score.iloc[-1].item()
@@ -142,18 +136,20 @@ def calculate_mean_reversion_signals(prices_df):
             "rsi_28": round(rsi_28_last, 2),
         },
     }
-def calculate_momentum_signals(prices_df):
+def calculate_momentum_signals(prices_df, indicators=None):
     """
     Multi-factor momentum strategy
     """
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
+
     # Price momentum
-    returns = prices_df["close"].pct_change()
-    mom_1m = returns.rolling(21).sum()
-    mom_3m = returns.rolling(63).sum()
-    mom_6m = returns.rolling(126).sum()
+    mom_1m = indicators.get("rolling_sum", "returns", 21)
+    mom_3m = indicators.get("rolling_sum", "returns", 63)
+    mom_6m = indicators.get("rolling_sum", "returns", 126)
 
     # Volume momentum
-    volume_ma = prices_df["volume"].rolling(21).mean()
+    volume_ma = indicators.get("rolling_mean", "volume", 21)
     volume_momentum = prices_df["volume"] / volume_ma
 
     # Handle missing or ambiguous values for price momentum
@@ -204,26 +200,26 @@ def calculate_momentum_signals(prices_df):
     }
 
 
-def calculate_volatility_signal(prices_df):
+def calculate_volatility_signal(prices_df, indicators=None):
     """
     Volatility-based trading strategy.
     """
-    # Calculate percentage change for historical volatility
-    returns = prices_df["close"].pct_change()
+    if indicators is None:
+        indicators = IndicatorGraph(prices_df)
 
-    # Historical volatility
-    hist_vol = returns.rolling(21).std() * math.sqrt(252)
+    # Historical volatility of the shared percentage-change series
+    hist_vol = indicators.get("hist_vol", 21)
 
     # Volatility regime detection
-    vol_ma = hist_vol.rolling(63).mean()
+    vol_ma = indicators.get("rolling_mean", ("hist_vol", 21), 63)
     vol_regime = hist_vol / vol_ma
 
     # Volatility mean reversion
-    vol_z_score = (hist_vol - vol_ma) / hist_vol.rolling(63).std()
+    vol_z_score = (hist_vol - vol_ma) / indicators.get("rolling_std", ("hist_vol", 21), 63)
 
     # ATR ratio
     close = prices_df["close"]
-    atr = calculate_atr(prices_df)
+    atr = calculate_atr(prices_df, indicators=indicators)
     close=close.squeeze()
     atr=atr.squeeze()
 
@@ -262,8 +258,15 @@ def calculate_volatility_signal(prices_df):
         },
     }
 # === Fetch Data for RELIANCE.NS ===
-def fetch_stock_data(ticker: str, start_date: str, end_date: str, interval: str = "1d") -> pd.DataFrame:
-    prices_df = yf.download(ticker, start_date, end=end_date, interval='1d')
+def fetch_stock_data(ticker: str, start_date: str, end_date: str, interval: str = "1d", store=None) -> pd.DataFrame:
+    """
+    Load bars through the local price store; only date ranges that are not cached yet are downloaded.
+    """
+    if store is None:
+        store = default_price_store()
+    prices_df = store.fetch(ticker, start_date, end_date, interval)
+    # Same (Price, Ticker) column layout as a single-ticker yf.download
+    prices_df.columns = pd.MultiIndex.from_product([prices_df.columns, [ticker]], names=["Price", "Ticker"])
     prices_df = prices_df.rename(columns={"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"})
     return prices_df
 
@@ -335,89 +338,216 @@ def normalize_pandas(obj):
     return obj
 
 
+def build_ticker_report(trend_signals, mean_reversion_signals, momentum_signals, volatility_signals,
+                        normalize=True):
+    """
+    Combine the four strategy signals into the per-ticker analysis report.
+
+    With normalize=False the metrics dicts are passed through as they are, for
+    callers that serialize pandas/NumPy values themselves (see `report_stream.py`).
+    """
+    metrics = normalize_pandas if normalize else (lambda values: values)
+    # Combine all signals using a weighted ensemble approach
+    strategy_weights = {
+        "trend": 0.30,
+        "mean_reversion": 0.25,
+        "momentum": 0.30,
+        "volatility": 0.15,
+    }
+
+    combined_signal = weighted_signal_combination(
+        {
+            "trend": trend_signals,
+            "mean_reversion": mean_reversion_signals,
+            "momentum": momentum_signals,
+            "volatility": volatility_signals,
+        },
+        strategy_weights,
+    )
+
+    # Generate detailed analysis report for this ticker
+    return {
+        "signal": combined_signal["signal"],
+        "confidence": round(combined_signal["confidence"] ),
+        "strategy_signals": {
+            "trend_following": {
+                "signal": trend_signals["signal"],
+                "confidence": round(trend_signals["confidence"] ),
+                "metrics": metrics(trend_signals["metrics"]),
+            },
+            "mean_reversion": {
+                "signal": mean_reversion_signals["signal"],
+                "confidence": round(mean_reversion_signals["confidence"] ),
+                "metrics": metrics(mean_reversion_signals["metrics"]),
+            },
+            "momentum": {
+                "signal": momentum_signals["signal"],
+                "confidence": round(momentum_signals["confidence"] ),
+                "metrics": metrics(momentum_signals["metrics"]),
+            },
+            "volatility": {
+                "signal": volatility_signals["signal"],
+                "confidence": round(volatility_signals["confidence"] ),
+                "metrics": metrics(volatility_signals["metrics"]),
+            },
+        },
+    }
+
+
+def analyze_prices(prices_df, ticker, stats=None, instrument=NULL, normalize=True, verbose=False):
+    """
+    Run all four strategies on one ticker's price history and build its report.
+
+    The strategies share one IndicatorGraph, so common intermediates are computed
+    once; pass an IndicatorStats to collect cache hits and time per indicator, and
+    an Instrumentation to time each strategy and the combination step.
+    `normalize` is passed on to `build_ticker_report`. Progress is printed only
+    with verbose=True.
+    """
+    log = print if verbose else lambda message: None
+    indicators = IndicatorGraph(prices_df, stats)
+
+    log(f"Calculating trend signals for {ticker}")
+    with instrument.timer("trend", ticker):
+        trend_signals = calculate_trend_signals(prices_df, indicators)
+
+    log(f"Calculating mean reversion signals for {ticker}")
+    with instrument.timer("mean_reversion", ticker):
+        mean_reversion_signals = calculate_mean_reversion_signals(prices_df, indicators)
+
+    log(f"Calculating momentum signals for {ticker}")
+    with instrument.timer("momentum", ticker):
+        momentum_signals = calculate_momentum_signals(prices_df, indicators)
+
+    log(f"Analyzing volatility for {ticker}")
+    with instrument.timer("volatility", ticker):
+        volatility_signals = calculate_volatility_signal(prices_df, indicators)
+
+    log(f"Combining signals for {ticker}")
+    with instrument.timer("combine", ticker):
+        return build_ticker_report(trend_signals, mean_reversion_signals, momentum_signals, volatility_signals,
+                                   normalize)
+
+
 ##### Main Technical Analyst Function #####
-def technical_analyst_agent_yf(data):
+def _analyze_tickers(data, instrument):
     """
-    Technical analysis system combining multiple trading strategies for multiple tickers.
+    Ticker-by-ticker path of `technical_analyst_agent_yf`: fetch concurrently, analyze
+    in this process or on data["workers"] processes, and serialize the reports.
     """
     start_date = data["start_date"]
     end_date = data["end_date"]
     tickers = data["tickers"]
 
     technical_analysis = {}
+    stats = IndicatorStats() if data.get("indicator_stats") else None
+    instrument.count("tickers_requested", len(tickers))
+
+    def fetch(ticker):
+        with instrument.profile_thread(), instrument.timer("fetch", ticker):
+            return fetch_stock_data(ticker, start_date, end_date)
+
+    # Get the historical price data for all tickers concurrently
+    prices, failures = fetch_many(
+        fetch,
+        tickers,
+        max_workers=data.get("fetch_workers", 8),
+        rate_limit=data.get("fetch_rate_limit"),
+        timeout=data.get("fetch_timeout"),
+    )
+    instrument.count("fetch_failures", len(failures))
+    for ticker, error in failures.items():
+        print(f"Failed to fetch {ticker}: {error}")
+
+    workers = data.get("workers", 1)
+    if workers > 1:
+        from parallel_agent import analyze_in_processes
+
+        available = {ticker: prices[ticker] for ticker in tickers if ticker in prices and not prices[ticker].empty}
+        with instrument.timer("analyze"):
+            reports, errors = analyze_in_processes(available, workers, stats=stats, instrument=instrument)
+        for ticker in tickers:
+            if ticker in reports:
+                technical_analysis[ticker] = reports[ticker]
+                instrument.count("tickers_analyzed")
+                print(f"Analysis for {ticker} complete.")
+            elif ticker in errors:
+                instrument.count("tickers_failed")
+                print(f"Analysis failed for {ticker}: {errors[ticker]}")
+            else:
+                instrument.count("tickers_skipped")
+                print(f"No price data found for {ticker}. Skipping.")
+    else:
+        for ticker in tickers:
+            print(f"Analyzing {ticker}...")
 
-    for ticker in tickers:
-        print(f"Analyzing {ticker}...")
-
-        # Get the historical price data using yfinance
-        prices_df = fetch_stock_data(ticker, start_date, end_date)
-
-        if prices_df is None:
-            print(f"No price data found for {ticker}. Skipping.")
-            continue
+            prices_df = prices.get(ticker)
 
-        print(f"Calculating trend signals for {ticker}")
-        trend_signals = calculate_trend_signals(prices_df)
+            if prices_df is None or prices_df.empty:
+                instrument.count("tickers_skipped")
+                print(f"No price data found for {ticker}. Skipping.")
+                continue
 
-        print(f"Calculating mean reversion signals for {ticker}")
-        mean_reversion_signals = calculate_mean_reversion_signals(prices_df)
+            technical_analysis[ticker] = analyze_prices(prices_df, ticker, stats, instrument, verbose=True)
+            instrument.count("tickers_analyzed")
+            print(f"Analysis for {ticker} complete.")
 
-        print(f"Calculating momentum signals for {ticker}")
-        momentum_signals = calculate_momentum_signals(prices_df)
+    if stats is not None:
+        print(stats.summary())
 
-        print(f"Analyzing volatility for {ticker}")
-        volatility_signals = calculate_volatility_signal(prices_df)
+    with instrument.timer("serialize"):
+        return json.dumps(technical_analysis)
 
 
-        # Combine all signals using a weighted ensemble approach
-        strategy_weights = {
-            "trend": 0.30,
-            "mean_reversion": 0.25,
-            "momentum": 0.30,
-            "volatility": 0.15,
-        }
+def technical_analyst_agent_yf(data):
+    """
+    Technical analysis system combining multiple trading strategies for multiple tickers.
 
-        print(f"Combining signals for {ticker}")
-        combined_signal = weighted_signal_combination(
-            {
-                "trend": trend_signals,
-                "mean_reversion": mean_reversion_signals,
-                "momentum": momentum_signals,
-                "volatility": volatility_signals,
-            },
-            strategy_weights,
+    Set data["panel"] = True to download all tickers at once and compute every
+    indicator on an aligned (dates x tickers) panel instead of ticker by ticker.
+    Set data["indicator_stats"] = True to print indicator cache hits and timings
+    (summed over the worker processes when data["workers"] > 1; not collected in
+    panel mode).
+    Prices are fetched concurrently; data["fetch_workers"] (default 8),
+    data["fetch_rate_limit"] (requests per second) and data["fetch_timeout"]
+    (seconds per ticker) tune the download.
+    Set data["workers"] = N to analyze tickers on N processes; a ticker whose
+    analysis raises is then reported and skipped instead of aborting the run.
+    Set data["instrument"] = True (or pass an Instrumentation) to time the fetch,
+    each strategy, the combination and the serialization per ticker;
+    data["trace_memory"] and data["profile"] add tracemalloc peaks and a cProfile
+    capture, and data["metrics_path"] writes the snapshot as JSON (or Prometheus
+    text for a .prom/.txt path). Fetch threads are profiled too, and with
+    data["workers"] > 1 each worker process times, traces and profiles its own
+    tickers and the results are merged; the "analyze" stage is then the wall time
+    of the whole pool. In panel mode every strategy is computed for all tickers at
+    once, so the whole-panel "indicators" stage replaces the per-strategy timers
+    and "combine" times each ticker's signals and report.
+    To get each ticker's report as soon as it is ready instead of one JSON string
+    at the end, use `report_stream.iter_reports(data)` or `write_ndjson`.
+    """
+    instrument = data.get("instrument")
+    if not isinstance(instrument, Instrumentation):
+        instrument = Instrumentation(
+            enabled=bool(instrument or data.get("trace_memory") or data.get("profile") or data.get("metrics_path")),
+            trace_memory=data.get("trace_memory", False),
+            profile=data.get("profile", False),
         )
-
-        # Generate detailed analysis report for this ticker
-        technical_analysis[ticker] = {
-            "signal": combined_signal["signal"],
-            "confidence": round(combined_signal["confidence"] ),
-            "strategy_signals": {
-                "trend_following": {
-                    "signal": trend_signals["signal"],
-                    "confidence": round(trend_signals["confidence"] ),
-                    "metrics": normalize_pandas(trend_signals["metrics"]),
-                },
-                "mean_reversion": {
-                    "signal": mean_reversion_signals["signal"],
-                    "confidence": round(mean_reversion_signals["confidence"] ),
-                    "metrics": normalize_pandas(mean_reversion_signals["metrics"]),
-                },
-                "momentum": {
-                    "signal": momentum_signals["signal"],
-                    "confidence": round(momentum_signals["confidence"] ),
-                    "metrics": normalize_pandas(momentum_signals["metrics"]),
-                },
-                "volatility": {
-                    "signal": volatility_signals["signal"],
-                    "confidence": round(volatility_signals["confidence"] ),
-                    "metrics": normalize_pandas(volatility_signals["metrics"]),
-                },
-            },
-        }
-        print(f"Analysis for {ticker} complete.")
-
-    return json.dumps(technical_analysis)
+    instrument.start()
+    try:
+        if data.get("panel"):
+            from technical_panel import technical_analyst_agent_panel
+            result = technical_analyst_agent_panel(data, instrument)
+        else:
+            result = _analyze_tickers(data, instrument)
+    finally:
+        # Stop the profiler and tracemalloc even when fetching or analysis raises
+        instrument.stop()
+    if instrument.enabled:
+        print(instrument.summary())
+        if data.get("metrics_path"):
+            instrument.write(data["metrics_path"])
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,62 @@
+"""
+Regression tests for the rolling and exponential kernels of kernels.py.
+
+Run from this directory with `python -m unittest test_kernels` (or pytest).
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import kernels
+
+
+def exact_std(x, window):
+    expected = np.full(len(x), np.nan)
+    expected[window - 1:] = sliding_window_view(x, window).std(axis=1, ddof=1)
+    return expected
+
+
+class RollingTest(unittest.TestCase):
+    def trending(self, n=3000):
+        # A 10k -> 50k trend with noise, so the windows sit far from the segment means
+        rng = np.random.default_rng(0)
+        return np.linspace(10_000, 50_000, n) + rng.normal(0, 5, n)
+
+    def test_flat_window_at_high_price_level(self):
+        x = self.trending()
+        x[1500:1520] = x[1500]
+        std = kernels.rolling_std(x, 20)
+        mean = kernels.rolling_mean(x, 20)
+        self.assertEqual(std[1519], 0.0)
+        self.assertEqual(mean[1519], x[1500])
+        # z-score and Bollinger position stay undefined, as with pandas
+        with np.errstate(invalid="ignore"):
+            self.assertTrue(np.isnan((x[1519] - mean[1519]) / std[1519]))
+        self.assertEqual(pd.Series(x).rolling(20).std().iloc[1519], 0.0)
+
+    def test_near_flat_windows_keep_their_precision(self):
+        x = self.trending()
+        x[1500:1540] = x[1500] + np.tile([0.0, 1e-3], 20)
+        np.testing.assert_allclose(kernels.rolling_std(x, 20)[1519:1540], exact_std(x, 20)[1519:1540], rtol=1e-6)
+
+    def test_matches_two_pass_std(self):
+        rng = np.random.default_rng(1)
+        x = 100 + rng.normal(size=20_000).cumsum()
+        x[50:60] = np.nan
+        for window in (2, 14, 20, 252):
+            np.testing.assert_allclose(kernels.rolling_std(x, window), exact_std(x, window), rtol=1e-9, atol=1e-12)
+
+
+class EwmTest(unittest.TestCase):
+    def test_span_one_is_the_input(self):
+        s = pd.Series([np.nan, 1.0, 2.0, np.nan, 5.0, 6.0])
+        for adjust in (True, False):
+            np.testing.assert_allclose(kernels.ewm_mean(s.to_numpy(), 1, adjust=adjust),
+                                       s.ewm(span=1, adjust=adjust).mean(), equal_nan=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,352 @@
+"""
+Derived timeframes from one base-resolution price store.
+
+Strategies read different bar lengths (monthly for the portfolio rebalance,
+daily for the technical agent, M5 for the Renko/MACD loop). Instead of
+downloading each one separately, bars are fetched and stored once at a base
+interval and every longer interval is aggregated from them: open of the first
+bar, highest high, lowest low, close of the last bar, summed volume.
+
+Bars are grouped by exchange session rather than by calendar day: a session
+belongs to the trading date it closes on (FX days roll at 17:00 New York),
+weeks and months are made of session dates, and intraday bars are counted
+from the session open, so NSE 15m bars start at 09:15 and FX 4h bars at
+17:00. Daily and longer bars are labelled by period start (Monday, first of
+the month) like yfinance's; intraday bars by their open time.
+
+Derived bars are cached in their own PriceStore, so each timeframe is only
+aggregated for ranges it has not covered yet: when new base bars arrive only
+the last, possibly incomplete period and the new ones are rebuilt.
+
+Classes:
+- SessionCalendar: exchange timezone and session hours.
+- ResampledProvider: PriceProvider that aggregates bars from a base PriceStore.
+- TimeframeStore: base store plus cached derived timeframes behind one fetch().
+
+Functions:
+- calendar_for(ticker): the session calendar a ticker trades on.
+- parse_interval(interval): ("minute", n), ("day", 1), ("week", 1) or ("month", n).
+- resample_ohlcv(prices_df, interval, calendar): aggregate bars to a longer interval.
+- benchmark_resample(n_tickers): accuracy against pandas, aggregation speed, incremental updates.
+"""
+
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from price_store import PriceProvider, PriceStore, default_price_store
+
+DAY_NS = 86_400 * 10**9
+MINUTE_NS = 60 * 10**9
+
+
+class SessionCalendar:
+    """
+    Trading hours of an exchange: timezone and daily open/close ("HH:MM" local time).
+
+    A close at or before the open means the session runs overnight and belongs
+    to the date it closes on. Timezone-naive intraday timestamps are taken to be
+    local exchange time; localize them first if they are not (e.g. MT5 server time).
+    """
+    def __init__(self, name, tz, open="00:00", close="00:00"):
+        self.name = name
+        self.tz = tz
+        self.open = open
+        self.close = close
+        self.open_ns = pd.Timedelta(f"{open}:00").value
+        self.overnight = pd.Timedelta(f"{close}:00").value <= self.open_ns
+
+    def __repr__(self):
+        return f"SessionCalendar({self.name!r}, {self.tz!r}, {self.open!r}, {self.close!r})"
+
+    def wall_time(self, index):
+        """Local exchange wall-clock time of each bar as int64 nanoseconds."""
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_convert(self.tz).tz_localize(None)
+        return index.as_unit("ns").asi8
+
+    def session_days(self, wall):
+        """Trading date of each wall-clock time, as days since 1970-01-01."""
+        if self.overnight:
+            return (wall - self.open_ns) // DAY_NS + 1
+        return wall // DAY_NS
+
+    def session_open(self, days):
+        """Wall-clock open of the sessions trading on `days`, in nanoseconds."""
+        return (days - self.overnight) * DAY_NS + self.open_ns
+
+
+CALENDARS = {
+    "NSE": SessionCalendar("NSE", "Asia/Kolkata", "09:15", "15:30"),
+    "NYSE": SessionCalendar("NYSE", "America/New_York", "09:30", "16:00"),
+    "FX": SessionCalendar("FX", "America/New_York", "17:00", "17:00"),
+}
+
+
+def calendar_for(ticker):
+    """NSE for .NS/.BO tickers and Indian indices, FX for currency pairs, NYSE otherwise."""
+    if ticker.endswith((".NS", ".BO")) or ticker in ("^NSEI", "^NSEBANK", "^BSESN"):
+        return CALENDARS["NSE"]
+    if ticker.endswith("=X") or re.fullmatch(r"[A-Z]{6}", ticker):
+        return CALENDARS["FX"]
+    return CALENDARS["NYSE"]
+
+
+def parse_interval(interval):
+    """
+    yfinance ("15m", "1h", "1d", "1wk", "1mo", "3mo") or MetaTrader ("M15", "H4",
+    "D1", "W1", "MN1") interval as (unit, count).
+    """
+    match = re.fullmatch(r"(\d+)(m|h|d|wk|mo)", interval) or re.fullmatch(r"(M|H|D|W|MN)(\d+)", interval)
+    if match is None:
+        raise ValueError(f"unsupported interval {interval!r}")
+    count, unit = match.groups()
+    if not count.isdigit():
+        count, unit = unit, count
+    count = int(count)
+    unit = {"m": "minute", "M": "minute", "h": "hour", "H": "hour", "d": "day", "D": "day",
+            "wk": "week", "W": "week", "mo": "month", "MN": "month"}[unit]
+    if unit == "hour":
+        return "minute", 60 * count
+    if unit in ("day", "week") and count != 1:
+        raise ValueError(f"unsupported interval {interval!r}")
+    return unit, count
+
+
+def _labels(wall, interval, calendar):
+    # Period start of each bar in wall-clock nanoseconds
+    unit, count = parse_interval(interval)
+    days = calendar.session_days(wall)
+    if unit == "minute":
+        opens = calendar.session_open(days)
+        step = count * MINUTE_NS
+        return opens + (wall - opens) // step * step
+    if unit == "day":
+        return days * DAY_NS
+    if unit == "week":
+        # 1970-01-01 was a Thursday
+        return (days - (days + 3) % 7) * DAY_NS
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    months -= months % count
+    return months.astype("datetime64[M]").astype("datetime64[ns]").astype(np.int64)
+
+
+def resample_ohlcv(prices_df, interval, calendar=None):
+    """
+    Aggregate flat-column OHLCV bars (sorted by time) to a longer `interval`.
+
+    Open takes the first bar, High the maximum, Low the minimum and volume
+    columns the sum, skipping NaNs; Close and every other column the last bar.
+    Column names are matched case-insensitively. Periods follow `calendar`'s
+    sessions (default NYSE); periods without bars are left out.
+    """
+    if calendar is None:
+        calendar = CALENDARS["NYSE"]
+    if prices_df.empty:
+        return prices_df.copy()
+    index = pd.DatetimeIndex(prices_df.index)
+    labels = _labels(calendar.wall_time(index), interval, calendar)
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)] - 1
+
+    columns = {}
+    for column in prices_df.columns:
+        values = prices_df[column].to_numpy()
+        name = str(column).lower()
+        if not np.issubdtype(values.dtype, np.number):
+            columns[column] = values[ends]
+        elif name == "open":
+            columns[column] = values[starts]
+        elif name == "high":
+            columns[column] = np.fmax.reduceat(values, starts)
+        elif name == "low":
+            columns[column] = np.fmin.reduceat(values, starts)
+        elif "volume" in name:
+            columns[column] = np.add.reduceat(np.where(np.isnan(values), 0, values), starts) \
+                if values.dtype.kind == "f" else np.add.reduceat(values, starts)
+        else:
+            columns[column] = values[ends]
+
+    result_index = pd.DatetimeIndex(labels[starts].astype("datetime64[ns]"), name="Date")
+    if parse_interval(interval)[0] == "minute":
+        result_index.name = index.name
+        if index.tz is not None:
+            # Bucketing was done on wall-clock time; attach the exchange timezone again
+            result_index = result_index.tz_localize(
+                calendar.tz, ambiguous=np.zeros(len(result_index), dtype=bool), nonexistent="shift_forward"
+            ).tz_convert(index.tz)
+    return pd.DataFrame(columns, index=result_index, columns=prices_df.columns)
+
+
+def _period(interval):
+    unit, count = parse_interval(interval)
+    return {"minute": pd.Timedelta(minutes=count), "day": pd.Timedelta(days=1),
+            "week": pd.Timedelta(days=7), "month": pd.Timedelta(days=31 * count)}[unit]
+
+
+class ResampledProvider(PriceProvider):
+    """
+    Serve longer intervals by aggregating `base_interval` bars from `base_store`.
+
+    Each request reads the base bars of every period it touches, including the
+    part of the period around `start` that the base store already holds, so a
+    period that was incomplete when last aggregated is rebuilt from all of its
+    bars without asking the provider for history before `start`. `calendar`
+    defaults to `calendar_for(ticker)`.
+    """
+    def __init__(self, base_store, base_interval="1d", calendar=None):
+        self.base_store = base_store
+        self.base_interval = base_interval
+        self.calendar = calendar
+        self.name = f"resampled-{base_store.provider.name}-{base_interval}"
+
+    def fetch(self, ticker, start, end, interval):
+        calendar = self.calendar if self.calendar is not None else calendar_for(ticker)
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        first = _labels(calendar.wall_time([start]), interval, calendar)[0]
+        # The period containing `start` opens with its first session, which may open the
+        # previous day; daily base bars are stamped at midnight of their session date
+        if parse_interval(interval)[0] == "minute":
+            base_start = pd.Timestamp(first)
+        else:
+            base_start = pd.Timestamp(min(first, calendar.session_open(first // DAY_NS)))
+        # Within that period, do not ask for bars before the ones the base store holds
+        gaps = self.base_store.missing_ranges(ticker, base_start, end, self.base_interval)
+        if gaps and gaps[0][0] <= base_start < gaps[0][1] < min(end, base_start + _period(interval)):
+            base_start = gaps[0][1]
+        base = self.base_store.fetch(ticker, base_start, end, self.base_interval)
+        if base.empty:
+            return base
+        derived = resample_ohlcv(base, interval, calendar)
+        labels = derived.index.tz_localize(None) if derived.index.tz is not None else derived.index
+        return derived[(labels.asi8 >= first) & (labels < end)]
+
+
+class TimeframeStore:
+    """
+    One base-resolution PriceStore plus a cached PriceStore per derived timeframe.
+
+    `fetch(ticker, start, end, interval)` serves `base_interval` from the base
+    store and aggregates every longer interval from it, so one download feeds
+    all timeframes. Derived bars are kept next to the base bars, under
+    `<root>/resampled-<provider>-<base_interval>/<interval>/`, and extended like
+    any PriceStore: only ranges not covered yet are aggregated. Works wherever
+    a PriceStore is accepted for fetching (e.g. `fetch_stock_data(store=...)`).
+
+    Usage:
+        store = TimeframeStore(PriceStore(provider=YFinanceProvider()), "1d")
+        monthly = store.fetch("TCS.NS", "2015-01-01", "2025-01-01", "1mo")
+    """
+    def __init__(self, base_store=None, base_interval="1d", calendar=None):
+        self.base = base_store if base_store is not None else default_price_store()
+        self.base_interval = base_interval
+        self.provider = ResampledProvider(self.base, base_interval, calendar)
+        self.derived = PriceStore(self.base.root, self.provider)
+
+    def fetch(self, ticker, start, end, interval=None):
+        interval = interval or self.base_interval
+        if interval == self.base_interval:
+            return self.base.fetch(ticker, start, end, interval)
+        if _period(interval) < _period(self.base_interval):
+            raise ValueError(f"cannot derive {interval} bars from {self.base_interval} bars")
+        return self.derived.fetch(ticker, start, end, interval)
+
+
+def benchmark_resample(n_tickers=20, n_dates=2500, n_fx_bars=200_000, repeat=3):
+    """
+    Check resample_ohlcv against pandas' resample, time both on `n_fx_bars` M5
+    bars, and time a TimeframeStore serving 1wk and 1mo bars from daily bars for
+    `n_tickers` tickers: cold, warm, after one more base bar and a full re-aggregation.
+    """
+    import tempfile
+
+    from price_store import LocalFileProvider
+    from synthetic_data import synthetic_fx_bars, synthetic_ohlcv_panel
+
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    agg = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    fx = synthetic_fx_bars(["EURUSD"], n_fx_bars, seed=0)["EURUSD"]
+    m5 = fx.set_index(pd.to_datetime(fx["time"], unit="s")).drop(columns="time").rename(
+        columns={"open": "Open", "high": "High", "low": "Low", "close": "Close", "tick_volume": "Volume"})
+    m5 = m5[list(agg)]
+    # FX sessions open at 17:00: hour bars and days counted from there
+    pandas_rules = {
+        "15m": lambda: m5.resample("15min").agg(agg),
+        "1h": lambda: m5.resample("1h").agg(agg),
+        "4h": lambda: m5.resample("4h", offset="1h").agg(agg),
+        "1d": lambda: m5.shift(7, freq="h").resample("D").agg(agg),
+    }
+    fx_calendar = CALENDARS["FX"]
+    results = {"fx": []}
+    print(f"M5 -> longer bars, {n_fx_bars} bars")
+    for interval, pandas_fn in pandas_rules.items():
+        ours = resample_ohlcv(m5, interval, fx_calendar)
+        expected = pandas_fn().dropna(subset=["Open"])
+        max_error = float(np.abs(ours.to_numpy(float) - expected.to_numpy(float)).max())
+        same_labels = bool(ours.index.equals(expected.index))
+        row = {"interval": interval, "bars": len(ours), "same_labels": same_labels, "max_abs_error": max_error,
+               "resample_ohlcv_s": best(lambda: resample_ohlcv(m5, interval, fx_calendar)),
+               "pandas_s": best(pandas_fn)}
+        results["fx"].append(row)
+        print(f"  {interval:>4}: {row['bars']:>6} bars, labels match {same_labels}, max abs error {max_error:.1e}, "
+              f"{row['resample_ohlcv_s'] * 1e3:6.1f} ms vs pandas {row['pandas_s'] * 1e3:6.1f} ms")
+
+    panel = synthetic_ohlcv_panel(n_dates, n_tickers, start="2015-01-01")
+    dates = panel["dates"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_root = os.path.join(tmp_dir, "csv")
+        daily = {}
+        for j, ticker in enumerate(panel["tickers"]):
+            daily[ticker] = pd.DataFrame(
+                {field.capitalize(): panel[field][:, j] for field in ["open", "high", "low", "close", "volume"]},
+                index=pd.DatetimeIndex(dates, name="Date"),
+            )
+            LocalFileProvider.write(csv_root, ticker, daily[ticker])
+        provider = LocalFileProvider(csv_root)
+        store = TimeframeStore(PriceStore(os.path.join(tmp_dir, "store"), provider), "1d")
+
+        def run(end):
+            provider.calls = 0
+            t0 = time.perf_counter()
+            for ticker in panel["tickers"]:
+                for interval in ("1d", "1wk", "1mo"):
+                    store.fetch(ticker, dates[0], end, interval)
+            return time.perf_counter() - t0, provider.calls
+
+        timings = {
+            "cold": run(dates[-2]),
+            "warm": run(dates[-2]),
+            "one new bar": run(dates[-1] + pd.Timedelta(days=1)),
+        }
+        t0 = time.perf_counter()
+        for ticker in panel["tickers"]:
+            for interval in ("1wk", "1mo"):
+                resample_ohlcv(daily[ticker], interval)
+        timings["full re-aggregation"] = (time.perf_counter() - t0, 0)
+
+        weekly = store.fetch(panel["tickers"][0], dates[0], dates[-1] + pd.Timedelta(days=1), "1wk")
+        expected = daily[panel["tickers"][0]].resample("W-MON", label="left", closed="left").agg(agg).dropna()
+        expected = expected[expected.index >= dates[0]]
+        store_matches = bool(np.allclose(weekly.to_numpy(float), expected.to_numpy(float)))
+
+    results["store"] = {name: {"seconds": seconds, "provider_calls": calls} for name, (seconds, calls) in timings.items()}
+    results["store"]["weekly_matches_pandas"] = store_matches
+    print(f"{n_tickers} tickers x {n_dates} daily bars -> 1d, 1wk, 1mo (weekly bars match pandas: {store_matches})")
+    for name, (seconds, calls) in timings.items():
+        print(f"  {name + ':':<21}{seconds:7.3f}s  ({calls} provider calls)")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_resample()
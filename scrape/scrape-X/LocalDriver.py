@@ -0,0 +1,94 @@
+"""
+Module with a browser-free stand-in for the Chrome WebDriver, for tests.
+
+`LocalDriver` downloads a page with urllib, parses it with lxml and answers
+the `find_element(s)`, `text` and `get_attribute` calls `SearchScrapper`
+makes, so the scraper and `ScrapeScheduler` can run against the pages
+`ScrapeScheduler.serve_pages` serves without Chrome or chromedriver. It does
+not run JavaScript: `execute_script` only knows the page-height query, so
+`SearchScrapper` falls back to its per-element extraction.
+
+Classes:
+- LocalElement: An element of the parsed page.
+- LocalDriver: The page itself, opened with get(url).
+
+Functions:
+- local_driver(): Driver factory for `scrape_parallel`.
+
+"""
+
+import urllib.request
+
+import lxml.html
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+
+class LocalElement:
+    """
+    Element of a page parsed by LocalDriver; counts every lookup in `driver.calls`.
+    """
+    def __init__(self, driver, node):
+        self.driver = driver
+        self.node = node
+
+    @property
+    def text(self):
+        self.driver.calls += 1
+        return self.node.text_content()
+
+    def get_attribute(self, name):
+        self.driver.calls += 1
+        value = self.node.get(name)
+        # Like a browser, links and sources are resolved against the page URL
+        if name in ("href", "src", "poster") and value and value.startswith("/"):
+            value = self.driver.origin + value
+        return value
+
+    def find_element(self, by, selector):
+        elements = self.find_elements(by, selector)
+        if not elements:
+            raise NoSuchElementException(selector)
+        return elements[0]
+
+    def find_elements(self, by, selector):
+        self.driver.calls += 1
+        if by == By.CSS_SELECTOR:
+            # Only "tag.class" selectors are used by SearchScrapper
+            tag, css_class = selector.split(".")
+            nodes = [node for node in self.node.iter(tag) if css_class in (node.get("class") or "").split()]
+        else:
+            nodes = self.node.xpath(selector)
+        return [LocalElement(self.driver, node) for node in nodes]
+
+
+class LocalDriver(LocalElement):
+    """
+    Stand-in for webdriver.Chrome on static pages.
+
+    Attributes:
+    - calls: Number of lookups made, one per WebDriver round trip a real driver would make.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.origin = ""
+        super().__init__(self, lxml.html.fromstring("<html></html>"))
+
+    def get(self, url):
+        with urllib.request.urlopen(url) as response:
+            page = response.read()
+        self.origin = "/".join(url.split("/")[:3])
+        self.node = lxml.html.fromstring(page)
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        if script == 'return document.body.scrollHeight':
+            return 1000
+        return None
+
+    def quit(self):
+        pass
+
+
+def local_driver():
+    return LocalDriver()
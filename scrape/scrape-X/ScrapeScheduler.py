@@ -0,0 +1,335 @@
+"""
+Module for scraping many search queries in parallel with a pool of logged-in drivers.
+
+Each worker process starts its own WebDriver once (logging in with
+`setup_web_driver` by default) and keeps it for every work item it takes from
+a shared queue, so the pool size bounds both the number of browsers and of
+concurrent searches. Results are merged in work-item order and deduplicated
+by tweet ID.
+
+All workers log in to the same account. Logins are done one at a time, and a
+worker whose login fails stops instead of scraping logged out; keep the pool
+small (a handful of browsers), since Twitter may challenge or rate-limit
+several simultaneous sessions of one account.
+
+For tests and benchmarks, `write_sample_pages` writes search result pages in
+the markup `SearchScrapper` reads and `serve_pages` serves them over HTTP from
+disk; point the work items at the local server with `base_url` and use
+`setup_local_web_driver` so no login is attempted.
+
+Classes:
+- WorkItem: One search query (hashtag or user) over a date range.
+
+Functions:
+- search_url(kind, target, since, until, base_url): Twitter search URL for a work item.
+- hashtag_items(hashtags, start_date, end_date, base_url): One work item per hashtag.
+- user_day_items(users, no_of_days, base_url): One work item per user and day, most recent day first.
+- logged_in_driver(): Default driver factory; a logged-in Chrome, raising if the login fails.
+- tweet_record(tweet, item): Plain dict of a scraped Tweet and the work item it came from.
+- merge_tweets(batches): Concatenate record lists, keeping the first record of each tweet ID.
+- scrape_parallel(items, pool_size, driver_factory, max_tweets, pause): Scrape all items with a driver pool.
+- write_sample_pages(root, targets, tweets_per_page, shared): Write local search result pages.
+- serve_pages(root): Serve pages written by write_sample_pages on a local HTTP server.
+- benchmark_pool(pool_sizes, n_items, tweets_per_page): Tweets per minute against local pages by pool size.
+
+"""
+
+import html
+import http.server
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+
+class WorkItem:
+    """
+    One search handed to a worker.
+
+    Attributes:
+    - kind: "hashtag" or "user".
+    - target: Hashtag (without #) or user name.
+    - since, until: Date range of the search ("YYYY-MM-DD", until exclusive).
+    - url: Search URL the worker opens.
+    """
+    def __init__(self, kind, target, since, until, url):
+        self.kind = kind
+        self.target = target
+        self.since = since
+        self.until = until
+        self.url = url
+
+    def __repr__(self):
+        return f"WorkItem({self.kind!r}, {self.target!r}, {self.since!r}, {self.until!r})"
+
+
+def search_url(kind, target, since, until, base_url="https://x.com"):
+    """Live search URL for tweets with #target (kind "hashtag") or from target (kind "user")."""
+    term = f"%23{target}" if kind == "hashtag" else f"from%3A{target}"
+    return f"{base_url}/search?q=%28{term}%29+until%3A{until}+since%3A{since}&src=typed_query&f=live"
+
+
+def hashtag_items(hashtags, start_date, end_date, base_url="https://x.com"):
+    return [
+        WorkItem("hashtag", hashtag, start_date, end_date, search_url("hashtag", hashtag, start_date, end_date, base_url))
+        for hashtag in hashtags
+    ]
+
+
+def user_day_items(users, no_of_days, base_url="https://x.com"):
+    """
+    Twitter only shows about 50 tweets per search, so user timelines are split
+    into one search per day: days 1 to no_of_days - 1 before today.
+    """
+    items = []
+    for day in range(1, no_of_days):
+        since = (datetime.today() - timedelta(day)).strftime("%Y-%m-%d")
+        until = (datetime.today() - timedelta(day - 1)).strftime("%Y-%m-%d")
+        for user in users:
+            items.append(WorkItem("user", user, since, until, search_url("user", user, since, until, base_url)))
+    return items
+
+
+def logged_in_driver():
+    from WebDriverSetup import setup_web_driver
+    return setup_web_driver(strict=True)
+
+
+def tweet_record(tweet, item):
+    record = dict(vars(tweet))
+    record.update(target=item.target, since=item.since, until=item.until)
+    return record
+
+
+def merge_tweets(batches):
+    """
+    Concatenate lists of tweet records, keeping the first record of every tweet ID.
+
+    Returns:
+    - (list[dict], int): The merged records and the number of duplicates dropped.
+    """
+    merged = []
+    seen = set()
+    duplicates = 0
+    for records in batches:
+        for record in records:
+            tweet_id = record.get("ID")
+            if tweet_id is not None:
+                if tweet_id in seen:
+                    duplicates += 1
+                    continue
+                seen.add(tweet_id)
+            merged.append(record)
+    return merged, duplicates
+
+
+def _quit(driver):
+    if driver is not None:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    return None
+
+
+def _worker(driver_factory, items, results, max_tweets, pause, login_lock):
+    # Runs in a worker process: one driver for all the items this worker takes
+    from SearchScrapper import SearchScrapper
+
+    driver = None
+    try:
+        while True:
+            task = items.get()
+            if task is None:
+                break
+            index, item = task
+            start = time.time()
+            if driver is None:
+                try:
+                    # One login at a time across the pool
+                    with login_lock:
+                        driver = driver_factory()
+                except Exception as e:
+                    # No driver, no scraping: this worker stops and the others take the remaining items
+                    results.put((index, [], f"driver setup failed: {type(e).__name__}: {e}", time.time() - start))
+                    break
+            try:
+                tweets = SearchScrapper(driver).scrape_twitter_query(item.url, item.target, max_tweets=max_tweets)
+                results.put((index, [tweet_record(tweet, item) for tweet in tweets], None, time.time() - start))
+            except Exception as e:
+                results.put((index, [], f"{type(e).__name__}: {e}", time.time() - start))
+                # Start a fresh driver for the next item
+                driver = _quit(driver)
+            time.sleep(pause)
+    finally:
+        _quit(driver)
+
+
+def scrape_parallel(items, pool_size=4, driver_factory=None, max_tweets=50, pause=1.0):
+    """
+    Scrape every work item with a pool of `pool_size` worker processes.
+
+    Parameters:
+    - items (list[WorkItem]): Searches to run.
+    - pool_size (int): Number of worker processes, each with one driver.
+    - driver_factory (callable): Returns a ready WebDriver in the worker process;
+      must be picklable (a module-level function). Defaults to `logged_in_driver`.
+      Calls are serialized across workers; a worker whose call raises stops.
+    - max_tweets (int): Maximum tweets per search.
+    - pause (float): Seconds a worker waits between its searches.
+
+    Returns:
+    - dict: "tweets" (records deduplicated by tweet ID, in work-item order),
+      "items" (tweets, seconds and error per item), "duplicates", "seconds"
+      and "tweets_per_minute".
+    """
+    if driver_factory is None:
+        driver_factory = logged_in_driver
+
+    start = time.time()
+    pool_size = max(1, min(pool_size, len(items)))
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    login_lock = multiprocessing.Lock()
+    for index, item in enumerate(items):
+        tasks.put((index, item))
+    for _ in range(pool_size):
+        tasks.put(None)
+    workers = [
+        multiprocessing.Process(target=_worker, args=(driver_factory, tasks, results, max_tweets, pause, login_lock), daemon=True)
+        for _ in range(pool_size)
+    ]
+    for worker in workers:
+        worker.start()
+
+    batches = [[] for _ in items]
+    summary = [{"target": item.target, "since": item.since, "until": item.until, "tweets": 0,
+                "seconds": None, "error": None} for item in items]
+    pending = len(items)
+    while pending:
+        try:
+            index, records, error, seconds = results.get(timeout=1)
+        except queue.Empty:
+            # A worker that died (e.g. the browser crashed the process) leaves its item unanswered
+            if not any(worker.is_alive() for worker in workers) and results.empty():
+                break
+            continue
+        batches[index] = records
+        summary[index].update(tweets=len(records), seconds=seconds, error=error)
+        pending -= 1
+    for row in summary:
+        if row["seconds"] is None:
+            row["error"] = "worker exited"
+    for worker in workers:
+        worker.join(timeout=30)
+
+    tweets, duplicates = merge_tweets(batches)
+    seconds = time.time() - start
+    return {
+        "tweets": tweets,
+        "items": summary,
+        "duplicates": duplicates,
+        "seconds": seconds,
+        "tweets_per_minute": 60 * len(tweets) / seconds if seconds > 0 else 0.0,
+    }
+
+
+TWEET_HTML = """<article data-testid="tweet">
+  <div data-testid="User-Name"><span>{name}</span><span>@{user}</span></div>
+  <a href="/{user}/status/{id}"><time datetime="{time}">{time}</time></a>
+  <div data-testid="tweetText">{text}</div>
+  <div role="group"><button data-testid="reply">{replies}</button><button data-testid="retweet">{retweets}</button><button data-testid="like">{likes}</button><button data-testid="bookmark">0</button><span>{views}</span></div>{media}
+</article>
+"""
+
+
+def write_sample_pages(root, targets, tweets_per_page=20, shared=5):
+    """
+    Write `<root>/<target>.html` search result pages for `targets`.
+
+    Each page holds `tweets_per_page` tweets; the first `shared` of them appear
+    on every page, so merged results contain duplicates to drop. Every other
+    tweet carries a photo, every third a video.
+    """
+    os.makedirs(root, exist_ok=True)
+    for page, target in enumerate(targets):
+        tweets = []
+        for i in range(tweets_per_page):
+            tweet_id = 1_000_000 + i if i < shared else 2_000_000 + page * tweets_per_page + i
+            media = ""
+            if i % 2:
+                media += f'\n  <div data-testid="tweetPhoto"><img src="https://pbs.example/{tweet_id}.jpg"></div>'
+            if i % 3 == 0:
+                media += (f'\n  <div data-testid="videoPlayer"><video src="https://video.example/{tweet_id}.mp4" '
+                          f'poster="https://pbs.example/{tweet_id}_poster.jpg"></video></div>')
+            tweets.append(TWEET_HTML.format(
+                id=tweet_id, user=f"user{tweet_id % 97}", name=f"User {tweet_id % 97}",
+                time=f"2025-01-02T{i % 24:02d}:00:00.000Z",
+                text=html.escape(f"Tweet {tweet_id} about #{target} and #Markets"),
+                replies=i % 7, retweets=i % 11, likes=i * 3, views=f"{i * 100}", media=media,
+            ))
+        with open(os.path.join(root, f"{target}.html"), "w", encoding="utf-8") as f:
+            f.write('<html><body><span class="css-1jxf684">Latest</span>\n' + "".join(tweets) + "</body></html>\n")
+
+
+class _PageHandler(http.server.SimpleHTTPRequestHandler):
+    # /search?q=(#Tag) or (from:user) serves <root>/<Tag or user>.html
+    def translate_path(self, path):
+        query = parse_qs(urlparse(path).query).get("q", [""])[0]
+        match = re.search(r"(?:#|from:)(\w+)", query)
+        page = f"{match.group(1)}.html" if match else "index.html"
+        return os.path.join(self.directory, page)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_pages(root):
+    """
+    Serve `root` on a local HTTP server in a background thread.
+
+    Returns:
+    - (ThreadingHTTPServer, str): The server (call shutdown() when done) and its base URL.
+    """
+    handler = lambda *args, **kwargs: _PageHandler(*args, directory=root, **kwargs)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def benchmark_pool(pool_sizes=(1, 2, 4), n_items=8, tweets_per_page=20, shared=5):
+    """
+    Scrape `n_items` local hashtag pages with each pool size and report tweets per minute.
+
+    Needs Chrome; drivers come from `setup_local_web_driver` (headless, no login).
+    """
+    import tempfile
+
+    from WebDriverSetup import setup_local_web_driver
+
+    hashtags = [f"Tag{i}" for i in range(n_items)]
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        write_sample_pages(root, hashtags, tweets_per_page, shared)
+        server, base_url = serve_pages(root)
+        try:
+            items = hashtag_items(hashtags, "2025-01-02", "2025-01-03", base_url)
+            for pool_size in pool_sizes:
+                run = scrape_parallel(items, pool_size, setup_local_web_driver, max_tweets=tweets_per_page, pause=0)
+                errors = sum(row["error"] is not None for row in run["items"])
+                results.append({"pool_size": pool_size, "tweets": len(run["tweets"]), "duplicates": run["duplicates"],
+                                "errors": errors, "seconds": run["seconds"],
+                                "tweets_per_minute": run["tweets_per_minute"]})
+                print(f"pool {pool_size}: {len(run['tweets'])} tweets ({run['duplicates']} duplicates dropped, "
+                      f"{errors} failed items) in {run['seconds']:.1f}s, {run['tweets_per_minute']:.0f} tweets/min")
+        finally:
+            server.shutdown()
+    return results
+
+
+if __name__ == '__main__':
+    benchmark_pool()
@@ -5,6 +5,9 @@ Classes:
 - Tweet: Represents a single tweet with various attributes.
 - SearchScrapper: Handles scraping of Twitter search queries.
 
+Functions:
+- benchmark_extraction(page_paths, n_tweets, repeat): Tweets per second of the bulk and per-element extraction on saved pages.
+
 """
 
 from selenium import webdriver
@@ -12,8 +15,8 @@ from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import StaleElementReferenceException, NoSuchElementException, TimeoutException
-from time import sleep
+from selenium.common.exceptions import StaleElementReferenceException, NoSuchElementException, TimeoutException, WebDriverException
+from time import perf_counter, sleep
 import random
 import re
 
@@ -57,21 +60,168 @@ class Tweet:
         self.hashtags = hashtags
         self.url = url
 
+# Reads every field of all rendered tweets in one round trip; the same lookups
+# the per-element path makes through WebDriver, done inside the page
+EXTRACT_TWEETS_JS = r"""
+const text = (root, selector) => {
+    const node = root.querySelector(selector);
+    return node ? node.innerText : null;
+};
+const property = (node, name) => (node && node.hasAttribute(name) ? node[name] : null);
+return Array.from(document.querySelectorAll('article[data-testid="tweet"]'), (article) => {
+    const link = article.querySelector('a[href*="/status/"]');
+    const url = link ? link.href : null;
+    // First span whose first text node contains "@", as XPath contains(text(), "@")
+    const handle = Array.from(article.querySelectorAll('span')).find((span) => {
+        const first = Array.from(span.childNodes).find((node) => node.nodeType === Node.TEXT_NODE);
+        return first !== undefined && first.nodeValue.includes('@');
+    });
+    const time = article.querySelector('time');
+    const group = article.querySelector('[role="group"]');
+    const video = article.querySelector('div[data-testid="videoPlayer"] video');
+    return {
+        ID: url ? url.split('/').pop() : null,
+        url: url,
+        author: handle ? handle.innerText.replaceAll('@', '') : null,
+        fullName: text(article, 'div[data-testid="User-Name"] span'),
+        content: text(article, 'div[data-testid="tweetText"]'),
+        timestamp: time ? time.getAttribute('datetime') : 'No timestamp available',
+        retweets: text(article, 'button[data-testid="retweet"]'),
+        likes: text(article, 'button[data-testid="like"]'),
+        comments: text(article, 'button[data-testid="reply"]'),
+        bookmarks: text(article, 'button[data-testid="bookmark"]'),
+        views: group ? group.innerText.split('\n').pop() : null,
+        image_url: property(article.querySelector('div[data-testid="tweetPhoto"] img'), 'src'),
+        video_url: property(video, 'src'),
+        video_preview_image_url: property(video, 'poster'),
+    };
+});
+"""
+
+
 class SearchScrapper:
     """
     Scraper for Twitter (X) search queries.
 
+    Tweets are read with one `execute_script` call per scroll position
+    (`extract_rendered_tweets`); if the browser cannot run the script, the
+    scraper falls back to looking up each field with WebDriver
+    (`extract_tweet_element`), about a dozen round trips per tweet. A script
+    that raises (e.g. while the page is still loading) falls back for that
+    scroll position only; a driver that returns no result switches to the
+    per-element path for good.
+
     Methods:
     - scrape_twitter_query(query_url, hashtag, max_tweets): Scrapes tweets based on a search query URL.
+    - extract_rendered_tweets(): Fields of all rendered tweets as dicts, in one call.
+    - extract_tweet_element(tweet, processed_ids): Fields of one tweet element, one lookup per field.
     """
-    def __init__(self, driver: webdriver.Chrome):
+    def __init__(self, driver: webdriver.Chrome, bulk=True):
         """
         Initializes the SearchScrapper with a Selenium WebDriver instance.
 
         Parameters:
         - driver (webdriver.Chrome): The Selenium WebDriver instance.
+        - bulk (bool): Extract tweets in-page with one script call; False uses the per-element path.
         """
         self.driver = driver
+        self.bulk = bulk
+
+    def extract_rendered_tweets(self):
+        """
+        Returns:
+        - list[dict]: Fields of every `article[data-testid="tweet"]` currently in the page.
+        """
+        return self.driver.execute_script(EXTRACT_TWEETS_JS)
+
+    def extract_tweet_element(self, tweet: WebElement, processed_ids=()):
+        """
+        Reads one tweet element field by field.
+
+        Returns:
+        - dict: The same fields as `extract_rendered_tweets`, or only the ID and
+          URL if the tweet ID is already in `processed_ids`.
+        """
+        # Extract unique tweet ID from the URL
+        try:
+            tweet_link_element = tweet.find_element(By.XPATH, './/a[contains(@href, "/status/")]')
+            url = tweet_link_element.get_attribute('href')
+        except NoSuchElementException:
+            url = None
+        tweet_id = url.split('/')[-1] if url else None
+
+        if tweet_id and tweet_id in processed_ids:
+            return {"ID": tweet_id, "url": url}  # Skip already processed tweets
+
+        # Extract data from each tweet
+        try:
+            author = tweet.find_element(By.XPATH, './/span[contains(text(), "@")]').text.replace("@", "")
+        except NoSuchElementException:
+            author = None
+
+        try:
+            content = tweet.find_element(By.XPATH, './/div[@data-testid="tweetText"]').text
+        except NoSuchElementException:
+            content = None
+
+        try:
+            full_name = tweet.find_element(By.XPATH, './/div[@data-testid="User-Name"]//span').text
+        except NoSuchElementException:
+            full_name = None
+
+        # Timestamp extraction
+        try:
+            timestamp_element = tweet.find_element(By.XPATH, './/time')
+            timestamp = timestamp_element.get_attribute('datetime')
+        except:
+            timestamp = "No timestamp available"
+
+        # Retweets, likes, comments and bookmarks extraction
+        counts = {}
+        for field, testid in [("retweets", "retweet"), ("likes", "like"), ("comments", "reply"), ("bookmarks", "bookmark")]:
+            try:
+                counts[field] = tweet.find_element(By.XPATH, f'.//button[@data-testid="{testid}"]').text
+            except NoSuchElementException:
+                counts[field] = None
+
+        try:
+            views = tweet.find_element(By.XPATH, ".//*[@role='group']").text.split('\n')[-1]
+        except NoSuchElementException:
+            views = None
+
+        # Check for image URL
+        try:
+            tweet_photo_div = tweet.find_element(By.XPATH, './/div[@data-testid="tweetPhoto"]//img')
+            image_url = tweet_photo_div.get_attribute('src')  # Extract the image URL from the src attribute
+        except NoSuchElementException:
+            image_url = None
+
+        # Check for video URL
+        video_elements = tweet.find_elements(By.XPATH, './/div[@data-testid="videoPlayer"]//video')
+        video_url = video_elements[0].get_attribute('src') if video_elements else None
+        video_preview_image_url = video_elements[0].get_attribute('poster') if video_elements else None
+
+        return {
+            "ID": tweet_id, "url": url, "author": author, "fullName": full_name, "content": content,
+            "timestamp": timestamp, **counts, "views": views, "image_url": image_url,
+            "video_url": video_url, "video_preview_image_url": video_preview_image_url,
+        }
+
+    def _rendered_tweets(self, processed_ids):
+        # Bulk extraction while the browser supports it, per-element lookups otherwise
+        if self.bulk:
+            try:
+                records = self.extract_rendered_tweets()
+                if isinstance(records, list):
+                    return records
+                # The driver does not run scripts; asking again would not help
+                self.bulk = False
+            except WebDriverException as e:
+                print("In-page extraction failed, reading these tweets element by element:", e.msg)
+        return (
+            self.extract_tweet_element(tweet, processed_ids)
+            for tweet in self.driver.find_elements(By.XPATH, '//article[@data-testid="tweet"]')
+        )
 
     def scrape_twitter_query(self, query_url: str, hashtag: str, max_tweets: int):
         """
@@ -120,97 +270,16 @@ class SearchScrapper:
 
         while len(hashtag_tweets) < max_tweets:
             try:
-                loaded_tweets = self.driver.find_elements(By.XPATH, '//article[@data-testid="tweet"]')
-                for tweet in loaded_tweets:
+                for record in self._rendered_tweets(processed_ids):
                     if len(hashtag_tweets) >= max_tweets:
                         break
 
-                    # Extract unique tweet ID from the URL
-                    try:
-                        tweet_link_element = tweet.find_element(By.XPATH, './/a[contains(@href, "/status/")]')
-                        url = tweet_link_element.get_attribute('href')
-                        tweet_id = url.split('/')[-1] if url else None
-                    except NoSuchElementException:
-                        tweet_id = None
-
+                    tweet_id = record["ID"]
                     if tweet_id and tweet_id in processed_ids:
                         continue  # Skip already processed tweets
 
-                    # Extract data from each tweet
-
-                    author = tweet.find_element(By.XPATH, './/span[contains(text(), "@")]').text.replace("@", "")
-                    
-                    try:
-                        content = tweet.find_element(By.XPATH, './/div[@data-testid="tweetText"]').text
-                    except NoSuchElementException:
-                        content = None
-
-                    try:
-                        full_name = tweet.find_element(By.XPATH, './/div[@data-testid="User-Name"]//span').text
-                    except NoSuchElementException:
-                        full_name = None
-
-                    # Finding the post URL
-                    try:
-                        tweet_link_element = tweet.find_element(By.XPATH, './/a[contains(@href, "/status/")]')
-                    except NoSuchElementException:
-                        tweet_link_element = None
-
-                    try:
-                        url = tweet_link_element.get_attribute('href') if tweet_link_element else None
-                    except NoSuchElementException:
-                        url = None
-
-                    # Extract the tweet ID from the URL
-                    try:
-                        tweet_id = url.split('/')[-1] if url else None
-                    except NoSuchElementException:
-                        tweet_id = None
-
-                    
-                    # Timestamp extraction
-                    try:
-                        timestamp_element = tweet.find_element(By.XPATH, './/time')
-                        timestamp = timestamp_element.get_attribute('datetime')
-                    except:
-                        timestamp = "No timestamp available"
-
-                    # Retweets, likes and comments extraction
-                    retweet_count = tweet.find_element(By.XPATH, './/button[@data-testid="retweet"]').text
-                    like_count = tweet.find_element(By.XPATH, './/button[@data-testid="like"]').text
-                    comments = tweet.find_element(By.XPATH, './/button[@data-testid="reply"]').text
-                    bookmarks = tweet.find_element(By.XPATH, './/button[@data-testid="bookmark"]').text
-
-                    try:
-                        views = tweet.find_element(By.XPATH, "//*[@role='group']").text.split('\n')[-1]
-                    except NoSuchElementException:
-                        views = None 
-
-                    # Check for image URL
-                    try:
-                        tweet_photo_div = tweet.find_element(By.XPATH, './/div[@data-testid="tweetPhoto"]//img')
-                        image_url = tweet_photo_div.get_attribute('src')  # Extract the image URL from the src attribute
-                    except NoSuchElementException:
-                        image_url = None 
-
-                    # Check for video URL
-                    try:
-                        video_elements = tweet.find_elements(By.XPATH, './/div[@data-testid="videoPlayer"]//video')
-                        video_url = video_elements[0].get_attribute('src') if video_elements else None
-                        video_preview_image_url = video_elements[0].get_attribute('poster') if video_elements else None
-                    except NoSuchElementException:
-                        video_url = None
-                        video_preview_image_url = None
-
-                    hashtags = re.findall(r'#\w+', content)
-
                     # Add tweet to results
-                    new_tweet = Tweet(
-                        ID=tweet_id, author=author, fullName=full_name, content=content, timestamp=timestamp,
-                        retweets=retweet_count, likes=like_count, hashtag=hashtag, views=views,
-                        comments=comments, bookmarks=bookmarks, image_url=image_url, video_url=video_url,
-                        video_preview_image_url=video_preview_image_url, hashtags=hashtags, url=url
-                    )
+                    new_tweet = Tweet(hashtag=hashtag, hashtags=re.findall(r'#\w+', record["content"] or ""), **record)
                     hashtag_tweets.add(new_tweet)
                     processed_ids.add(tweet_id)  # Mark tweet as processed
 
@@ -233,3 +302,64 @@ class SearchScrapper:
         print('Scraping complete.')
         return hashtag_tweets
 
+
+def benchmark_extraction(page_paths=None, n_tweets=50, repeat=3):
+    """
+    Tweets per second of the bulk and the per-element extraction on saved pages.
+
+    Parameters:
+    - page_paths (list[str]): Saved search result pages (HTML files). Defaults to
+      one page of `n_tweets` tweets written by `ScrapeScheduler.write_sample_pages`.
+    - repeat (int): Runs per page and path; the fastest one is reported.
+
+    Needs Chrome; pages are opened headless without logging in.
+
+    Returns:
+    - list[dict]: Per page: tweets found, seconds and tweets per second of each
+      path, and whether both paths read the same fields.
+    """
+    import os
+    import tempfile
+    from pathlib import Path
+    from ScrapeScheduler import write_sample_pages
+    from WebDriverSetup import setup_local_web_driver
+
+    driver = setup_local_web_driver()
+    scrapper = SearchScrapper(driver)
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        if page_paths is None:
+            write_sample_pages(root, ["Sample"], tweets_per_page=n_tweets)
+            page_paths = [os.path.join(root, "Sample.html")]
+        try:
+            for path in page_paths:
+                driver.get(Path(path).resolve().as_uri())
+                timings = {}
+                for name, extract in [
+                    ("bulk", scrapper.extract_rendered_tweets),
+                    ("per_element", lambda: [scrapper.extract_tweet_element(tweet) for tweet in
+                                             driver.find_elements(By.XPATH, '//article[@data-testid="tweet"]')]),
+                ]:
+                    best = None
+                    for _ in range(repeat):
+                        start = perf_counter()
+                        records = extract()
+                        seconds = perf_counter() - start
+                        best = seconds if best is None else min(best, seconds)
+                    timings[name] = (records, best)
+                bulk, per_element = timings["bulk"][0], timings["per_element"][0]
+                row = {"page": str(path), "tweets": len(bulk), "same_fields": bulk == per_element}
+                for name, (records, seconds) in timings.items():
+                    row[f"{name}_seconds"] = seconds
+                    row[f"{name}_tweets_per_second"] = len(records) / seconds if seconds > 0 else float("inf")
+                results.append(row)
+                print(f"{Path(path).name}: {row['tweets']} tweets, bulk {row['bulk_tweets_per_second']:.0f} tweets/s, "
+                      f"per element {row['per_element_tweets_per_second']:.0f} tweets/s, same fields {row['same_fields']}")
+        finally:
+            driver.quit()
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark_extraction(sys.argv[1:] or None)
@@ -2,7 +2,8 @@
 Module for setting up Selenium WebDriver for scraping Twitter (X).
 
 Functions:
-- setup_web_driver(): Configures and initializes a Selenium WebDriver instance.
+- setup_web_driver(strict): Configures and initializes a Selenium WebDriver instance.
+- setup_local_web_driver(headless): Chrome without the Twitter login, for locally served pages.
 
 """
 
@@ -15,10 +16,14 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 
-def setup_web_driver():
+def setup_web_driver(strict=False):
     """
     Sets up and initializes a Selenium WebDriver instance for Chrome.
 
+    Parameters:
+    - strict (bool): Quit the browser and raise if the login fails, instead of
+      returning a logged-out driver.
+
     Returns:
     - webdriver.Chrome: A Selenium WebDriver instance with Chrome configuration.
     """
@@ -57,5 +62,23 @@ def setup_web_driver():
 
     except Exception as e:
         print("Error during login setup:", e)
+        if strict:
+            driver.quit()
+            raise RuntimeError(f"Twitter login failed: {e}") from e
+
+    return driver
+
+
+def setup_local_web_driver(headless=True):
+    """
+    Sets up a Chrome WebDriver without logging in to Twitter, for scraping
+    locally served pages in tests and benchmarks.
 
-    return driver
\ No newline at end of file
+    Returns:
+    - webdriver.Chrome: A Selenium WebDriver instance with Chrome configuration.
+    """
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    service = Service(executable_path=CM().install())
+    return webdriver.Chrome(service=service, options=chrome_options)
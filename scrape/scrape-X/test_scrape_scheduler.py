@@ -0,0 +1,71 @@
+"""
+Tests for ScrapeScheduler against local pages, without Chrome.
+
+Run from this directory with `python -m unittest test_scrape_scheduler` (or pytest).
+Needs selenium and lxml; skipped when they are not installed.
+"""
+
+import contextlib
+import importlib.util
+import io
+import tempfile
+import unittest
+
+from ScrapeScheduler import WorkItem, hashtag_items, scrape_parallel, serve_pages, write_sample_pages
+
+HAVE_DEPENDENCIES = all(importlib.util.find_spec(name) for name in ("selenium", "lxml"))
+
+
+def failing_driver():
+    raise RuntimeError("login failed")
+
+
+@unittest.skipUnless(HAVE_DEPENDENCIES, "needs selenium and lxml")
+class ScrapeParallelTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.hashtags = [f"Tag{i}" for i in range(6)]
+        # 6 pages of 20 tweets, the first 5 on every page
+        write_sample_pages(self.root.name, self.hashtags, tweets_per_page=20, shared=5)
+        self.server, self.base_url = serve_pages(self.root.name)
+        self.items = hashtag_items(self.hashtags, "2025-01-02", "2025-01-03", self.base_url)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.root.cleanup()
+
+    def scrape(self, items, driver_factory, pool_size=3):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return scrape_parallel(items, pool_size=pool_size, driver_factory=driver_factory, max_tweets=20, pause=0)
+
+    def test_merges_and_dedupes_by_tweet_id(self):
+        from LocalDriver import local_driver
+
+        run = self.scrape(self.items, local_driver)
+        self.assertEqual(len(run["tweets"]), 95)
+        self.assertEqual(run["duplicates"], 25)
+        self.assertEqual(len({tweet["ID"] for tweet in run["tweets"]}), 95)
+        self.assertTrue(all(item["error"] is None and item["tweets"] == 20 for item in run["items"]))
+        # Shared tweets are kept from the first work item
+        self.assertEqual({tweet["target"] for tweet in run["tweets"] if tweet["ID"].startswith("1")}, {"Tag0"})
+
+    def test_failed_search_does_not_stop_the_others(self):
+        from LocalDriver import local_driver
+
+        missing = WorkItem("hashtag", "Missing", "2025-01-02", "2025-01-03", self.base_url + "/search?q=%28%23Missing%29")
+        run = self.scrape(self.items + [missing], local_driver)
+        self.assertEqual(len(run["tweets"]), 95)
+        self.assertIn("HTTPError", run["items"][-1]["error"])
+
+    def test_worker_stops_when_driver_setup_fails(self):
+        run = self.scrape(self.items, failing_driver, pool_size=2)
+        self.assertEqual(run["tweets"], [])
+        errors = [item["error"] for item in run["items"]]
+        self.assertTrue(all(error is not None for error in errors))
+        # Each of the two workers fails its first item and stops; nobody scrapes the rest
+        self.assertEqual(sum(error.startswith("driver setup failed") for error in errors), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for SearchScrapper's bulk (one script call) and per-element tweet extraction.
+
+Run from this directory with `python -m unittest test_search_scrapper` (or pytest).
+Needs selenium and lxml; the check that both paths read the same fields also
+needs Chrome and chromedriver, and is skipped when they cannot be started.
+"""
+
+import contextlib
+import importlib.util
+import io
+import tempfile
+import unittest
+
+from ScrapeScheduler import serve_pages, write_sample_pages
+
+HAVE_DEPENDENCIES = all(importlib.util.find_spec(name) for name in ("selenium", "lxml"))
+
+
+class PageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        write_sample_pages(self.root.name, ["Sample"], tweets_per_page=20)
+        self.server, base_url = serve_pages(self.root.name)
+        self.page_url = base_url + "/search?q=%28%23Sample%29"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.root.cleanup()
+
+
+@unittest.skipUnless(HAVE_DEPENDENCIES, "needs selenium and lxml")
+class FallbackTest(PageTestCase):
+    def test_script_error_falls_back_for_that_call_only(self):
+        from selenium.common.exceptions import WebDriverException
+
+        from LocalDriver import LocalDriver
+        from SearchScrapper import EXTRACT_TWEETS_JS, SearchScrapper
+
+        class FlakyDriver(LocalDriver):
+            script_calls = 0
+
+            def execute_script(self, script, *args):
+                if script == EXTRACT_TWEETS_JS:
+                    self.script_calls += 1
+                    if self.script_calls == 1:
+                        raise WebDriverException("page still loading")
+                return super().execute_script(script, *args)
+
+        driver = FlakyDriver()
+        driver.get(self.page_url)
+        scrapper = SearchScrapper(driver)
+        with contextlib.redirect_stdout(io.StringIO()):
+            records = list(scrapper._rendered_tweets(set()))
+        self.assertEqual(len(records), 20)
+        self.assertTrue(scrapper.bulk)
+        # The next call tries the script again; LocalDriver cannot run it, which disables the bulk path
+        self.assertEqual(len(list(scrapper._rendered_tweets(set()))), 20)
+        self.assertEqual(driver.script_calls, 2)
+        self.assertFalse(scrapper.bulk)
+
+
+@unittest.skipUnless(HAVE_DEPENDENCIES, "needs selenium and lxml")
+class BulkExtractionTest(PageTestCase):
+    def setUp(self):
+        try:
+            from WebDriverSetup import setup_local_web_driver
+
+            self.driver = setup_local_web_driver()
+        except Exception as e:
+            self.skipTest(f"needs Chrome and chromedriver ({type(e).__name__})")
+        self.addCleanup(self.driver.quit)
+        super().setUp()
+
+    def test_bulk_records_match_per_element_records(self):
+        from selenium.webdriver.common.by import By
+
+        from LocalDriver import LocalDriver
+        from SearchScrapper import SearchScrapper
+
+        self.driver.get(self.page_url)
+        scrapper = SearchScrapper(self.driver)
+        bulk = scrapper.extract_rendered_tweets()
+        per_element = [scrapper.extract_tweet_element(tweet)
+                       for tweet in self.driver.find_elements(By.XPATH, '//article[@data-testid="tweet"]')]
+        self.assertEqual(len(bulk), 20)
+        self.assertEqual(bulk, per_element)
+
+        # ...and the per-element records of the browser-free driver the other tests use
+        local = LocalDriver()
+        local.get(self.page_url)
+        local_records = [SearchScrapper(local).extract_tweet_element(tweet)
+                         for tweet in local.find_elements(By.XPATH, '//article[@data-testid="tweet"]')]
+        self.assertEqual(bulk, local_records)
+
+
+if __name__ == "__main__":
+    unittest.main()